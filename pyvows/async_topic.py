@@ -16,13 +16,26 @@ import sys
 
 #-------------------------------------------------------------------------------------------------
 
+# how many seconds runners wait for the callback of a `Vows.async_topic`
+ASYNC_TOPIC_TIMEOUT = 60
+
+
+class VowsAsyncTopicTimeout(Exception):
+    '''Raised as the topic error of a `Vows.async_topic` whose callback
+    wasn't called within its `timeout`.'''
+
+    def __init__(self, topic):
+        super(VowsAsyncTopicTimeout, self).__init__(
+            'The callback of {0} was not called within {1} seconds'.format(topic.func.__name__, topic.timeout))
+
 
 class VowsAsyncTopic(object):
     #   FIXME: Add Docstring
-    def __init__(self, func, args, kw):
+    def __init__(self, func, args, kw, timeout=None):
         self.func = func
         self.args = args
         self.kw = kw
+        self.timeout = timeout
 
     def __call__(self, callback):
         args = (self.args[0], callback,) + self.args[1:]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+'''Data PyVows keeps between runs, in a `.pyvows_cache` directory under
+the directory it's run from.
+
+The cache only ever speeds things up: when it can't be read (or written),
+PyVows carries on as if it were empty.  `pyvows --no-cache` turns it off
+(see `set_enabled()`).
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import json
+import os
+import tempfile
+
+#-------------------------------------------------------------------------------------------------
+
+CACHE_DIR = '.pyvows_cache'
+
+_enabled = True
+
+
+def set_enabled(enabled):
+    '''Turns the cache on or off.  While it's off, nothing is read from
+    or written to it.'''
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def get_cache_path(name, root=None):
+    '''Returns the path of the cache file `name`.'''
+    return os.path.join(os.path.abspath(root or os.curdir), CACHE_DIR, name)
+
+
+def make_cache_dir(root=None):
+    '''Creates the cache directory if needed, with a `.gitignore` keeping
+    it out of version control, and returns its path.'''
+    directory = os.path.join(os.path.abspath(root or os.curdir), CACHE_DIR)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+        with open(os.path.join(directory, '.gitignore'), 'w') as gitignore:
+            gitignore.write('# Created by PyVows automatically.\n*\n')
+    return directory
+
+
+def load_json(name, default=None, root=None):
+    '''Returns the contents of the JSON cache file `name`, or `default` if
+    there's no such file (or it can't be read).'''
+    if not _enabled:
+        return default
+    try:
+        with open(get_cache_path(name, root)) as cache_file:
+            return json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return default
+
+
+def save_json(name, data, root=None):
+    '''Replaces the JSON cache file `name` with `data`.  Returns whether it
+    could be saved.'''
+    if not _enabled:
+        return False
+    path = get_cache_path(name, root)
+    try:
+        directory = make_cache_dir(root)
+        # write a new file, then move it in place: concurrent runs never
+        # see a half-written file
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + name)
+        with os.fdopen(handle, 'w') as cache_file:
+            json.dump(data, cache_file, sort_keys=True)
+        getattr(os, 'replace', os.rename)(temp_path, path)
+        return True
+    except (IOError, OSError):
+        return False
@@ -15,8 +15,10 @@ from __future__ import division, print_function
 
 import argparse
 import inspect
+import io
 import os
 from os.path import isfile, split
+import subprocess
 import sys
 import tempfile
 
@@ -26,10 +28,20 @@ try:
 except ImportError:
     COVERAGE_AVAILABLE = False
 
+from pyvows import cache
+from pyvows.cache import CACHE_DIR
 from pyvows.color import yellow, Style, Fore
+from pyvows.dependencies import get_changed_files
+from pyvows.failures import FailureStore
+from pyvows.profiling import CodeProfiler, ImportProfiler, MemoryProfiler
+from pyvows.timings import TimingStore
+from pyvows.watch import get_watcher, watch
+from pyvows.events import VowsEvents
 from pyvows.reporting import VowsDefaultReporter
+from pyvows.reporting.jsonl import JSONLinesReporter
 from pyvows.reporting.xunit import XUnitReporter
-from pyvows import version
+from pyvows.runner import RUNNERS
+from pyvows import server, version
 
 #-------------------------------------------------------------------------------------------------
 
@@ -51,14 +63,46 @@ class Messages(object):  # pragma: no cover
     cover_report = 'Store coverage report as %(metavar)s. (default: %(default)r)'
     xunit_output = 'Enable XUnit output. (default: %(default)s)'
     xunit_file = 'Store XUnit output as %(metavar)s. (default: %(default)r)'
+    jsonl_output = 'Write a JSON record per context and vow to %(metavar)s as they finish. (default: disabled)'
+    changed_since = 'Only run the vows files affected by files changed since the git revision %(metavar)s.'
+    changed_files = 'Only run the vows files affected by %(metavar)s (comma-separated). May be specified many times.'
+    last_failed = 'Only run the contexts and vows which failed last time (or everything, if nothing failed).'
+    failed_first = 'Run the batches which failed last time before the others.'
     exclude = 'Exclude tests and contexts that match regex-pattern %(metavar)s [Mutually exclusive with --include]'
     include = 'Include only tests and contexts that match regex-pattern %(metavar)s [Mutually exclusive with --exclude]'
-    profile = 'Prints the 10 slowest topics. (default: %(default)s)'
+    profile = ('Prints the slowest topics and steps (setups, topics, vows and teardowns), the slowest batches and '
+               'files, and percentiles of step times. (default: %(default)s)')
+    profile_code = ('Runs the setup, topic and vows of the contexts matching %(metavar)s under cProfile, saving a '
+                    '.pstats file per context. May be specified many times.')
+    profile_code_dir = 'Directory to save --profile-code profiles in. (default: %(default)s)'
+    profile_memory = ('Measures the peak and retained memory of each context, and the lines allocating the most '
+                      'memory, using tracemalloc. Runs the vows with the sequential runner.')
+    profile_top = ('Number of entries in each table of --profile, --profile-collection and --profile-memory. '
+                   '(default: %(default)s)')
+    profile_collection = 'Prints how long importing each vows file took, and how much memory it used.'
+    profile_packages = 'Like --profile-collection, also profiling the first import of each package.'
     profile_threshold = 'Tests taking longer than %(metavar)s seconds are considered slow. (default: %(default)s)'
     no_color = 'Turn off colorized output. (default: %(default)s)'
     progress = 'Show progress ticks during testing. (default: %(default)s)'
     template = 'Print a PyVows test file template. (Disables testing)'
     capture_output = 'Capture stdout and stderr during test execution (default: %(default)s)'
+    runner = 'Run vows with the %(metavar)s runner, one of: {0}. (default: gevent if available, else sequential)'.format(
+        ', '.join(sorted(RUNNERS)))
+    concurrency = 'Run at most %(metavar)s topics and vows at the same time. (default: 1000)'
+    max_topics = 'Run at most %(metavar)s topics at the same time. (default: no limit but --concurrency)'
+    max_vows = 'Run at most %(metavar)s vows at the same time. (default: no limit but --concurrency)'
+    release_results = 'Drop topics and contexts from vow results once reported, to save memory. (default: %(default)s)'
+    watch = ('Keep running, and rerun the vows files affected by each change of the vows files or of the project '
+             'files they import. (default: %(default)s)')
+    watch_interval = 'Check for changes every %(metavar)s seconds, when inotify is unavailable. (default: %(default)s)'
+    serve = ('Start a server which imports the --preload modules once, then runs PyVows in a forked child for each '
+             '--client request. (default: %(default)s)')
+    preload = 'Module the --serve server imports when it starts. May be specified many times.'
+    client = 'Run on the --serve server (if one is listening), with the other arguments. (default: %(default)s)'
+    socket = 'Unix socket the server listens on. (default: %(default)s)'
+    no_cache = ('Neither read nor write the {0} directory (timings, last failures, vows file dependencies and '
+                'listings). (default: %(default)s)').format(CACHE_DIR)
+    workers = 'Distribute batches across %(metavar)s worker processes; 0 means one per CPU core. (default: %(default)s)'
 
 
 class Parser(argparse.ArgumentParser):
@@ -77,6 +121,16 @@ class Parser(argparse.ArgumentParser):
         self.add_argument('-e', '--exclude', action='append', default=[], help=Messages.exclude, metavar=metavar('exclude'))
         self.add_argument('-i', '--include', action='append', default=[], help=Messages.include, metavar=metavar('include'))
 
+        ### Selection
+        selection_group = self.add_argument_group('Test Selection')
+        selection_group.add_argument('--changed-since', default=None, help=Messages.changed_since, metavar=metavar('ref'))
+        selection_group.add_argument(
+            '--changed-files', action='append', default=None,
+            help=Messages.changed_files, metavar=metavar('files')
+        )
+        selection_group.add_argument('--last-failed', action='store_true', default=False, help=Messages.last_failed)
+        selection_group.add_argument('--failed-first', action='store_true', default=False, help=Messages.failed_first)
+
         ### Coverage
         cover_group = self.add_argument_group('Test Coverage')
         cover_group.add_argument('-c', '--cover', action='store_true', default=False, help=Messages.cover)
@@ -105,6 +159,13 @@ class Parser(argparse.ArgumentParser):
             help=Messages.xunit_file, metavar=metavar('file')
         )
 
+        ### JSON Lines
+        jsonl_group = self.add_argument_group('JSON Lines')
+        jsonl_group.add_argument(
+            '--jsonl-output', action='store', default=None,
+            help=Messages.jsonl_output, metavar=metavar('file')
+        )
+
         ### Profiling
         profile_group = self.add_argument_group('Profiling')
         profile_group.add_argument('--profile', action='store_true', dest='profile', default=False, help=Messages.profile)
@@ -112,6 +173,48 @@ class Parser(argparse.ArgumentParser):
             '--profile-threshold', type=float, default=0.1,
             help=Messages.profile_threshold, metavar=metavar('num')
         )
+        profile_group.add_argument(
+            '--profile-top', type=int, default=10,
+            help=Messages.profile_top, metavar=metavar('number')
+        )
+        profile_group.add_argument(
+            '--profile-code', action='append', default=[],
+            help=Messages.profile_code, metavar=metavar('pattern')
+        )
+        profile_group.add_argument(
+            '--profile-code-dir', default=os.path.join(CACHE_DIR, 'profiles'),
+            help=Messages.profile_code_dir, metavar=metavar('directory')
+        )
+        profile_group.add_argument(
+            '--profile-memory', action='store_true', default=False, help=Messages.profile_memory
+        )
+        profile_group.add_argument(
+            '--profile-collection', action='store_true', default=False, help=Messages.profile_collection
+        )
+        profile_group.add_argument(
+            '--profile-packages', action='store_true', default=False, help=Messages.profile_packages
+        )
+
+        ### Watching
+        watch_group = self.add_argument_group('Watching')
+        watch_group.add_argument('--watch', action='store_true', default=False, help=Messages.watch)
+        watch_group.add_argument(
+            '--watch-interval', type=float, default=0.5,
+            help=Messages.watch_interval, metavar=metavar('seconds')
+        )
+
+        ### Server
+        server_group = self.add_argument_group('Server')
+        server_group.add_argument('--serve', action='store_true', default=False, help=Messages.serve)
+        server_group.add_argument(
+            '--preload', action='append', default=[],
+            help=Messages.preload, metavar=metavar('module')
+        )
+        server_group.add_argument('--client', action='store_true', default=False, help=Messages.client)
+        server_group.add_argument(
+            '--socket', default=server.DEFAULT_SOCKET,
+            help=Messages.socket, metavar=metavar('path')
+        )
 
         ### Aux/Unconventional
         aux_group = self.add_argument_group('Utility')
@@ -122,12 +225,22 @@ class Parser(argparse.ArgumentParser):
         self.add_argument('--progress', action='store_true', dest='progress', default=False, help=Messages.progress)
         self.add_argument('--version', action='version', version='%(prog)s {0}'.format(version.to_str()))
         self.add_argument('--capture-output', action='store_true', default=False, help=Messages.capture_output)
+        self.add_argument('--runner', choices=sorted(RUNNERS), default=None, help=Messages.runner, metavar=metavar('name'))
+        self.add_argument('--concurrency', type=int, default=None, help=Messages.concurrency, metavar=metavar('number'))
+        self.add_argument('--max-topics', type=int, default=None, help=Messages.max_topics, metavar=metavar('number'))
+        self.add_argument('--max-vows', type=int, default=None, help=Messages.max_vows, metavar=metavar('number'))
+        self.add_argument('--workers', type=int, default=1, help=Messages.workers, metavar=metavar('number'))
+        self.add_argument('--release-results', action='store_true', default=False, help=Messages.release_results)
+        self.add_argument('--no-cache', action='store_true', default=False, help=Messages.no_cache)
         self.add_argument('-v', action='append_const', dest='verbosity', const=1, help=Messages.verbosity)
 
         self.add_argument('path', nargs='?', default=os.curdir, help=Messages.path)
 
 
-def run(path, pattern, verbosity, show_progress, exclusion_patterns=None, inclusion_patterns=None, capture_output=False):
+def run(path, pattern, verbosity, show_progress, exclusion_patterns=None, inclusion_patterns=None, capture_output=False,
+        workers=1, runner=None, concurrency=None, events=None, release_results=False, max_topics=None, max_vows=None,
+        changed_files=None, timings=None, inclusion_ids=None, failures=None, profiler=None, code_profiler=None,
+        memory_profiler=None):
     #   FIXME: Add Docstring
 
     # This calls Vows.run(), which then calls VowsRunner.run()
@@ -139,23 +252,79 @@ def run(path, pattern, verbosity, show_progress, exclusion_patterns=None, inclus
         Vows.exclude(exclusion_patterns)
     if inclusion_patterns:
         Vows.include(inclusion_patterns)
+    if inclusion_ids is not None:
+        Vows.include_ids(inclusion_ids)
 
-    Vows.collect(path, pattern)
+    Vows.collect(path, pattern, changed_files, profiler)
 
     on_success = show_progress and VowsDefaultReporter.on_vow_success or None
     on_error = show_progress and VowsDefaultReporter.on_vow_error or None
-    result = Vows.run(on_success, on_error, capture_output)
+    result = Vows.run(on_success, on_error, capture_output, workers=workers, runner=runner,
+                      concurrency=concurrency, events=events, release_results=release_results,
+                      max_topics=max_topics, max_vows=max_vows, timings=timings,
+                      failures=failures, code_profiler=code_profiler, memory_profiler=memory_profiler)
 
     return result
 
 
+def get_changed_files_from(arguments):
+    '''Returns the files given by `--changed-files` and `--changed-since`, or
+    `None` if neither was used.'''
+    if arguments.changed_files is None and arguments.changed_since is None:
+        return None
+
+    changed_files = []
+    for files in arguments.changed_files or ():
+        changed_files.extend(filename.strip() for filename in files.split(',') if filename.strip())
+
+    if arguments.changed_since is not None:
+        try:
+            changed_files.extend(get_changed_files(arguments.changed_since))
+        except (OSError, subprocess.CalledProcessError) as e:
+            output = getattr(e, 'output', None) or b''
+            sys.exit('Could not list the files changed since {0!r}: {1}'.format(
+                arguments.changed_since, output.decode('utf-8', 'replace').strip() or e))
+
+    return changed_files
+
+
+def serve(socket_path, preload):
+    '''Runs a PyVows server (see `pyvows.server`) until interrupted.'''
+    if not hasattr(os, 'fork') or not hasattr(server.socket, 'AF_UNIX'):
+        sys.exit('The PyVows server needs os.fork() and Unix sockets.')
+
+    vows_server = server.VowsServer(socket_path, preload, main)
+    try:
+        vows_server.start()
+    except (ImportError, RuntimeError, OSError) as e:
+        vows_server.stop()
+        sys.exit('Could not start the PyVows server: {0}'.format(e))
+    print('PyVows server listening on {0} (press Ctrl+C to stop)'.format(socket_path))
+    try:
+        vows_server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    sys.exit()
+
+
 def main():
     '''PyVows' runtime implementation.
     '''
     # needs to be imported here, else the no-color option won't work
     from pyvows.reporting import VowsDefaultReporter
 
-    arguments = Parser().parse_args()
+    parser = Parser()
+    arguments = parser.parse_args()
+
+    if arguments.no_cache:
+        cache.set_enabled(False)
+
+    if arguments.profile_memory:
+        # (tracemalloc traces the whole process: steps running at the same
+        # time would be measured together)
+        if arguments.runner not in (None, 'sequential'):
+            parser.error('--profile-memory needs the sequential runner')
+        arguments.runner = 'sequential'
 
     if arguments.template:
         from pyvows.utils import template
@@ -163,6 +332,17 @@ def main():
         sys.exit()  # Exit after printing template, since it's
                     # supposed to be redirected from STDOUT by the user
 
+    if arguments.serve:
+        if server.is_handling_request():
+            parser.error('--serve can\'t be sent to a PyVows server')
+        serve(arguments.socket, arguments.preload)
+    # (a request sent with --client runs in the server's child)
+    if arguments.client and not server.is_handling_request():
+        status = server.request([argument for argument in sys.argv[1:] if argument != '--client'], arguments.socket)
+        if status is not None:
+            sys.exit(status)
+        print(yellow('No PyVows server is listening on {0}; running here.'.format(arguments.socket)), file=sys.stderr)
+
     path, pattern = arguments.path, arguments.pattern
     if path and isfile(path):
         path, pattern = split(path)
@@ -180,24 +360,77 @@ def main():
         cov.erase()
         cov.start()
 
+    changed_files = get_changed_files_from(arguments)
+
+    profiler = None
+    if arguments.profile_collection or arguments.profile_packages:
+        profiler = ImportProfiler(trace_memory=True, packages=arguments.profile_packages)
+    memory_profiler = MemoryProfiler() if arguments.profile_memory else None
+    code_profiler = None
+    if arguments.profile_code:
+        code_profiler = CodeProfiler(arguments.profile_code, os.path.abspath(arguments.profile_code_dir))
+
+    events = VowsEvents()
+    timings = TimingStore.load()
+    timings.subscribe(events)
+    failures = FailureStore.load()
+    last_failed = set(failures.ids)
+    failures.subscribe(events)
+    jsonl_file = None
+    if arguments.jsonl_output:
+        jsonl_file = io.open(arguments.jsonl_output, 'w', encoding='utf-8')
+        JSONLinesReporter(jsonl_file).subscribe(events)
+
     verbosity = len(arguments.verbosity) if arguments.verbosity else 2
-    result = run(
-        path,
-        pattern,
-        verbosity,
-        arguments.progress,
-        exclusion_patterns=arguments.exclude,
-        inclusion_patterns=arguments.include,
-        capture_output=arguments.capture_output
-    )
-    reporter = VowsDefaultReporter(result, verbosity)
-
-    # Print test results first
-    reporter.pretty_print()
-
-    # Print profile if necessary
-    if arguments.profile:
-        reporter.print_profile(arguments.profile_threshold)
+    try:
+        result = run(
+            path,
+            pattern,
+            verbosity,
+            arguments.progress,
+            exclusion_patterns=arguments.exclude,
+            inclusion_patterns=arguments.include,
+            capture_output=arguments.capture_output,
+            workers=arguments.workers,
+            runner=arguments.runner,
+            concurrency=arguments.concurrency,
+            max_topics=arguments.max_topics,
+            max_vows=arguments.max_vows,
+            changed_files=changed_files,
+            timings=timings,
+            inclusion_ids=last_failed if arguments.last_failed and last_failed else None,
+            failures=failures if arguments.failed_first else None,
+            profiler=profiler,
+            code_profiler=code_profiler,
+            memory_profiler=memory_profiler,
+            events=events,
+            release_results=arguments.release_results
+        )
+    finally:
+        if jsonl_file is not None and not arguments.watch:
+            jsonl_file.close()
+
+    def report(result):
+        reporter = VowsDefaultReporter(result, verbosity)
+
+        # Print test results first
+        reporter.pretty_print()
+
+        # Print profile if necessary
+        if arguments.profile:
+            reporter.print_profile(arguments.profile_threshold, arguments.profile_top)
+        # (the collection profile has the slowest imports too)
+        if profiler is not None:
+            reporter.print_collection_profile(arguments.profile_top)
+        elif arguments.profile:
+            reporter.print_import_profile(arguments.profile_threshold, arguments.profile_top)
+        if memory_profiler is not None:
+            reporter.print_memory_profile(arguments.profile_top)
+        if code_profiler is not None:
+            print('Code profiles saved in {0}'.format(code_profiler.directory))
+        return reporter
+
+    reporter = report(result)
 
     # Print coverage if necessary
     if result.successful and arguments.cover:
@@ -235,6 +468,25 @@ def main():
         xunit = XUnitReporter(result)
         xunit.write_report(arguments.xunit_file)
 
+    # Rerun what each change affects, until interrupted
+    if arguments.watch:
+        on_success = arguments.progress and VowsDefaultReporter.on_vow_success or None
+        on_error = arguments.progress and VowsDefaultReporter.on_vow_error or None
+        try:
+            for result in watch(
+                    path, pattern, get_watcher(arguments.watch_interval), on_success, on_error,
+                    capture_error=arguments.capture_output, workers=arguments.workers, runner=arguments.runner,
+                    concurrency=arguments.concurrency, max_topics=arguments.max_topics,
+                    max_vows=arguments.max_vows, timings=timings,
+                    failures=failures if arguments.failed_first else None, code_profiler=code_profiler,
+                    memory_profiler=memory_profiler, events=events, release_results=arguments.release_results):
+                report(result)
+        except KeyboardInterrupt:
+            print()
+        finally:
+            if jsonl_file is not None:
+                jsonl_file.close()
+
     sys.exit(result.errored_tests)
 
 if __name__ == '__main__':
@@ -13,19 +13,29 @@ import os
 import sys
 import warnings
 import copy
+import importlib
 
 import preggy
 
 from pyvows import utils
-from pyvows.decorators import _batch, async_topic, capture_error, skip_if
-from pyvows.runner import VowsRunner
+from pyvows.async_topic import ASYNC_TOPIC_TIMEOUT
+from pyvows.decorators import _batch, async_topic, cached_topic, capture_error, skip_if
+from pyvows.dependencies import DependencyIndex
+from pyvows.fixtures import Fixture, FixtureManager
+from pyvows.profiling import ImportProfiler
+from pyvows.runner import get_runner
 from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.multiprocess import VowsMultiprocessRunner
 
 #-------------------------------------------------------------------------------------------------
 
 expect = preggy.expect
 
 
+def _get_module_name(path, module_path):
+    return os.path.splitext(module_path.replace(path, '').replace(os.sep, '.').lstrip('.'))[0]
+
+
 class Vows(object):
     '''This class contains almost the entire interface for using PyVows.  (The
     `expect` class usually being the only other necessary import.)
@@ -42,6 +52,12 @@ class Vows(object):
     suites = dict()
     exclusion_patterns = set()
     inclusion_patterns = set()
+    inclusion_ids = None
+    import_times = []
+    package_import_times = []
+    suite_files = []
+    dependency_index = None
+    fixtures = dict()
 
     class Context(object):
         '''Extend this class to create your test classes.  (The convention is to
@@ -62,6 +78,29 @@ class Vows(object):
 
         ignored_members = set(['topic', 'setup', 'teardown', 'ignore'])
 
+        # Generator topics are consumed entirely before their vows run.  Set
+        # `topic_window` to a number to stream them instead: each value goes
+        # to the vows and subcontexts as soon as it's yielded, with at most
+        # `topic_window` values being tested at a time.
+        topic_window = None
+
+        # Names of the fixtures (see `Vows.fixture`) this context uses;
+        # each one is given to the context as an attribute of that name.
+        fixtures = ()
+
+        # Set on a batch to run at most `max_concurrency` of its topics and
+        # vows at the same time (e.g. when they share a fragile resource).
+        max_concurrency = None
+
+        # Named resources this context needs, with how many contexts may
+        # hold each at the same time (e.g. `{'db': 1}`): a context holds
+        # them from its `setup` to its `teardown`, waiting for them if
+        # needed, while contexts needing other resources run meanwhile.
+        # Its subcontexts share those it holds.  A resource's capacity is
+        # the one first declared for it.  With `--workers`, batches sharing
+        # a resource are run by the same worker process.
+        resources = {}
+
         def __init__(self, parent=None):
             self.parent = parent
             self.topic_value = None
@@ -71,7 +110,7 @@ class Vows(object):
 
         def _get_first_available_topic(self, index=-1):
             if self.topic_value:
-                if index > -1 and isinstance(self.topic_value, (list, set, tuple)):
+                if index > -1 and (self.generated_topic or isinstance(self.topic_value, (list, set, tuple))):
                     return self.topic_value[index]
                 else:
                     return self.topic_value
@@ -110,8 +149,8 @@ class Vows(object):
         return preggy.create_assertions(func)
 
     @staticmethod
-    def async_topic(topic):
-        return async_topic(topic)
+    def async_topic(topic=None, timeout=ASYNC_TOPIC_TIMEOUT):
+        return async_topic(topic, timeout)
 
     @staticmethod
     def asyncTopic(topic):
@@ -122,6 +161,10 @@ class Vows(object):
                       stacklevel=2)
         return async_topic(topic)
 
+    @staticmethod
+    def cached_topic(topic=None, scope='run', maxsize=128):
+        return cached_topic(topic, scope, maxsize)
+
     @staticmethod
     def capture_error(topic_func):
         return capture_error(topic_func)
@@ -151,19 +194,115 @@ class Vows(object):
         Vows.suites[suite].add(ctx_class)
         return _batch(ctx_class)
 
+    @staticmethod
+    def fixture(function=None, scope='session', name=None):
+        '''Function decorator.  Declares a fixture, for the contexts which
+        list its `name` (by default, the function's name) in `fixtures`.
+
+        The function returns the fixture's value, or yields it and then
+        tears it down.  It's called once per run (`scope='session'`) or
+        per vows file (`scope='module'`, for the contexts of the module
+        declaring it), when the first context using the fixture runs; it's
+        torn down once the last batch using it is done.  See
+        `pyvows.fixtures`.
+
+        '''
+        def decorator(function):
+            fixture = Fixture(function, scope, name)
+            Vows.fixtures[fixture.key] = fixture
+            return function
+
+        if function is not None:
+            return decorator(function)
+        return decorator
+
     @classmethod
-    def collect(cls, path, pattern):
+    def collect(cls, path, pattern, changed_files=None, profiler=None):
         #   FIXME: Add Docstring
         #
         #   *   Only used in `cli.py`
+        #   *   With `changed_files`, only the files which may be affected
+        #       by them are imported (see `pyvows.dependencies`)
+        #   *   How long each file took to import is kept in `import_times`
+        #       (`profiler`, a `pyvows.profiling.ImportProfiler`, may also
+        #       measure memory and imported packages)
         path = os.path.abspath(path)
         sys.path.insert(0, path)
-        files = utils.locate(pattern, path)
-        for module_path in files:
-            module_name = os.path.splitext(
-                module_path.replace(path, '').replace(os.sep, '.').lstrip('.')
-            )[0]
-            __import__(module_name)
+        files = utils.locate(pattern, path, use_cache=True)
+
+        index = DependencyIndex.load()
+        cls.suite_files, cls.dependency_index = files, index
+        if changed_files is not None:
+            files = index.get_affected_suites(files, changed_files)
+
+        profiler = cls._import_suites(path, files, profiler)
+        cls.import_times.extend(profiler.modules)
+        cls.package_import_times.extend(profiler.package_times)
+
+    @classmethod
+    def _import_suites(cls, path, files, profiler=None):
+        index = cls.dependency_index
+        if profiler is None:
+            profiler = ImportProfiler()
+        try:
+            with profiler.profiling(), index.recording():
+                for module_path in files:
+                    index.record_suite(module_path)
+                    with profiler.measure(module_path):
+                        __import__(_get_module_name(path, module_path))
+        finally:
+            index.save()
+        return profiler
+
+    @classmethod
+    def reload(cls, path, pattern, changed_files):
+        '''Imports the vows files affected by `changed_files` again (along
+        with the project modules they import which changed, or import a
+        changed file themselves), and replaces their batches in `suites`.
+
+        Vows files are located again, so that new ones are imported and
+        removed ones forgotten.  Returns the reloaded part of `suites`.
+
+        '''
+        path = os.path.abspath(path)
+        index = cls.dependency_index
+        files = utils.locate(pattern, path, use_cache=True)
+        removed = set(os.path.realpath(suite) for suite in set(cls.suite_files) - set(files))
+        cls.suite_files = files
+
+        changed = set(os.path.realpath(filename) for filename in changed_files) | removed
+        stale = changed | index.get_dependents(changed)
+        affected = index.get_affected_suites(files, changed)
+        stale.update(os.path.realpath(suite) for suite in affected)
+
+        unloaded = set()
+        for name, module in list(sys.modules.items()):
+            filename = getattr(module, '__file__', None)
+            if not filename or name == 'pyvows' or name.startswith('pyvows.'):
+                continue
+            if os.path.realpath(os.path.splitext(filename)[0] + '.py') in stale:
+                # (a `.pyc` written in the same second may look up to date)
+                cached = getattr(module, '__cached__', None)
+                if cached and os.path.exists(cached):
+                    os.remove(cached)
+                del sys.modules[name]
+                unloaded.add(name)
+
+        for suite, batches in list(cls.suites.items()):
+            batches.difference_update([batch for batch in batches if batch.__module__ in unloaded])
+            if not batches:
+                del cls.suites[suite]
+
+        if hasattr(importlib, 'invalidate_caches'):
+            importlib.invalidate_caches()
+        profiler = cls._import_suites(path, affected)
+        cls.import_times, cls.package_import_times = profiler.modules, profiler.package_times
+
+        reloaded = set(_get_module_name(path, suite) for suite in affected)
+        return dict(
+            (suite, set(batches)) for suite, batches in cls.suites.items()
+            if any(batch.__module__ in reloaded for batch in batches)
+        )
 
     @classmethod
     def exclude(cls, test_name_pattern):
@@ -174,20 +313,75 @@ class Vows(object):
         cls.inclusion_patterns = test_name_pattern
 
     @classmethod
-    def run(cls, on_vow_success, on_vow_error, capture_error=False):
+    def include_ids(cls, ids):
+        cls.inclusion_ids = set(ids)
+
+    @classmethod
+    def run(cls, on_vow_success, on_vow_error, capture_error=False, workers=1, runner=None, concurrency=None,
+            events=None, release_results=False, max_topics=None, max_vows=None, timings=None,
+            failures=None, code_profiler=None, memory_profiler=None, suites=None):
         #   FIXME: Add Docstring
         #
         #       *   Used by `run()` in `cli.py`
         #       *   Please add a useful description if you wrote this! :)
-
-        execution_plan = ExecutionPlanner(cls.suites, set(cls.exclusion_patterns), set(cls.inclusion_patterns)).plan()
-
-        runner = VowsRunner(
-            cls.suites,
+        #       *   `workers` other than 1 shards batches across processes
+        #           (0 or `None` means one process per CPU core)
+        #       *   `runner` is a name from `pyvows.runner.RUNNERS`
+        #           (`None` picks the fastest available)
+        #       *   `concurrency` limits how many topics and vows run at once;
+        #           `max_topics` and `max_vows` limit each separately
+        #       *   `events` (a `pyvows.events.VowsEvents`) gets notified of
+        #           contexts, topics and vows as they finish
+        #       *   `release_results` drops topics and context instances
+        #           from vow results once they're reported, to save memory
+        #       *   `timings` (a `pyvows.timings.TimingStore`) starts the
+        #           batches which took longest last time first
+        #       *   `failures` (a `pyvows.failures.FailureStore`) starts
+        #           the batches which failed last time before the others
+        #       *   `code_profiler` (a `pyvows.profiling.CodeProfiler`)
+        #           profiles the contexts it selects
+        #       *   `memory_profiler` (a `pyvows.profiling.MemoryProfiler`)
+        #           measures the memory used by each context
+        #       *   fixtures are those declared with `Vows.fixture`
+        #       *   `suites` runs part of `Vows.suites` only (e.g. those
+        #           returned by `Vows.reload()`)
+
+        if suites is None:
+            suites = cls.suites
+        planner = ExecutionPlanner(
+            suites, set(cls.exclusion_patterns), set(cls.inclusion_patterns), cls.inclusion_ids)
+        execution_plan = planner.plan()
+
+        runner_class = get_runner(runner)
+        runner_options = {}
+        if workers != 1:
+            runner_options['engine'] = runner_class
+            runner_options['workers'] = workers
+            runner_class = VowsMultiprocessRunner
+
+        runner = runner_class(
+            suites,
             cls.Context,
             on_vow_success,
             on_vow_error,
             execution_plan,
-            capture_error
+            capture_error,
+            concurrency=concurrency,
+            max_topics=max_topics,
+            max_vows=max_vows,
+            events=events,
+            vow_index=planner.vow_index,
+            release_results=release_results,
+            timings=timings,
+            failures=failures,
+            code_profiler=code_profiler,
+            memory_profiler=memory_profiler,
+            fixtures=FixtureManager(cls.fixtures),
+            **runner_options
         )
-        return runner.run()
+        result = runner.run()
+        result.import_times = list(cls.import_times)
+        result.package_import_times = list(cls.package_import_times)
+        if memory_profiler is not None:
+            result.top_allocators = memory_profiler.top_allocators
+        return result
@@ -11,8 +11,9 @@
 
 from functools import wraps
 
-from pyvows.async_topic import VowsAsyncTopic
+from pyvows.async_topic import ASYNC_TOPIC_TIMEOUT, VowsAsyncTopic
 from pyvows.runner import SkipTest
+from pyvows.runner.topic_cache import SCOPES
 
 #-------------------------------------------------------------------------------------------------
 
@@ -25,20 +26,27 @@ def _batch(klass):
     return klass_name
 
 
-def async_topic(topic):
+def async_topic(topic=None, timeout=ASYNC_TOPIC_TIMEOUT):
     '''Topic decorator.  Allows PyVows testing of asynchronous topics.
 
     Use `@Vows.async_topic` on your `topic` method to mark it as
     asynchronous.  This allows PyVows to test topics which use callbacks
-    instead of return values.
+    instead of return values.  If the callback isn't called within
+    `timeout` seconds (`None` to wait forever), the topic fails with a
+    `VowsAsyncTopicTimeout`.
 
     '''
-    def wrapper(*args, **kw):
-        return VowsAsyncTopic(topic, args, kw)
-    wrapper._original = topic
-    wrapper._wrapper_type = 'async_topic'
-    wrapper.__name__ = topic.__name__
-    return wrapper
+    def decorator(topic):
+        def wrapper(*args, **kw):
+            return VowsAsyncTopic(topic, args, kw, timeout)
+        wrapper._original = topic
+        wrapper._wrapper_type = 'async_topic'
+        wrapper.__name__ = topic.__name__
+        return wrapper
+
+    if topic is not None:
+        return decorator(topic)
+    return decorator
 
 
 def capture_error(topic_func):
@@ -58,6 +66,34 @@ def capture_error(topic_func):
     return wrapper
 
 
+def cached_topic(topic=None, scope='run', maxsize=128):
+    '''Topic decorator.  Computes the topic only once for the same parent
+    topics.
+
+    Use `@Vows.cached_topic` on a `topic` method shared by several contexts
+    (e.g. inherited), which only depends on its arguments: its value is
+    reused by every context calling it with the same parent topics (equal
+    ones, or the very same objects if they can't be hashed), for the whole
+    run (`scope='run'`) or within a batch (`scope='batch'`).  At most
+    `maxsize` values (`None` for no limit) are kept, least recently used
+    ones being dropped first.  Generator topics are consumed entirely, and
+    `async_topic`s are waited for before caching their value.
+
+    Contexts share the same value: they shouldn't modify it.
+
+    '''
+    if scope not in SCOPES:
+        raise ValueError('Unknown topic cache scope: {0!r} (expected one of {1})'.format(scope, ', '.join(SCOPES)))
+
+    def decorator(topic):
+        topic._cache_options = {'scope': scope, 'maxsize': maxsize}
+        return topic
+
+    if topic is not None:
+        return decorator(topic)
+    return decorator
+
+
 def skip_if(condition, reason):
     '''Topic or vow or context decorator.  Causes a topic or vow to be skipped if `condition` is True
 
@@ -74,11 +110,13 @@ def skip_if(condition, reason):
                 def topic(self):
                     raise SkipTest(reason)
             klass_wrapper.__name__ = topic_or_vow_or_context.__name__
+            klass_wrapper.__module__ = topic_or_vow_or_context.__module__
             return klass_wrapper
         else:
             def wrapper(*args, **kwargs):
                 raise SkipTest(reason)
             wrapper.__name__ = topic_or_vow_or_context.__name__
+            wrapper._skip_reason = reason
             return wrapper
     return real_decorator
 
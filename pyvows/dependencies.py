@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+'''Tracks which project modules each vows file imports, so that only the
+suites affected by a set of changed files need to run.
+
+While suites are collected, import statements are recorded as edges of an
+import graph (`importer file -> imported file`), for files of the project
+(those under the directory PyVows runs from).  The graph is kept in
+`.pyvows_cache/dependencies.json` and updated with the files imported by
+every run.
+
+Only import statements executed while collecting are seen: modules loaded
+with `importlib.import_module()`, imported inside functions, or imported
+before collection started (like PyVows itself) aren't.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from contextlib import contextmanager
+import os
+import subprocess
+import sys
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+try:
+    from importlib.util import resolve_name
+except ImportError:
+    resolve_name = None
+
+from pyvows import cache
+
+#-------------------------------------------------------------------------------------------------
+
+INDEX_NAME = 'dependencies.json'
+INDEX_VERSION = 1
+
+
+def _source_file(filename):
+    filename = os.path.realpath(filename)
+    if filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+    return filename
+
+
+class DependencyIndex(object):
+    '''The import graph of a project's files.'''
+
+    def __init__(self, root=None, graph=None):
+        self.root = os.path.realpath(root or os.curdir)
+        self.graph = graph or {}
+        self._recorded = {}
+
+    @classmethod
+    def load(cls, root=None):
+        index = cls(root)
+        data = cache.load_json(INDEX_NAME, {}, root)
+        if data.get('version') == INDEX_VERSION:
+            index.graph = dict(
+                (index._absolute(importer), set(index._absolute(imported) for imported in imports))
+                for importer, imports in data.get('imports', {}).items()
+            )
+        return index
+
+    def save(self):
+        '''Adds what was recorded to the graph, and saves it.'''
+        self.graph.update(self._recorded)
+        self._recorded = {}
+        return cache.save_json(INDEX_NAME, {
+            'version': INDEX_VERSION,
+            'imports': dict(
+                (self._relative(importer), sorted(self._relative(imported) for imported in imports))
+                for importer, imports in self.graph.items()
+            )
+        }, self.root)
+
+    def _absolute(self, path):
+        return os.path.normpath(os.path.join(self.root, path))
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.root)
+
+    def is_project_file(self, filename):
+        if not filename.startswith(self.root + os.sep):
+            return False
+        return 'site-packages' not in filename and 'dist-packages' not in filename
+
+    #-------------------------------------------------------------------------
+    #   Recording
+    #-------------------------------------------------------------------------
+    @contextmanager
+    def recording(self):
+        '''Records the imports done inside the `with` block.'''
+        original_import = builtins.__import__
+
+        def recording_import(name, globals=None, locals=None, fromlist=(), level=0):
+            module = original_import(name, globals, locals, fromlist, level)
+            try:
+                self.record_import(name, globals, fromlist, level)
+            except Exception:
+                pass  # never let bookkeeping break an import
+            return module
+
+        builtins.__import__ = recording_import
+        try:
+            yield self
+        finally:
+            builtins.__import__ = original_import
+
+    def record_suite(self, filename):
+        '''Adds the vows file `filename`, which is about to be imported.'''
+        self._recorded.setdefault(_source_file(filename), set())
+
+    def record_import(self, name, globals, fromlist, level):
+        importer = globals and globals.get('__file__')
+        if not importer:
+            return
+        importer = _source_file(importer)
+        if not self.is_project_file(importer):
+            return
+
+        if level:
+            if resolve_name is None:
+                return
+            name = resolve_name('.' * level + name, globals.get('__package__') or globals.get('__name__'))
+
+        parts = name.split('.')
+        names = ['.'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+        names.extend(name + '.' + item for item in fromlist or () if item != '*')
+
+        imports = self._recorded.setdefault(importer, set())
+        for module_name in names:
+            filename = getattr(sys.modules.get(module_name), '__file__', None)
+            if filename:
+                filename = _source_file(filename)
+                if filename != importer and self.is_project_file(filename):
+                    imports.add(filename)
+
+    #-------------------------------------------------------------------------
+    #   Selection
+    #-------------------------------------------------------------------------
+    def get_dependencies(self, filename):
+        '''Returns every file `filename` imports, directly or not.'''
+        dependencies = set()
+        pending = [_source_file(filename)]
+        while pending:
+            for imported in self.graph.get(pending.pop(), ()):
+                if imported not in dependencies:
+                    dependencies.add(imported)
+                    pending.append(imported)
+        return dependencies
+
+    def get_dependents(self, filenames):
+        '''Returns every file which imports one of `filenames`, directly or
+        not.'''
+        importers = {}
+        for importer, imports in self.graph.items():
+            for imported in imports:
+                importers.setdefault(imported, set()).add(importer)
+
+        dependents = set()
+        pending = [_source_file(filename) for filename in filenames]
+        while pending:
+            for importer in importers.get(pending.pop(), ()):
+                if importer not in dependents:
+                    dependents.add(importer)
+                    pending.append(importer)
+        return dependents
+
+    def get_affected_suites(self, suites, changed_files):
+        '''Returns the vows files of `suites` which may be affected by
+        `changed_files`: those which changed, import a changed file, or
+        aren't in the index yet.'''
+        changed = set(_source_file(filename) for filename in changed_files)
+        affected = []
+        for suite in suites:
+            suite_file = _source_file(suite)
+            if suite_file not in self.graph or suite_file in changed or self.get_dependencies(suite_file) & changed:
+                affected.append(suite)
+        return affected
+
+
+def get_changed_files(ref, cwd=None):
+    '''Returns the (absolute) paths of the files which changed since the git
+    revision `ref`, including untracked ones.'''
+    def git(*args):
+        output = subprocess.check_output(('git',) + args, cwd=cwd, stderr=subprocess.STDOUT)
+        return output.decode(sys.getfilesystemencoding() or 'utf-8').splitlines()
+
+    top_level = git('rev-parse', '--show-toplevel')[0]
+    names = git('diff', '--name-only', ref, '--')
+    names += git('ls-files', '--others', '--exclude-standard', '--full-name')
+    return sorted(set(os.path.join(top_level, name) for name in names if name))
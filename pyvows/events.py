@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+'''Events emitted by PyVows runners while a run is in progress.
+
+Reporters and other consumers subscribe to the events they're interested
+in, and see results as they're produced instead of waiting for the final
+`VowsResult`:
+
+    events = VowsEvents()
+    events.subscribe(VowsEvents.VOW_FINISHED, lambda vow, context: ...)
+    Vows.run(None, None, events=events)
+
+Listeners are called synchronously, from whichever greenlet, task or (for
+multi-process runs) the main process that produced the event, with:
+
+    CONTEXT_STARTED     (context)       before its setup and topic run
+    TOPIC_FINISHED      (context)       once its topic ran (or failed, or
+                                        was skipped); `topic_elapsed` is set
+    VOW_FINISHED        (vow, context)  with the complete vow result
+    CONTEXT_TORN_DOWN   (context)       once its vows, subcontexts and
+                                        teardown are all done
+    RUN_FINISHED        (result)        with the final `VowsResult`
+
+`context` and `vow` are the same dicts that end up in `VowsResult.contexts`.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import sys
+import traceback
+
+
+class VowsEvents(object):
+    '''Dispatches runner events to subscribed listeners.'''
+
+    CONTEXT_STARTED = 'context_started'
+    TOPIC_FINISHED = 'topic_finished'
+    VOW_FINISHED = 'vow_finished'
+    CONTEXT_TORN_DOWN = 'context_torn_down'
+    RUN_FINISHED = 'run_finished'
+
+    ALL = (CONTEXT_STARTED, TOPIC_FINISHED, VOW_FINISHED, CONTEXT_TORN_DOWN, RUN_FINISHED)
+
+    def __init__(self):
+        self.listeners = {}
+
+    def subscribe(self, event, listener):
+        if event not in self.ALL:
+            raise ValueError('Unknown event: {0!r}'.format(event))
+        self.listeners.setdefault(event, []).append(listener)
+
+    def unsubscribe(self, event, listener):
+        listeners = self.listeners.get(event, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if not listeners:
+            self.listeners.pop(event, None)
+
+    def emit(self, event, *args):
+        '''Calls every listener of `event`.  A failing listener is reported
+        on stderr; it doesn't affect the run or the other listeners.'''
+        listeners = self.listeners.get(event)
+        if not listeners:
+            return
+        for listener in listeners:
+            try:
+                listener(*args)
+            except Exception:
+                traceback.print_exc(file=sys.__stderr__)
+
+    def replay(self, ctx_result):
+        '''Emits the events of an already finished context tree, e.g. one
+        received from a worker process.'''
+        self.emit(self.CONTEXT_STARTED, ctx_result)
+        self.emit(self.TOPIC_FINISHED, ctx_result)
+        for vow_result in ctx_result['tests']:
+            self.emit(self.VOW_FINISHED, vow_result, ctx_result)
+        for subcontext in ctx_result['contexts']:
+            self.replay(subcontext)
+        self.emit(self.CONTEXT_TORN_DOWN, ctx_result)
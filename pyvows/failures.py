@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+'''Remembers which contexts and vows failed, so that they can be run again
+on their own (`--last-failed`) or before the rest (`--failed-first`).
+
+Failures are kept in `.pyvows_cache/failures.json` (see `pyvows.cache`),
+keyed like timings (see `pyvows.timings`): by suite (the vows file,
+relative to the project) and the dotted id of the execution plan, a vow id
+for a broken vow, a context id for an error in a context's setup, topic or
+teardown.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+
+from pyvows import cache
+from pyvows.events import VowsEvents
+
+#-------------------------------------------------------------------------------------------------
+
+FAILURES_NAME = 'failures.json'
+
+
+class FailureStore(object):
+    '''The contexts and vows which failed when they last ran, as `(suite,
+    id)` pairs.'''
+
+    def __init__(self, root=None, failures=None):
+        self.root = os.path.realpath(root or os.curdir)
+        self.failures = set(tuple(failure) for failure in failures or ())
+
+    @classmethod
+    def load(cls, root=None):
+        data = cache.load_json(FAILURES_NAME, {}, root)
+        # (older caches kept bare ids: those are dropped)
+        failures = [failure for failure in data.get('failed', ()) if isinstance(failure, list) and len(failure) == 2]
+        return cls(root, failures)
+
+    def save(self):
+        return cache.save_json(FAILURES_NAME, {'failed': sorted(self.failures)}, self.root)
+
+    def subscribe(self, events):
+        '''Saves the failures of every run `events` reports.'''
+        events.subscribe(VowsEvents.RUN_FINISHED, self.on_run_finished)
+
+    def on_run_finished(self, result):
+        self.record(result)
+        self.save()
+
+    def _suite_key(self, filename):
+        return os.path.relpath(os.path.realpath(filename), self.root)
+
+    def record(self, result):
+        '''Updates the failures with the outcome of `result`.  Failures of
+        contexts and vows which didn't run this time are kept.'''
+        ran, failed = set(), set()
+
+        def add_context(ctx_result, suite):
+            key = (suite, ctx_result['id'])
+            ran.add(key)
+            if ctx_result['error']:
+                failed.add(key)
+            for test in ctx_result['tests']:
+                key = (suite, ctx_result['id'] + '.' + test['name'])
+                ran.add(key)
+                if test['error']:
+                    failed.add(key)
+            for subcontext in ctx_result['contexts']:
+                add_context(subcontext, suite)
+
+        for ctx_result in result.contexts:
+            add_context(ctx_result, self._suite_key(ctx_result['filename']))
+
+        self.failures = (self.failures - ran) | failed
+
+    @property
+    def ids(self):
+        '''The failed contexts and vows, as `(suite path, id)` pairs (see
+        `ExecutionPlanner`'s `inclusion_ids`).'''
+        return set((os.path.join(self.root, suite), failed_id) for suite, failed_id in self.failures)
+
+    def get_batches(self):
+        '''Returns the `(suite, batch name)` pairs of the batches with
+        failures.'''
+        return set((suite, failed_id.split('.')[0]) for suite, failed_id in self.failures)
+
+    def order_batches(self, batches, key=None):
+        '''Sorts `batches` with failures first; the others keep their order.
+        Batches are `(suite, batch name)` pairs, or `key` returns that pair
+        for each of them.'''
+        failed_batches = self.get_batches()
+
+        def has_failed(batch):
+            suite, batch_name = key(batch) if key else batch
+            return (self._suite_key(suite), batch_name) in failed_batches
+        return sorted(batches, key=lambda batch: not has_failed(batch))
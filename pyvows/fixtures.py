@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+'''Fixtures shared by several contexts, e.g. a database server:
+
+    @Vows.fixture
+    def database():
+        server = start_database()
+        yield server
+        server.stop()
+
+    @Vows.batch
+    class Users(Vows.Context):
+        fixtures = ('database',)
+
+        def topic(self):
+            return self.database.query('select * from users')
+
+A fixture is created the first time a context listing it in `fixtures`
+runs (before its `setup`), and given to the context as an attribute.  A
+`session` fixture is then shared by every context of the run; a `module`
+fixture by those of the same vows file.  A `module` fixture is only seen
+by the contexts of the module declaring it, so that vows files may declare
+module fixtures of the same name.  A fixture is torn down (the code after
+its `yield` runs) once the last batch using it is done, or at the end of
+the run.
+
+With `--workers`, each worker process has fixtures of its own, torn down
+when the process exits.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import inspect
+import sys
+import traceback
+
+#-------------------------------------------------------------------------------------------------
+
+SCOPES = ('session', 'module')
+
+
+class Fixture(object):
+    '''A fixture's definition: `function` returns its value, or yields it
+    and then tears it down.'''
+
+    def __init__(self, function, scope='session', name=None):
+        if scope not in SCOPES:
+            raise ValueError('Unknown fixture scope: {0!r} (expected one of {1})'.format(scope, ', '.join(SCOPES)))
+        self.function = function
+        self.scope = scope
+        self.name = name or function.__name__
+        self.module = function.__module__
+
+    @property
+    def key(self):
+        '''The key of the fixture in `Vows.fixtures`: `(module, name)`, where
+        `module` is `None` for session fixtures.'''
+        return (self.module if self.scope == 'module' else None, self.name)
+
+    def create(self):
+        '''Returns the fixture's value, and the generator to resume to tear
+        it down (or `None`).'''
+        value = self.function()
+        if not inspect.isgenerator(value):
+            return value, None
+        generator = value
+        return next(generator), generator
+
+    def tear_down(self, generator):
+        if generator is None:
+            return
+        try:
+            next(generator)
+        except StopIteration:
+            return
+        raise RuntimeError('Fixture {0!r} yielded more than one value'.format(self.name))
+
+
+def get_fixture_names(ctx_class):
+    '''Returns the fixtures used by `ctx_class` and the contexts nested in
+    it, as `(name, module of the context using it)` pairs.'''
+    names = set()
+    pending, seen = [ctx_class], set()
+    while pending:
+        klass = pending.pop()
+        if klass in seen:
+            continue
+        seen.add(klass)
+        names.update((name, klass.__module__) for name in getattr(klass, 'fixtures', None) or ())
+        for name in dir(klass):
+            member = getattr(klass, name, None)
+            if not name.startswith('_') and inspect.isclass(member):
+                pending.append(member)
+    return names
+
+
+class FixtureManager(object):
+    '''Creates and tears down the fixtures (`Fixture`s, by `Fixture.key`)
+    of a run.
+
+    `plan()` is told which batches will run, so that a fixture can be torn
+    down as soon as `release()` was called for every batch using it.  With
+    `keep_alive`, fixtures are only torn down by `close()`.  `create_lock`
+    returns a lock (a semaphore of size 1) for `get_lock()`, or `None` if
+    contexts can't run concurrently.
+
+    '''
+
+    def __init__(self, fixtures=None):
+        self.fixtures = fixtures if fixtures is not None else {}
+        self.keep_alive = False
+        self.create_lock = lambda: None
+        self.users = {}
+        self.instances = {}
+        self.locks = {}
+        self.order = []
+
+    def _find(self, name, module):
+        '''Returns the fixture `name` for the contexts of `module`: its
+        module fixture of that name, or else the session one.'''
+        return self.fixtures.get((module, name)) or self.fixtures.get((None, name))
+
+    def _get_key(self, name, suite, module):
+        fixture = self._find(name, module)
+        if fixture is None:
+            raise LookupError('Unknown fixture: {0!r}'.format(name))
+        return fixture.key if fixture.scope == 'session' else fixture.key + (suite,)
+
+    def plan(self, batches):
+        '''Counts the batches (`(suite name, batch class)` pairs) using each
+        fixture.'''
+        for suite, batch in batches:
+            for name, module in get_fixture_names(batch):
+                if self._find(name, module) is not None:
+                    key = self._get_key(name, suite, module)
+                    self.users[key] = self.users.get(key, 0) + 1
+
+    def get_lock(self, name, suite, module):
+        '''Returns the lock to hold while calling `acquire()` for the fixture
+        `name` (so that it's only created once), or `None`.'''
+        key = self._get_key(name, suite, module)
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = self.create_lock()
+        return lock
+
+    def acquire(self, name, suite, module):
+        '''Returns the value of the fixture `name` for a context of `suite`
+        declared in `module`, creating it if needed.'''
+        key = self._get_key(name, suite, module)
+        instance = self.instances.get(key)
+        if instance is None:
+            fixture = self._find(name, module)
+            try:
+                value, generator = fixture.create()
+                instance = {'fixture': fixture, 'value': value, 'generator': generator, 'error': None}
+            except Exception:
+                # (failing once is enough: the next users get the same error)
+                instance = {'fixture': fixture, 'value': None, 'generator': None, 'error': sys.exc_info()[1]}
+            self.instances[key] = instance
+            self.order.append(key)
+
+        if instance['error'] is not None:
+            raise instance['error']
+        return instance['value']
+
+    def release(self, suite, batch):
+        '''Tears down the fixtures which were only used by `batch` and
+        other batches already done.  Raises the first teardown error, if
+        any.'''
+        if self.keep_alive:
+            return
+        done = []
+        for name, module in get_fixture_names(batch):
+            if self._find(name, module) is None:
+                continue
+            key = self._get_key(name, suite, module)
+            self.users[key] = self.users.get(key, 1) - 1
+            if self.users[key] <= 0:
+                done.append(key)
+        errors = self._tear_down(done)
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        '''Tears down every fixture still alive, reporting errors on
+        stderr.'''
+        for error in self._tear_down(list(self.order)):
+            traceback.print_exception(type(error), error, getattr(error, '__traceback__', None), file=sys.__stderr__)
+
+    def _tear_down(self, keys):
+        errors = []
+        for key in reversed([key for key in self.order if key in keys]):
+            instance = self.instances.pop(key)
+            self.order.remove(key)
+            self.locks.pop(key, None)
+            try:
+                instance['fixture'].tear_down(instance['generator'])
+            except Exception:
+                errors.append(sys.exc_info()[1])
+        return errors
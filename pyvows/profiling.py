@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+'''Measures where the time (and memory) of a PyVows run goes.'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from contextlib import contextmanager
+import cProfile
+import math
+import os
+import re
+import sys
+import time
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+from pyvows.utils import elapsed
+
+#-------------------------------------------------------------------------------------------------
+
+PYVOWS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, percent):
+    '''Returns the `percent` percentile (nearest rank) of the sorted
+    `values`, or `None` if there are none.'''
+    if not values:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+def format_size(size):
+    '''Returns `size` (in bytes) as a short, human-readable string.'''
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return '{0:.0f}{1}'.format(size, unit) if unit == 'B' else '{0:.1f}{1}'.format(size, unit)
+        size /= 1024.0
+    return '{0:.1f}GiB'.format(size)
+
+
+class ImportProfiler(object):
+    '''Measures how long importing each vows file takes while collecting.
+
+    With `trace_memory`, it also measures how much memory each import kept
+    allocated (using `tracemalloc`, which slows imports down).  With
+    `packages`, the first import of each top-level package (by vows files
+    or by what they import) is measured as well; a package's numbers
+    include the packages it imports itself.
+
+    Measures are dicts with the `path` (of a vows file) or `name` (of a
+    package), the `elapsed` time, and the `memory` growth (or `None`).
+
+    '''
+
+    def __init__(self, trace_memory=False, packages=False):
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self.packages = packages
+        self.modules = []
+        self.package_times = []
+        self._started_tracing = False
+        self._importing_suite = False
+
+    @contextmanager
+    def profiling(self):
+        '''Profiles the imports done inside the `with` block.'''
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        original_import = builtins.__import__
+        if self.packages:
+            builtins.__import__ = self._wrap_import(original_import)
+        try:
+            yield self
+        finally:
+            builtins.__import__ = original_import
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def _memory(self):
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+
+    @contextmanager
+    def _measure(self, measures, key, value):
+        start_time, start_memory = time.time(), self._memory()
+        measure = {key: value, 'elapsed': 0.0, 'memory': None}
+        yield measure
+        # (failed imports aren't kept)
+        measure['elapsed'] = elapsed(start_time)
+        if start_memory is not None:
+            measure['memory'] = self._memory() - start_memory
+        measures.append(measure)
+
+    def measure(self, path):
+        '''Measures the import of the vows file `path`.'''
+        # the vows file's own import isn't a package import
+        self._importing_suite = True
+        return self._measure(self.modules, 'path', path)
+
+    def _wrap_import(self, original_import):
+        def profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+            package = name.partition('.')[0]
+            importing_suite, self._importing_suite = self._importing_suite, False
+            if importing_suite or level or not package or package in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            with self._measure(self.package_times, 'name', package):
+                return original_import(name, globals, locals, fromlist, level)
+        return profiled_import
+
+
+class CodeProfiler(object):
+    '''Runs the setup, topic and vows of the contexts whose id matches one
+    of `patterns` (regular expressions, like `--include`'s) under `cProfile`,
+    and writes one `.pstats` file per context in `directory`.
+
+    Only one profile can be collecting at a time.  With greenlets, a
+    context's profile is paused whenever its greenlet switches out, so that
+    concurrent contexts don't show up in it.  Other steps (e.g. of
+    `asyncio` tasks) starting while a profile is collecting aren't
+    profiled, and those that run while a profiled step awaits are included
+    in its profile.
+
+    '''
+
+    def __init__(self, patterns, directory):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.directory = directory
+        self.profiles = {}
+        self._running = None
+        self._greenlet_profiles = {}
+        self._previous_tracer = None
+
+    def matches(self, context_id):
+        return any(pattern.search(context_id) for pattern in self.patterns)
+
+    @contextmanager
+    def tracing_greenlets(self):
+        '''Pauses profiles on greenlet switches inside the `with` block.'''
+        if greenlet is None:
+            yield
+            return
+        self._previous_tracer = greenlet.settrace(self._on_greenlet_switch)
+        try:
+            yield
+        finally:
+            greenlet.settrace(self._previous_tracer)
+            self._previous_tracer = None
+
+    def _on_greenlet_switch(self, event, args):
+        if event in ('switch', 'throw'):
+            origin, target = args
+            if self._running is not None and self._greenlet_profiles.get(origin) is self._running:
+                self._running.disable()
+                self._running = None
+            profile = self._greenlet_profiles.get(target)
+            if profile is not None and self._running is None:
+                profile.enable()
+                self._running = profile
+        if self._previous_tracer is not None:
+            self._previous_tracer(event, args)
+
+    @contextmanager
+    def profile(self, suite, context_id):
+        '''Profiles the `with` block, if `context_id` is selected.'''
+        if not self.matches(context_id) or self._running is not None:
+            yield
+            return
+
+        key = (suite, context_id)
+        profile = self.profiles.get(key)
+        if profile is None:
+            profile = self.profiles[key] = cProfile.Profile()
+        current = greenlet.getcurrent() if greenlet is not None else None
+
+        self._greenlet_profiles[current] = profile
+        self._running = profile
+        profile.enable()
+        try:
+            yield
+        finally:
+            if self._running is profile:
+                profile.disable()
+                self._running = None
+            self._greenlet_profiles.pop(current, None)
+
+    def get_filename(self, suite, context_id):
+        suite_name = os.path.splitext(os.path.basename(suite or ''))[0]
+        return os.path.join(self.directory, '{0}.{1}.pstats'.format(suite_name, context_id).lstrip('.'))
+
+    def save(self):
+        '''Writes the profiles collected so far, and returns their paths.'''
+        if not self.profiles:
+            return []
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        filenames = []
+        for (suite, context_id), profile in sorted(self.profiles.items()):
+            filename = self.get_filename(suite, context_id)
+            profile.dump_stats(filename)
+            filenames.append(filename)
+        return filenames
+
+
+class MemoryProfiler(object):
+    '''Measures (with `tracemalloc`) how much memory each context uses.
+
+    Each context result gets a `memory` dict: its `retained` memory is
+    what its setup and topic kept allocated (e.g. a fixture), a signed
+    delta which is negative when they freed more than they kept, and its
+    `peak` is the most memory any of its steps (setup, topic or a vow)
+    needed at once.  `tracemalloc` traces the whole process, so steps
+    running concurrently with others would be measured along with them:
+    `pyvows --profile-memory` uses the sequential runner.
+
+    The lines which allocated most of the memory still in use at the end
+    of the run (outside of PyVows itself) are kept in `top_allocators`; with `--workers`, those of
+    each worker process are `merge()`d.
+
+    '''
+
+    def __init__(self, number=50):
+        self.number = number
+        self.top_allocators = []
+        self._start_snapshot = None
+
+    @contextmanager
+    def tracing(self):
+        '''Traces memory inside the `with` block.'''
+        if tracemalloc is None:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        self._start_snapshot = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            self.top_allocators = self.get_top_allocators(tracemalloc.take_snapshot())
+            if started_tracing:
+                tracemalloc.stop()
+
+    def get_top_allocators(self, snapshot):
+        ignored = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<unknown>'),
+            tracemalloc.Filter(False, '<frozen importlib*'),
+            tracemalloc.Filter(False, os.path.join(PYVOWS_DIRECTORY, '*')),
+        ]
+        snapshot = snapshot.filter_traces(ignored)
+        allocators = []
+        for stat in snapshot.compare_to(self._start_snapshot.filter_traces(ignored), 'lineno'):
+            if len(allocators) == self.number:
+                break
+            if stat.size_diff <= 0:
+                continue
+            filename = stat.traceback[0].filename
+            allocators.append({
+                'file': filename,
+                'lineno': stat.traceback[0].lineno,
+                'size': stat.size_diff,
+                'count': stat.count_diff,
+            })
+        return allocators
+
+    def merge(self, allocators):
+        '''Adds `allocators` (the `top_allocators` of another process) to
+        `top_allocators`.'''
+        merged = dict(((allocator['file'], allocator['lineno']), dict(allocator)) for allocator in self.top_allocators)
+        for allocator in allocators:
+            key = (allocator['file'], allocator['lineno'])
+            if key in merged:
+                merged[key]['size'] += allocator['size']
+                merged[key]['count'] += allocator['count']
+            else:
+                merged[key] = dict(allocator)
+        self.top_allocators = sorted(merged.values(), key=lambda allocator: allocator['size'], reverse=True)
+        del self.top_allocators[self.number:]
+
+    @contextmanager
+    def measure(self, ctx_result, step):
+        '''Measures the `step` ('setup', 'topic' or 'vow') of the context
+        of `ctx_result`, run inside the `with` block.'''
+        if tracemalloc is None or not tracemalloc.is_tracing():
+            yield
+            return
+
+        start = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if not hasattr(tracemalloc, 'reset_peak'):
+                peak = current
+            memory = ctx_result['memory']
+            if memory is None:
+                memory = ctx_result['memory'] = {'peak': 0, 'retained': 0}
+            memory['peak'] = max(memory['peak'], peak - start)
+            if step != 'vow':
+                memory['retained'] += current - start
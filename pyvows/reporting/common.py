@@ -12,10 +12,10 @@ have been run.
 from __future__ import division, print_function
 
 import re
-import traceback
 import sys
 
 from pyvows.color import yellow, green, red, bold
+from pyvows.utils import format_exception
 
 __all__ = [
     'PROGRESS_SIZE',
@@ -177,7 +177,7 @@ class VowsReporter(object):
         print(self.indent_msg(red(error_msg)), file=file)
 
         if self.verbosity >= V_NORMAL:
-            traceback_msg = traceback.format_exception(err_type, err_obj, err_traceback)
+            traceback_msg = format_exception(err_type, err_obj, err_traceback)
             traceback_msg = self.format_traceback(traceback_msg)
             traceback_msg = '\n{traceback}'.format(traceback=traceback_msg)
             traceback_msg = self.indent_msg(yellow(traceback_msg))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+'''Provides the `JSONLinesReporter` class, which writes results as JSON Lines
+while the vows run.
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import json
+
+from pyvows.events import VowsEvents
+from pyvows.runner.abc import VowsTopicError
+
+HONORED = 'honored'
+BROKEN = 'broken'
+SKIPPED = 'skipped'
+
+
+class JSONLinesReporter(object):
+    '''Writes one compact JSON record per line to `stream`: a `vow` record
+    as each vow finishes, a `context` record as each context is torn down,
+    and a final `run` record with the totals.
+
+    Records are identified by the dotted ids of the execution plan (e.g.
+    `Batch.Context.vow_name`).  Vows of generated topics share their id,
+    once per generated value.
+
+    '''
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def subscribe(self, events):
+        '''Starts writing records for the runs published on `events`.'''
+        events.subscribe(VowsEvents.VOW_FINISHED, self.on_vow_finished)
+        events.subscribe(VowsEvents.CONTEXT_TORN_DOWN, self.on_context_torn_down)
+        events.subscribe(VowsEvents.RUN_FINISHED, self.on_run_finished)
+
+    def write_record(self, record):
+        self.stream.write(json.dumps(record, separators=(',', ':'), default=repr) + '\n')
+
+    def on_vow_finished(self, vow, context):
+        self.write_record(self.vow_record(vow, context))
+
+    def on_context_torn_down(self, context):
+        self.write_record(self.context_record(context))
+        self.stream.flush()
+
+    def on_run_finished(self, result):
+        self.write_record({
+            'type': 'run',
+            'status': BROKEN if result.errored_tests else HONORED,
+            'honored': result.successful_tests,
+            'broken': result.errored_tests,
+            'skipped': result.skipped_tests,
+            'elapsed': result.elapsed_time,
+        })
+        self.stream.flush()
+
+    def vow_record(self, vow, context):
+        if vow['error']:
+            status = BROKEN
+        elif vow['skip']:
+            status = SKIPPED
+        else:
+            status = HONORED
+
+        context_id = context['id'] if context else None
+        vow_id = vow.get('id')
+        if vow_id is None:
+            vow_id = '{0}.{1}'.format(context_id, vow['name']) if context_id else vow['name']
+        return {
+            'type': 'vow',
+            'id': vow_id,
+            'context': context_id,
+            'name': vow['name'],
+            'status': status,
+            'elapsed': vow['elapsed'],
+            'file': vow['file'],
+            'lineno': vow['lineno'],
+            'enumerated': vow['enumerated'],
+            'error': self.error_info(vow['error']['type'], vow['error']['value']) if vow['error'] else None,
+            'skip': str(vow['skip']) if vow['skip'] else None,
+        }
+
+    def context_record(self, context):
+        error = context['error']
+        if error:
+            status = BROKEN
+        elif context['skip']:
+            status = SKIPPED
+        else:
+            status = HONORED
+
+        if isinstance(error, VowsTopicError):
+            error_info = self.error_info(error.exc_info[0], error.exc_info[1])
+            error_info['source'] = error.source
+        elif error is not None:
+            error_info = self.error_info(type(error), error)
+        else:
+            error_info = None
+
+        counts = context['counts']
+        return {
+            'type': 'context',
+            'id': context['id'],
+            'name': context['name'],
+            'status': status,
+            'setup_elapsed': context.get('setup_elapsed', 0),
+            'topic_elapsed': context['topic_elapsed'],
+            'teardown_elapsed': context.get('teardown_elapsed', 0),
+            'elapsed': context.get('elapsed', 0),
+            'memory': context.get('memory'),
+            'file': context['filename'],
+            'honored': counts.successful,
+            'broken': counts.errored,
+            'skipped': counts.skipped,
+            'error': error_info,
+            'skip': str(context['skip']) if context['skip'] else None,
+        }
+
+    def error_info(self, err_type, err_value):
+        return {
+            'type': getattr(err_type, '__name__', str(err_type)),
+            'message': str(err_value),
+        }
@@ -13,25 +13,33 @@ from __future__ import division
 import os
 
 from pyvows.color import yellow, blue, dim, green, white
+from pyvows.profiling import format_size
 from pyvows.reporting.common import (
     VowsReporter,)
 
 
 class VowsProfileReporter(VowsReporter):
-    '''A VowsReporter which prints a profile of the 10 slowest topics.'''
+    '''A VowsReporter which prints a profile of the slowest topics and
+    steps (setups, topics, vows and teardowns), the time spent per batch
+    and per file, and of the collection of vows files.'''
 
-    def print_profile(self, threshold):
-        '''Prints the 10 slowest topics that took longer than `threshold`
-        to test.
-        '''
-
-        '''Prints the 10 slowest topics that took longer than
-        `threshold` to test.
+    def shorten_path(self, path, size):
+        '''Returns `path`, or its last directories (those fitting in `size`
+        characters) after an ellipsis if it's longer.'''
+        if len(path) <= size:
+            return path
+        end = path[-(size - 3):]
+        if os.sep in end:
+            end = end[end.index(os.sep):]
+        return '...' + end
 
+    def print_profile(self, threshold, number=10):
+        '''Prints the `number` slowest topics and steps that took longer
+        than `threshold` to test, the batches and files which took
+        longest, and percentiles of the time of each kind of step.
         '''
-
         MAX_PATH_SIZE = 40
-        topics = self.result.get_worst_topics(number=10, threshold=threshold)
+        topics = self.result.get_worst_topics(number=number, threshold=threshold)
 
         if topics:
             print(self.header('Slowest Topics'))
@@ -77,3 +85,207 @@ class VowsProfileReporter(VowsReporter):
                     )
 
             print()
+
+        self.print_step_profile(threshold, number)
+        self.print_aggregated_profile(number)
+
+    def print_step_profile(self, threshold, number=10):
+        '''Prints the `number` slowest steps that took longer than
+        `threshold`, and a summary of each kind of step.
+        '''
+        MAX_NAME_SIZE = 50
+        steps = self.result.get_worst_steps(number=number, threshold=threshold)
+        current_dir = os.path.abspath(os.curdir)
+
+        if steps:
+            print(self.header('Slowest Steps'))
+
+            table_header = yellow('  {0}'.format(dim('#')))
+            table_header += yellow('  Elapsed     Step        Context File Path / Name')
+            print(table_header)
+
+            for index, step in enumerate(steps):
+                path = os.path.relpath(os.path.realpath(step['path']), current_dir)
+                name = step['context'] if step['phase'] != 'vow' else step['context'] + '.' + step['name']
+                print(
+                    ' {number}  {time}{0}{phase}{0}{path}'.format(
+                        4 * ' ',
+                        number=blue('{number:#2}'.format(number=index + 1)),
+                        time=green('{time:.05f}s'.format(time=step['elapsed'])),
+                        phase=white('{phase:<8}'.format(phase=step['phase'])),
+                        path=dim(white('{0}  {1}'.format(path, name[-MAX_NAME_SIZE:]))))
+                    )
+
+            print()
+
+        summary = self.result.get_step_percentiles()
+        if summary:
+            print(self.header('Step Percentiles'))
+
+            percents = [percent for percent, _ in summary[0]['percentiles']]
+            table_header = yellow('  Step        Count       Total')
+            for percent in percents:
+                table_header += yellow('{0:>12}'.format('p{0}'.format(percent)))
+            table_header += yellow('         Max')
+            print(table_header)
+
+            for phase in summary:
+                times = [phase['total']] + [value for _, value in phase['percentiles']] + [phase['max']]
+                print('  {phase}{count}{times}'.format(
+                    phase=white('{0:<8}'.format(phase['phase'])),
+                    count=blue('{0:>9}'.format(phase['count'])),
+                    times=''.join(green('{0:>11.05f}s'.format(time)) for time in times)
+                ))
+
+            print()
+
+    def print_aggregated_profile(self, number=10):
+        '''Prints the `number` batches and files which took longest,
+        adding up the time of all their steps.
+        '''
+        current_dir = os.path.abspath(os.curdir)
+        tables = (
+            ('Slowest Batches', 'Batch', 'batch', lambda name: name),
+            ('Slowest Files', 'Vows File Path', 'path',
+             lambda path: os.path.relpath(os.path.realpath(path), current_dir)),
+        )
+        for title, column, key, format_name in tables:
+            times = self.result.get_times_per(key, number=number)
+            if not times:
+                continue
+
+            print(self.header(title))
+
+            table_header = yellow('  {0}'.format(dim('#')))
+            table_header += yellow('  Elapsed         Steps    {0}'.format(column))
+            print(table_header)
+
+            for index, total in enumerate(times):
+                print(
+                    ' {number}  {time}{0}{steps}{0}{name}'.format(
+                        4 * ' ',
+                        number=blue('{number:#2}'.format(number=index + 1)),
+                        time=green('{time:.05f}s'.format(time=total['elapsed'])),
+                        steps=white('{steps:>9}'.format(steps=total['steps'])),
+                        name=dim(white(format_name(total['name']))))
+                    )
+
+            print()
+
+    def print_import_profile(self, threshold, number=10):
+        '''Prints the `number` slowest vows files to import, among those
+        that took longer than `threshold`.
+        '''
+        MAX_PATH_SIZE = 60
+        imports = self.result.get_slowest_imports(number=number, threshold=threshold)
+
+        if imports:
+            print(self.header('Slowest Imports'))
+
+            table_header = yellow('  {0}'.format(dim('#')))
+            table_header += yellow('  Elapsed     Vows File Path')
+            print(table_header)
+
+            for index, module in enumerate(imports):
+                path = os.path.relpath(os.path.realpath(module['path']), os.path.abspath(os.curdir))
+                print(
+                    ' {number}  {time}{0}{path}'.format(
+                        4 * ' ',
+                        number=blue('{number:#2}'.format(number=index + 1)),
+                        time=green('{time:.05f}s'.format(time=module['elapsed'])),
+                        path=dim(white(path[-MAX_PATH_SIZE:])))
+                    )
+
+            print()
+
+    def print_collection_profile(self, number=10):
+        '''Prints the `number` slowest vows files to import (and imported
+        packages, if they were profiled), with the memory they kept.
+        '''
+        modules = sorted(self.result.import_times, key=lambda x: x['elapsed'], reverse=True)
+        packages = sorted(self.result.package_import_times, key=lambda x: x['elapsed'], reverse=True)
+
+        print(self.header('Collection Profile'))
+        print('  {0} vows files imported in {1:.05f}s'.format(
+            len(modules), sum(module['elapsed'] for module in modules)))
+        print()
+
+        current_dir = os.path.abspath(os.curdir)
+        self._print_import_table(
+            'Vows File Path',
+            [(module, os.path.relpath(os.path.realpath(module['path']), current_dir)) for module in modules[:number]]
+        )
+        if packages:
+            self._print_import_table('Package', [(package, package['name']) for package in packages[:number]])
+
+    def _print_import_table(self, title, rows):
+        MAX_NAME_SIZE = 60
+
+        table_header = yellow('  {0}'.format(dim('#')))
+        table_header += yellow('  Elapsed       Memory    {0}'.format(title))
+        print(table_header)
+
+        for index, (measure, name) in enumerate(rows):
+            memory = '-' if measure['memory'] is None else format_size(measure['memory'])
+            print(
+                ' {number}  {time}{0}{memory}{0}{name}'.format(
+                    4 * ' ',
+                    number=blue('{number:#2}'.format(number=index + 1)),
+                    time=green('{time:.05f}s'.format(time=measure['elapsed'])),
+                    memory=white('{memory:>9}'.format(memory=memory)),
+                    name=dim(white(name[-MAX_NAME_SIZE:])))
+                )
+
+        print()
+
+    def print_memory_profile(self, number=10):
+        '''Prints the `number` contexts which needed the most memory, and
+        the lines which allocated the most memory still in use.
+        '''
+        MAX_PATH_SIZE = 50
+        current_dir = os.path.abspath(os.curdir)
+        contexts = self.result.get_memory_hungriest(number=number)
+
+        if contexts:
+            print(self.header('Memory Hungriest Contexts'))
+
+            table_header = yellow('  {0}'.format(dim('#')))
+            table_header += yellow('       Peak     Retained    Context File Path / Name')
+            print(table_header)
+
+            for index, context in enumerate(contexts):
+                path = os.path.relpath(os.path.realpath(context['path']), current_dir)
+                print(
+                    ' {number}  {peak}  {retained}{0}{path}'.format(
+                        4 * ' ',
+                        number=blue('{number:#2}'.format(number=index + 1)),
+                        peak=green('{0:>9}'.format(format_size(context['peak']))),
+                        retained=green('{0:>11}'.format(format_size(context['retained']))),
+                        path=dim(white('{0}  {1}'.format(path, context['context'])))
+                    )
+                )
+
+            print()
+
+        allocators = self.result.top_allocators[:number]
+        if allocators:
+            print(self.header('Top Allocators'))
+
+            table_header = yellow('  {0}'.format(dim('#')))
+            table_header += yellow('       Size       Blocks    Line')
+            print(table_header)
+
+            for index, allocator in enumerate(allocators):
+                line = '{0}:{1}'.format(
+                    os.path.relpath(os.path.realpath(allocator['file']), current_dir), allocator['lineno'])
+                print(
+                    ' {number}  {size}  {count}{0}{line}'.format(
+                        4 * ' ',
+                        number=blue('{number:#2}'.format(number=index + 1)),
+                        size=green('{0:>9}'.format(format_size(allocator['size']))),
+                        count=white('{0:>11}'.format(allocator['count'])),
+                        line=dim(white(self.shorten_path(line, MAX_PATH_SIZE)))
+                    )
+                )
+
+            print()
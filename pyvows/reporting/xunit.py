@@ -12,9 +12,15 @@
 import codecs
 from datetime import datetime
 import socket
-import traceback
 from xml.dom.minidom import Document
 import re
+import sys
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+from pyvows.utils import format_exception
 
 INVALID_CHARACTERS = re.compile(r"[\000-\010\013\014\016-\037]")
 INVALID_CHARACTERS = re.compile(r"[\000]")
@@ -27,14 +33,47 @@ class XUnitReporter(object):
         self.result_summary = self.summarize_results(result)
 
     def write_report(self, filename, encoding=None):
-        #   FIXME: Add Docstring
+        '''Writes the report to `filename`.  Elements are streamed to the
+        file as contexts are walked, so the whole document is never held in
+        memory.'''
         with codecs.open(filename, 'w', encoding, 'replace') as output_file:
-            output_file.write(self.to_xml(encoding))
+            self.write_xml(output_file, encoding)
 
     def to_xml(self, encoding='utf-8'):
-        #   FIXME: Add Docstring
-        document = self.create_report_document()
-        return document.toxml(encoding=encoding)
+        '''Returns the report as a string (encoded as `encoding`, if given).'''
+        output = StringIO()
+        self.write_xml(output, encoding)
+        xml = output.getvalue()
+        if encoding:
+            return xml.encode(encoding, 'xmlcharrefreplace')
+        return xml
+
+    def write_xml(self, writer, encoding=None):
+        '''Writes the report to `writer` (anything with a `write()` method),
+        one element at a time.  The output is the same as serializing
+        `create_report_document()`.'''
+        result_summary = self.result_summary
+
+        if encoding:
+            writer.write('<?xml version="1.0" encoding="{0}"?>'.format(encoding))
+        else:
+            writer.write('<?xml version="1.0" ?>')
+
+        writer.write(self._start_tag('testsuite', [
+            ('name', 'pyvows'),
+            ('tests', str(result_summary['total'])),
+            ('errors', str(result_summary['errors'])),
+            ('failures', str(result_summary['failures'])),
+            ('skip', str(result_summary['skip'])),
+            ('timestamp', str(result_summary['ts'])),
+            ('hostname', str(result_summary['hostname'])),
+            ('time', '{elapsed:.3f}'.format(elapsed=result_summary['elapsed'])),
+        ], empty=not result_summary['contexts']))
+
+        if result_summary['contexts']:
+            for context in result_summary['contexts']:
+                self.write_test_case_elements(writer, context)
+            writer.write('</testsuite>')
 
     def summarize_results(self, result):
         #   FIXME: Add Docstring
@@ -72,8 +111,83 @@ class XUnitReporter(object):
 
         return document
 
-    def _safe_cdata(self, str):
-        return INVALID_CHARACTERS.sub('', str)
+    def _safe_cdata(self, data):
+        # captured output is read back from the runner's buffers here
+        return INVALID_CHARACTERS.sub('', u'{0}'.format(data))
+
+    def _escape(self, data):
+        return data.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+    def _start_tag(self, name, attributes, empty=False):
+        tag = ['<', name]
+        if sys.version_info < (3, 8):
+            # (as `minidom` wrote them before Python 3.8)
+            attributes = sorted(attributes)
+        for attribute, value in attributes:
+            tag.append(' {0}="{1}"'.format(attribute, self._escape(value)))
+        tag.append('/>' if empty else '>')
+        return ''.join(tag)
+
+    def _output_elements(self, stdout, stderr):
+        # `]]>` can't appear inside a CDATA section, so split it in two
+        return ''.join(
+            '<{0}><![CDATA[{1}]]></{0}>'.format(name, self._safe_cdata(data).replace(']]>', ']]]]><![CDATA[>'))
+            for name, data in (('system-out', stdout), ('system-err', stderr))
+        )
+
+    def _failure_element(self, errtype, message, text):
+        start = self._start_tag('failure', [('type', errtype), ('message', message)], empty=not text)
+        return start + self._escape(text) + '</failure>' if text else start
+
+    def _skipped_element(self, message):
+        return self._start_tag('skipped', [('message', message)], empty=True)
+
+    def write_test_case_elements(self, writer, context):
+        '''Writes the `testcase` elements for `context` (its topic and its
+        vows), then those of its subcontexts.'''
+        topic_node = [
+            self._start_tag('testcase', [('classname', context['name']), ('name', 'topic'), ('time', '0.0')]),
+            self._output_elements(context['stdout'], context['stderr'])
+        ]
+        if context.get('error', None):
+            e = context['error']
+            error_msg = 'Error in {0!s}: {1!s}'.format(e.source, e.exc_info[1])
+            error_tb = format_exception(*e.exc_info)
+            topic_node.append(self._failure_element(e.exc_info[0].__name__, error_msg, ''.join(error_tb)))
+        if context.get('skip', None):
+            topic_node.append(self._skipped_element(str(context['skip'])))
+        topic_node.append('</testcase>')
+        writer.write(''.join(topic_node))
+
+        for test in context['tests']:
+            testcase_node = [
+                self._start_tag('testcase', [
+                    ('classname', str(context['name'])),
+                    ('name', str(test['name'])),
+                    ('time', '{time:.3f}'.format(time=0.0))
+                ]),
+                self._output_elements(test['stdout'], test['stderr'])
+            ]
+            if test.get('error', None):
+                error = test['error']
+                error_msg = format_exception(
+                    error['type'],
+                    error['value'],
+                    error['traceback']
+                )
+                testcase_node.append(self._failure_element(
+                    str(error['type'].__name__),
+                    str(error['value']),
+                    str(''.join(error_msg))
+                ))
+            if test.get('skip', None):
+                testcase_node.append(self._skipped_element(str(test['skip'])))
+            testcase_node.append('</testcase>')
+            writer.write(''.join(testcase_node))
+
+        for ctx in context['contexts']:
+            self.write_test_case_elements(writer, ctx)
+
 
     def create_test_case_elements(self, document, parent_node, context):
         #   FIXME: Add Docstring
@@ -94,7 +208,7 @@ class XUnitReporter(object):
         if context.get('error', None):
             e = context['error']
             error_msg = 'Error in {0!s}: {1!s}'.format(e.source, e.exc_info[1])
-            error_tb = traceback.format_exception(*e.exc_info)
+            error_tb = format_exception(*e.exc_info)
 
             failure_node = document.createElement('failure')
             failure_node.setAttribute('type', e.exc_info[0].__name__)
@@ -134,7 +248,7 @@ class XUnitReporter(object):
 
             if test.get('error', None):
                 error = test['error']
-                error_msg = traceback.format_exception(
+                error_msg = format_exception(
                     error['type'],
                     error['value'],
                     error['traceback']
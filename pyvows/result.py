@@ -11,9 +11,147 @@ each vow.
 # http://www.opensource.org/licenses/mit-license
 # Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
 
+from pyvows.profiling import percentile
+
 #-------------------------------------------------------------------------------
 
 
+class _Slotted(object):
+    '''Pickles the `__slots__` of subclasses (which Python 2 only does
+    with pickle protocol 2).'''
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        return dict((key, getattr(self, key)) for key in self.__slots__)
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+
+class VowsCounts(_Slotted):
+    '''Running totals of honored, broken and skipped vows (contexts
+    count as vows too) for a context and everything inside it.
+
+    Runners `add()` each vow and context result once it's final; totals
+    are also added to the `parent` counts, so that every ancestor (and
+    `VowsResult` itself) is always up to date.
+
+    '''
+    __slots__ = ('successful', 'errored', 'skipped', 'parent')
+
+    def __init__(self, parent=None):
+        self.successful = 0
+        self.errored = 0
+        self.skipped = 0
+        self.parent = parent
+
+    def add(self, item):
+        '''Counts `item`, a finished vow or context result.'''
+        successful = 0 if (item['error'] or item['skip']) else 1
+        errored = 1 if item['error'] else 0
+        skipped = 1 if item['skip'] else 0
+
+        counts = self
+        while counts is not None:
+            counts.successful += successful
+            counts.errored += errored
+            counts.skipped += skipped
+            counts = counts.parent
+
+    def merge(self, other):
+        '''Adds the totals of `other` (counts of a context computed
+        elsewhere, e.g. by a worker process), and makes this its parent.'''
+        counts = self
+        while counts is not None:
+            counts.successful += other.successful
+            counts.errored += other.errored
+            counts.skipped += other.skipped
+            counts = counts.parent
+        other.parent = self
+
+
+class _PortableContext(object):
+    '''Stands in for a `Vows.Context` instance in results which no longer
+    reference it.  Keeps only what reporters need.'''
+
+    def __init__(self, generated_topic):
+        self.generated_topic = generated_topic
+
+
+class VowResult(_Slotted):
+    '''The outcome of a single vow.
+
+    Results used to be plain dicts, and are still read and written like one
+    (`result['error']`, `result.get('skip')`, `'file' in result`), but each
+    key is a slot, so a result takes a fraction of a dict's memory.
+
+    '''
+    __slots__ = ('context_instance', 'id', 'name', 'enumerated', 'result', 'topic', 'error', 'skip', 'succeeded',
+                 'file', 'lineno', 'elapsed', 'stdout', 'stderr')
+
+    KEYS = frozenset(__slots__)
+
+    def __init__(self, context_instance, name, enumerated, topic, file, lineno, vow_id=None):
+        self.context_instance = context_instance
+        self.id = vow_id
+        self.name = name
+        self.enumerated = enumerated
+        self.result = None
+        self.topic = topic
+        self.error = None
+        self.skip = None
+        self.succeeded = False
+        self.file = file
+        self.lineno = lineno
+        self.elapsed = 0
+        self.stdout = ''
+        self.stderr = ''
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def get(self, key, default=None):
+        if key not in self.KEYS:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def release(self):
+        '''Drops the references to the context instance, the topic and the
+        vow's return value, keeping what reporters use: whether the topic
+        was generated and, if so, the `repr()` of this vow's topic value.'''
+        generated_topic = getattr(self.context_instance, 'generated_topic', False)
+        self.context_instance = _PortableContext(generated_topic)
+        self.topic = repr(self.topic) if self.enumerated else None
+        self.result = None
+
+
+STEP_PHASES = ('setup', 'topic', 'vow', 'teardown')
+
+
 class VowsResult(object):
     '''Collects success/failure/total statistics (as well as elapsed
     time) for the outcomes of tests.
@@ -25,26 +163,10 @@ class VowsResult(object):
     def __init__(self):
         self.contexts = []
         self.elapsed_time = 0.0
-
-    def _count_contexts(self, contexts=None, count_func=lambda context: 1):
-        '''Used interally for class properties
-        `total_test_count`, `successful_tests`, and `errored_tests`.
-
-        '''
-        #   TODO
-        #       Reevaluate whether `count_func` should have a default value
-        #       (AFAICT the default is never used. It makes more sense
-        #       to me if it had no default, or defaulted to `None`.
-        context_count = 0
-
-        for context in contexts:
-            context_count += count_func(context)
-            context_count += self._count_contexts(
-                contexts=context['contexts'],
-                count_func=count_func
-            )
-
-        return context_count
+        self.counts = VowsCounts()
+        self.import_times = []
+        self.package_import_times = []
+        self.top_allocators = []
 
     def _get_topic_times(self, contexts=None):
         '''Returns a dict describing how long testing took for
@@ -84,44 +206,49 @@ class VowsResult(object):
     def test_is_successful(test):
         return not (test['error'] or test['skip'])
 
+    def _get_counts(self):
+        '''Returns the counts kept by the runner or, if they were never fed
+        (e.g. `contexts` was filled by hand), counts `contexts` again.'''
+        counts = self.counts
+        if counts.successful or counts.errored or counts.skipped or not self.contexts:
+            return counts
+
+        counts = VowsCounts()
+
+        def add_context(context):
+            for item in [context] + list(context['tests']):
+                counts.add({'error': item.get('error'), 'skip': item.get('skip')})
+            for subcontext in context['contexts']:
+                add_context(subcontext)
+
+        for context in self.contexts:
+            add_context(context)
+        return counts
+
     @property
     def successful_tests(self):
         '''Returns the number of tests that passed.'''
-        return self._count_contexts(
-            contexts=self.contexts,
-            count_func=lambda context: (
-                len([t for t in context['tests'] if self.test_is_successful(t)])
-                + (0 if (context['error'] or context['skip']) else 1)
-            )
-        )
+        return self._get_counts().successful
 
     @property
     def errored_tests(self):
         '''Returns the number of tests that failed.'''
-        return self._count_contexts(
-            contexts=self.contexts,
-            count_func=lambda context: (
-                len([t for t in context['tests'] if t['error']])
-                + (1 if context['error'] else 0)
-            )
-        )
+        return self._get_counts().errored
 
     @property
     def skipped_tests(self):
         '''Returns the number of tests that were skipped'''
-        return self._count_contexts(
-            contexts=self.contexts,
-            count_func=lambda context: (
-                len([t for t in context['tests'] if t['skip']])
-                + (1 if context['skip'] else 0)
-            )
-        )
+        return self._get_counts().skipped
 
     def eval_context(self, context):
         '''Returns a boolean indicating whether `context` tested
         successfully.
 
         '''
+        # Contexts coming from a runner keep count of their broken vows
+        if 'counts' in context:
+            return not context['counts'].errored
+
         succeeded = True
 
         # Success only if there wasn't an error in setup, topic or teardown
@@ -148,3 +275,106 @@ class VowsResult(object):
         ]
         times.sort(key=lambda x: x['elapsed'], reverse=True)
         return times[:number]
+
+    def get_step_times(self, contexts=None):
+        '''Returns how long each setup, topic, vow and teardown in
+        `contexts` took.
+
+        '''
+        steps = []
+
+        if contexts is None:
+            contexts = self.contexts
+
+        for context in contexts:
+            step = {
+                'context': context['id'],
+                'batch': context['id'].split('.')[0],
+                'path': context['filename'],
+            }
+            for phase in ('setup', 'topic', 'teardown'):
+                steps.append(dict(step, phase=phase, name=context['name'],
+                                  elapsed=context.get(phase + '_elapsed') or 0.0))
+            for test in context['tests']:
+                steps.append(dict(step, phase='vow', name=test['name'], elapsed=test['elapsed'] or 0.0))
+            steps.extend(self.get_step_times(context['contexts']))
+
+        return steps
+
+    def get_worst_steps(self, number=10, threshold=0.1):
+        '''Returns the top `number` slowest setups, topics, vows and
+        teardowns which took longer than `threshold`.
+
+        '''
+        steps = [
+            step for step in self.get_step_times()
+            if step['elapsed'] > 0 and step['elapsed'] >= threshold
+        ]
+        steps.sort(key=lambda x: x['elapsed'], reverse=True)
+        return steps[:number]
+
+    def get_times_per(self, key, number=10):
+        '''Returns the top `number` batches (`key` of 'batch') or files
+        (`key` of 'path') which took longest, adding up their steps.
+
+        '''
+        totals = {}
+        for step in self.get_step_times():
+            total = totals.setdefault(step[key], {'name': step[key], 'elapsed': 0.0, 'steps': 0})
+            total['elapsed'] += step['elapsed']
+            total['steps'] += 1
+        times = sorted(totals.values(), key=lambda x: x['elapsed'], reverse=True)
+        return times[:number]
+
+    def get_step_percentiles(self, percents=(50, 95, 99)):
+        '''Returns, for each kind of step, how many ran, how long they took
+        altogether, the `percents` percentiles and the longest time.
+
+        '''
+        times = dict((phase, []) for phase in STEP_PHASES)
+        for step in self.get_step_times():
+            times[step['phase']].append(step['elapsed'])
+
+        summary = []
+        for phase in STEP_PHASES:
+            values = sorted(times[phase])
+            if not values:
+                continue
+            summary.append({
+                'phase': phase,
+                'count': len(values),
+                'total': sum(values),
+                'percentiles': [(percent, percentile(values, percent)) for percent in percents],
+                'max': values[-1],
+            })
+        return summary
+
+    def get_memory_hungriest(self, number=10, contexts=None):
+        '''Returns the top `number` contexts (of those whose memory was
+        measured) which needed the most memory at once.
+
+        '''
+        def measured(contexts):
+            for context in contexts:
+                if context.get('memory'):
+                    yield {
+                        'context': context['id'],
+                        'path': context['filename'],
+                        'peak': context['memory']['peak'],
+                        'retained': context['memory']['retained'],
+                    }
+                for subcontext in measured(context['contexts']):
+                    yield subcontext
+
+        memory = list(measured(self.contexts if contexts is None else contexts))
+        memory.sort(key=lambda x: x['peak'], reverse=True)
+        return memory[:number]
+
+    def get_slowest_imports(self, number=10, threshold=0.1):
+        '''Returns the top `number` vows files which took longer than
+        `threshold` to import.
+
+        '''
+        times = [time for time in self.import_times if time['elapsed'] >= threshold]
+        times.sort(key=lambda x: x['elapsed'], reverse=True)
+        return times[:number]
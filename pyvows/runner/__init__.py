@@ -4,9 +4,33 @@ select the fastest possible runner, using fallbacks if unavailable.
 '''
 
 
+import importlib
+import sys
+
+
 class SkipTest(Exception):
     pass
 
-from pyvows.runner.gevent import VowsParallelRunner as VowsRunner
+try:
+    from pyvows.runner.gevent import VowsParallelRunner as VowsRunner
+except ImportError:
+    from pyvows.runner.sequential import VowsSequentialRunner as VowsRunner
+
+RUNNERS = {
+    'gevent': ('pyvows.runner.gevent', 'VowsParallelRunner'),
+    'sequential': ('pyvows.runner.sequential', 'VowsSequentialRunner'),
+}
+# (it needs `contextvars`)
+if sys.version_info >= (3, 7):
+    RUNNERS['asyncio'] = ('pyvows.runner.asyncio', 'VowsAsyncioRunner')
+
+
+def get_runner(name=None):
+    '''Returns the runner class registered in `RUNNERS` as `name`, or the
+    fastest available runner when `name` is `None`.'''
+    if name is None:
+        return VowsRunner
+    module_name, class_name = RUNNERS[name]
+    return getattr(importlib.import_module(module_name), class_name)
 
-__all__ = ('VowsRunner', 'SkipTest')
+__all__ = ('VowsRunner', 'SkipTest', 'RUNNERS', 'get_runner')
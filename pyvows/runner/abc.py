@@ -9,80 +9,780 @@
 # http://www.opensource.org/licenses/mit-license
 # Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
 
+import inspect
 import sys
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+try:
+    from colorama.ansitowin32 import AnsiToWin32
+except ImportError:
+    def AnsiToWin32(*args, **kwargs):
+        return args[0]
 
-from pyvows.runner.utils import get_file_info_for
+from pyvows.async_topic import VowsAsyncTopic, VowsAsyncTopicTimeout, VowsAsyncTopicValue
+from pyvows.events import VowsEvents
+from pyvows.fixtures import FixtureManager
+from pyvows.result import VowResult, VowsCounts, VowsResult
+from pyvows.runner.executionplan import VowIndex
+from pyvows.runner.output import reset_buffers
+from pyvows.runner.topic_cache import TopicCache, get_cache_options
+from pyvows.runner.utils import get_file_info_for, get_topics_for
 from pyvows.utils import elapsed
 from pyvows.runner import SkipTest
 
 #-------------------------------------------------------------------------------------------------
 
+DEFAULT_CONCURRENCY = 1000
+
+# what `_next_value()` returns once a generated topic has no more values
+_EXHAUSTED = object()
+
+
+class _StreamCapture(object):
+    '''Replaces `sys.stdout` / `sys.stderr` while capturing output, sending
+    writes to the runner's output sinks for the code currently running.'''
+
+    def __init__(self, output, streamName):
+        self.__output = output
+        self.__streamName = streamName
+
+    def __getattr__(self, name):
+        return getattr(getattr(self.__output, self.__streamName), name)
+
+
+def _get_batch(ctx_obj):
+    while ctx_obj.parent is not None:
+        ctx_obj = ctx_obj.parent
+    return ctx_obj
+
+
+@contextmanager
+def _not_profiling():
+    yield
+
 
 class VowsRunnerABC(object):
+    '''Base class for PyVows runners.
+
+    Walks the execution plan, running each context's setup, topic, vows,
+    subcontexts and teardown.  Implementations decide how work is scheduled
+    by providing the primitives below (`_spawn()`, `_wait_for()`...), an
+    `output` object holding `stdout`/`stderr` sinks for the running code,
+    and a `pool` exposed to contexts for their asynchronous work.
+
+    The walk is made of generators ("steps", see `_run_steps()`) yielding
+    whatever the waiting primitives return: blocking runners have already
+    waited by then, while the asyncio runner gets awaitables to await.
 
-    def __init__(self, suites, context_class, on_vow_success, on_vow_error, execution_plan, capture_output=False):
+    For runners which run them concurrently, `concurrency` limits how many
+    topics and vows may run at the same time, and `max_topics`/`max_vows`
+    limit topics (with their setup) and vows separately.  A batch may also
+    cap its own topics and vows with a `max_concurrency` attribute.  Limits
+    are waited for by the spawned work itself, never by its parent.
+
+    Progress is published through `events` (a `pyvows.events.VowsEvents`).
+    Vow metadata comes from `vow_index` (see `ExecutionPlanner.vow_index`).
+    With `release_results`, vow results drop their topic and context
+    references (see `VowResult.release()`) as soon as they're reported.
+    With `timings` (a `pyvows.timings.TimingStore`), the batches which took
+    longest last time are started first; with `failures` (a
+    `pyvows.failures.FailureStore`), the batches which failed are started
+    before all others.  With `code_profiler` (a
+    `pyvows.profiling.CodeProfiler`), the steps of the contexts it selects
+    are profiled; with `memory_profiler` (a `MemoryProfiler`), the memory
+    used by each context is measured.
+
+    '''
+
+    output = None
+    orig_stdout = sys.stdout
+    orig_stderr = sys.stderr
+
+    def __init__(self, suites, context_class, on_vow_success, on_vow_error, execution_plan, capture_output=False,
+                 concurrency=None, events=None, vow_index=None, release_results=False, max_topics=None,
+                 max_vows=None, timings=None, failures=None, code_profiler=None, memory_profiler=None,
+                 fixtures=None):
         self.suites = suites  # a suite is a file with pyvows tests
         self.context_class = context_class
         self.on_vow_success = on_vow_success
         self.on_vow_error = on_vow_error
         self.execution_plan = execution_plan
         self.capture_output = capture_output
+        self.concurrency = concurrency
+        self.max_topics = max_topics
+        self.max_vows = max_vows
+        self.semaphores = {}
+        self.events = events if events is not None else VowsEvents()
+        self.vow_index = vow_index if vow_index is not None else VowIndex()
+        self.release_results = release_results
+        self.timings = timings
+        self.failures = failures
+        self.code_profiler = code_profiler
+        self.memory_profiler = memory_profiler
+        self.topic_caches = {}
+        self.resource_semaphores = {}
+        self.fixtures = fixtures if fixtures is not None else FixtureManager()
+        self.pool = None
+
+    #-------------------------------------------------------------------------
+    #   Scheduling (implemented by subclasses)
+    #-------------------------------------------------------------------------
+    def _spawn(self, func, *args, **kwargs):
+        '''Schedules `func(*args, **kwargs)`, and returns something
+        `_wait_for()` can wait on.'''
+        raise NotImplementedError
+
+    def _wait_for(self, blockers):
+        '''Waits for the work returned by `_spawn()` to finish.'''
+        raise NotImplementedError
+
+    def _join_all(self):
+        '''Waits for everything spawned so far to finish.'''
+        raise NotImplementedError
+
+    def _create_semaphore(self, size):
+        '''Returns a semaphore limiting concurrent work to `size`, or `None`
+        if this runner doesn't need one.'''
+        return None
+
+    def _acquire(self, semaphores):
+        '''Waits for each of `semaphores` (from `_create_semaphore()`;
+        `None`s are ignored), in order.'''
+        for semaphore in semaphores:
+            if semaphore is not None:
+                semaphore.acquire()
+
+    def _release(self, semaphores):
+        for semaphore in reversed(semaphores):
+            if semaphore is not None:
+                semaphore.release()
+
+    def _resolve(self, value):
+        '''Returns `value`, or what it resolves to, for runners which can
+        wait for awaitables.'''
+        return value
+
+    def _resolve_topic(self, topic, topic_func, stream):
+        '''Returns the value of the `topic` returned by `topic_func`: what
+        its callback is called with, for a `Vows.async_topic`.  With
+        `stream`, generated values are going to be streamed.'''
+        if isinstance(topic, VowsAsyncTopic):
+            return self._wait_for_callback(topic)
+        return topic
+
+    def _wait_for_callback(self, topic):
+        '''Calls the `Vows.async_topic` topic, and returns the value its
+        callback is called with (maybe later, from another thread), or
+        raises `VowsAsyncTopicTimeout` if it isn't called in time.'''
+        called = threading.Event()
+        values = []
+
+        def handle_callback(*args, **kw):
+            values.append(VowsAsyncTopicValue(args, kw))
+            called.set()
+
+        topic(handle_callback)
+        if not called.wait(topic.timeout):
+            raise VowsAsyncTopicTimeout(topic)
+        return values[0]
+
+    def _is_generator(self, topic):
+        '''Returns whether `topic` generates values to test one by one.'''
+        return inspect.isgenerator(topic)
+
+    def _next_value(self, values):
+        '''Returns the next value generated by `values`, or `_EXHAUSTED`.'''
+        try:
+            return next(values)
+        except StopIteration:
+            return _EXHAUSTED
+
+    def _run_steps(self, steps):
+        '''Runs the generator `steps`, sending it back what it yields.
+        Runners which don't block in their primitives override this to wait
+        for what they return.'''
+        value = None
+        try:
+            while True:
+                value = steps.send(value)
+        except StopIteration:
+            pass
+
+    def _run_until_complete(self, steps):
+        '''Runs the steps of a whole run (see `run()`).'''
+        self._run_steps(steps)
+
+    #-------------------------------------------------------------------------
+    #   Concurrency limits
+    #-------------------------------------------------------------------------
+    def _create_semaphores(self):
+        return {
+            'topic': self._create_semaphore(self.max_topics),
+            'vow': self._create_semaphore(self.max_vows),
+            'all': self._create_semaphore(self.concurrency or DEFAULT_CONCURRENCY),
+        }
+
+    def _get_semaphores(self, kind, ctx_obj):
+        '''Returns the semaphores to hold while running a `kind` ('topic' or
+        'vow') of `ctx_obj`, always in the same order.'''
+        batch = _get_batch(ctx_obj)
+        semaphores = (getattr(batch, '_batch_semaphore', None), self.semaphores.get(kind), self.semaphores.get('all'))
+        return [semaphore for semaphore in semaphores if semaphore is not None]
+
+    #-------------------------------------------------------------------------
+    #   Cached topics
+    #-------------------------------------------------------------------------
+    def _get_topic_cache(self, ctx_obj, topic_func):
+        '''Returns the `TopicCache` of `topic_func` for `ctx_obj`, or `None`
+        if it isn't a `Vows.cached_topic`.'''
+        options = get_cache_options(topic_func)
+        if options is None:
+            return None
+        if options['scope'] == 'batch':
+            batch = _get_batch(ctx_obj)
+            if not hasattr(batch, '_topic_caches'):
+                batch._topic_caches = {}
+            caches = batch._topic_caches
+        else:
+            caches = self.topic_caches
+
+        function = getattr(topic_func, '__func__', topic_func)
+        cache = caches.get(function)
+        if cache is None:
+            cache = caches[function] = TopicCache(options['maxsize'], lambda: self._create_semaphore(1))
+        return cache
+
+    def _call_topic(self, ctx_obj, topic_func, topic_list, value):
+        '''Steps calling the topic `topic_func`, or getting its value from
+        its cache; `value` gets it (as `value[0]`).'''
+        stream = bool(ctx_obj.topic_window)
+        cache = self._get_topic_cache(ctx_obj, topic_func)
+        if cache is None:
+            topic = yield self._resolve_topic(topic_func(*topic_list), topic_func, stream)
+            value.append(topic)
+            return
+
+        key = cache.get_key(topic_list)
+        lock = [cache.get_lock(key)]
+        try:
+            yield self._acquire(lock)
+            try:
+                found, topic = cache.get(key)
+                if not found:
+                    # (cached generators are consumed)
+                    topic = yield self._resolve_topic(topic_func(*topic_list), topic_func, False)
+                    topic = cache.put(key, topic)
+            finally:
+                self._release(lock)
+        finally:
+            cache.release_lock(key)
+        value.append(topic)
+
+    #-------------------------------------------------------------------------
+    #   Running
+    #-------------------------------------------------------------------------
+    def _get_batches(self):
+        '''Returns `(suite name, batch class)` for each batch to run, in the
+        order they should be started.'''
+        batches = [
+            (suiteName, batch)
+            for suiteName, suitePlan in self.execution_plan.items()
+            for batch in self.suites[suiteName] if batch.__name__ in suitePlan['contexts']
+        ]
+        return self._order_batches(batches, key=lambda item: (item[0], item[1].__name__))
+
+    def _order_batches(self, batches, key=None):
+        '''Sorts `batches` (`(suite name, batch name)` pairs, or what `key`
+        turns into one) in the order they should be started.'''
+        key = key or (lambda item: item)
+        if self.timings is not None:
+            batches = self.timings.order_batches(batches, key)
+        if self.failures is not None:
+            batches = self.failures.order_batches(batches, key)
+        return batches
 
     def run(self):
-        pass
+        #   FIXME: Add Docstring
 
-    def run_context(self):
-        pass
+        # called from `pyvows.core:Vows.run()`,
+        # which is called from `pyvows.cli.run()`
 
-    def get_vow_result(self, vow, topic, ctx_obj, vow_name, enumerated):
-        filename, lineno = get_file_info_for(vow)
+        start_time = time.time()
+        result = VowsResult()
+        # (e.g. under `--watch`, the buffers of earlier runs are released
+        # along with their results)
+        reset_buffers()
+        if self.capture_output:
+            self._capture_streams(True)
+        try:
+            with self._profiling_run():
+                self._run_until_complete(self._run_batches(result))
+        finally:
+            if self.capture_output:
+                self._capture_streams(False)
 
-        vow_result = {
-            'context_instance': ctx_obj,
-            'name': vow_name,
-            'enumerated': enumerated,
-            'result': None,
-            'topic': topic,
-            'error': None,
-            'skip': None,
-            'succeeded': False,
-            'file': filename,
-            'lineno': lineno,
+        result.elapsed_time = elapsed(start_time)
+        self.events.emit(VowsEvents.RUN_FINISHED, result)
+        return result
+
+    def _run_batches(self, result):
+        '''Steps running every batch into `result`.'''
+        self.semaphores = self._create_semaphores()
+        batches = self._get_batches()
+        self.fixtures.create_lock = lambda: self._create_semaphore(1)
+        self.fixtures.plan(batches)
+        try:
+            for suiteName, batch in batches:
+                self._spawn(
+                    self.run_context,
+                    result.contexts,
+                    batch.__name__,
+                    batch(None),
+                    self.execution_plan[suiteName]['contexts'][batch.__name__],
+                    index=-1,
+                    suite=suiteName,
+                    parent_counts=result.counts
+                )
+
+            yield self._join_all()
+        finally:
+            if not self.fixtures.keep_alive:
+                self.fixtures.close()
+
+    @contextmanager
+    def _profiling_run(self):
+        '''Lets the code profiler (if any) follow greenlets while running,
+        and saves its profiles at the end; traces memory for the memory
+        profiler (if any).'''
+        with self.memory_profiler.tracing() if self.memory_profiler else _not_profiling():
+            if self.code_profiler is None:
+                yield
+                return
+            try:
+                with self.code_profiler.tracing_greenlets():
+                    yield
+            finally:
+                self.code_profiler.save()
+
+    #-------------------------------------------------------------------------
+    #   Fixtures
+    #-------------------------------------------------------------------------
+    def _use_fixtures(self, ctx_obj, ctx_result):
+        '''Steps giving `ctx_obj` the fixtures it lists in `fixtures`.'''
+        module = type(ctx_obj).__module__
+        for name in getattr(ctx_obj, 'fixtures', None) or ():
+            lock = [self.fixtures.get_lock(name, ctx_result['filename'], module)]
+            yield self._acquire(lock)
+            try:
+                setattr(ctx_obj, name, self.fixtures.acquire(name, ctx_result['filename'], module))
+            finally:
+                self._release(lock)
+
+    def _release_fixtures(self, ctx_obj, ctx_result):
+        '''Lets the fixtures used by the batch `ctx_obj` be torn down, once
+        no other batch needs them.'''
+        try:
+            self.fixtures.release(ctx_result['filename'], type(ctx_obj))
+        except Exception:
+            if not ctx_result['error']:
+                ctx_result['error'] = VowsTopicError('teardown', sys.exc_info())
+
+    #-------------------------------------------------------------------------
+    #   Resources
+    #-------------------------------------------------------------------------
+    def _get_resources(self, context_class, execution_plan):
+        '''Returns the resources declared by `context_class` or any of the
+        contexts of its `execution_plan`, with their first declared
+        capacity.'''
+        resources = dict(getattr(context_class, 'resources', None) or {})
+        for name, plan in execution_plan['contexts'].items():
+            for resource, capacity in self._get_resources(getattr(context_class, name), plan).items():
+                resources.setdefault(resource, capacity)
+        return resources
+
+    def _get_resource_semaphores(self, ctx_obj, execution_plan, skipReason=None):
+        '''Returns the semaphores of the resources `ctx_obj` takes from its
+        `setup` to its `teardown`, and records their names (with those its
+        parents hold) as `ctx_obj._held_resources`.
+
+        A context takes the resources it declares which its parents don't
+        hold, along with those its subcontexts declare which sort before
+        any it holds: semaphores are always taken in the same (sorted)
+        order, so no two contexts can each wait for a resource the other
+        holds.'''
+        held = getattr(ctx_obj.parent, '_held_resources', frozenset())
+        ctx_obj._held_resources = held
+        if skipReason:
+            return []
+        resources = dict(
+            (name, capacity) for name, capacity in (getattr(type(ctx_obj), 'resources', None) or {}).items()
+            if name not in held
+        )
+        if not resources:
+            return []
+        last = max(set(resources) | held)
+        for name, capacity in self._get_resources(type(ctx_obj), execution_plan).items():
+            if name < last and name not in held:
+                resources.setdefault(name, capacity)
+        ctx_obj._held_resources = held | frozenset(resources)
+        semaphores = []
+        for name, capacity in sorted(resources.items()):
+            if name not in self.resource_semaphores:
+                self.resource_semaphores[name] = self._create_semaphore(capacity)
+            if self.resource_semaphores[name] is not None:
+                semaphores.append(self.resource_semaphores[name])
+        return semaphores
+
+    def _profiling(self, ctx_result, step):
+        '''Returns a context manager profiling the `step` ('setup', 'topic'
+        or 'vow') of `ctx_result`'s context, for the profilers in use.'''
+        if ctx_result is None or (self.code_profiler is None and self.memory_profiler is None):
+            return _not_profiling()
+        return self._profiling_step(ctx_result, step)
+
+    @contextmanager
+    def _profiling_step(self, ctx_result, step):
+        memory = self.memory_profiler.measure(ctx_result, step) if self.memory_profiler else _not_profiling()
+        code = (self.code_profiler.profile(ctx_result['filename'], ctx_result['id'])
+                if self.code_profiler else _not_profiling())
+        with memory:
+            with code:
+                yield
+
+    def run_context(self, ctx_collection, ctx_name, ctx_obj, execution_plan, index=-1, suite=None, skipReason=None,
+                    parent_counts=None):
+        #   FIXME: Add Docstring
+        return self._run_steps(self._run_context(ctx_collection, ctx_name, ctx_obj, execution_plan, index, suite,
+                                                 skipReason, parent_counts))
+
+    def _run_context(self, ctx_collection, ctx_name, ctx_obj, execution_plan, index, suite, skipReason,
+                     parent_counts):
+        '''Steps running a context (see `run_context()`).'''
+
+        #-----------------------------------------------------------------------
+        # Local variables and defs
+        #-----------------------------------------------------------------------
+        start_time = time.time()
+        ctx_result = {
+            'filename': suite or inspect.getsourcefile(ctx_obj.__class__),
+            'name': ctx_name,
+            'id': execution_plan['id'],
+            'tests': [],
+            'contexts': [],
+            'setup_elapsed': 0,
+            'topic_elapsed': 0,
+            'teardown_elapsed': 0,
             'elapsed': 0,
-            'stdout': '',
-            'stderr': ''
+            'memory': None,
+            'error': None,
+            'skip': skipReason,
+            'counts': VowsCounts(parent_counts)
         }
-        return vow_result
 
-    def run_vow(self, tests_collection, topic, ctx_obj, vow, vow_name, enumerated):
+        ctx_collection.append(ctx_result)
+        self.events.emit(VowsEvents.CONTEXT_STARTED, ctx_result)
+        ctx_obj.index = index
+        ctx_obj.pool = self.pool
+        if ctx_obj.parent is None:
+            ctx_obj._batch_semaphore = self._create_semaphore(getattr(ctx_obj, 'max_concurrency', None))
+        teardown_blockers = []
+
+        def _run_setup_and_topic(ctx_obj, index, value):
+            # If we're already mid-skip, don't run anything
+            if skipReason:
+                raise skipReason
+
+            # Run setup function
+            start_time = time.time()
+            try:
+                yield self._run_steps(self._use_fixtures(ctx_obj, ctx_result))
+                with self._profiling(ctx_result, 'setup'):
+                    yield self._resolve(ctx_obj.setup())
+            except Exception:
+                raise VowsTopicError('setup', sys.exc_info())
+            finally:
+                ctx_result['setup_elapsed'] = elapsed(start_time)
+
+            try:
+                # Find & run topic function
+                if not hasattr(ctx_obj, 'topic'):  # ctx_obj has no topic
+                    value.append(ctx_obj._get_first_available_topic(index))
+                    return
+
+                topic_func = ctx_obj.topic
+                topic_list = get_topics_for(topic_func, ctx_obj)
+
+                start_time = time.time()
+
+                if topic_func is None:
+                    value.append(None)
+                    return
+
+                with self._profiling(ctx_result, 'topic'):
+                    yield self._run_steps(self._call_topic(ctx_obj, topic_func, topic_list, value))
+                ctx_result['topic_elapsed'] = elapsed(start_time)
+            except SkipTest:
+                raise
+            except Exception:
+                raise VowsTopicError('topic', sys.exc_info())
+
+        def _run_vows_and_subcontexts(topic, index=-1, enumerated=False):
+            # methods
+            for vow_name, vow, vow_info in vows:
+                if skipReason:
+                    skipped_result = self.get_vow_result(vow, topic, ctx_obj, vow_name, enumerated, vow_info)
+                    skipped_result['skip'] = skipReason
+                    ctx_result['tests'].append(skipped_result)
+                    ctx_result['counts'].add(skipped_result)
+                    self._report_vow(skipped_result, ctx_result)
+                else:
+                    vow_blocker = self._run_vow(
+                        ctx_result['tests'],
+                        topic,
+                        ctx_obj,
+                        vow,
+                        vow_name,
+                        enumerated=enumerated,
+                        counts=ctx_result['counts'],
+                        ctx_result=ctx_result,
+                        info=vow_info)
+                    teardown_blockers.append(vow_blocker)
+
+            # classes
+            for subctx_name, subctx in subcontexts:
+                # resolve user-defined Context classes
+                if not issubclass(subctx, self.context_class):
+                    subctx = type(ctx_name, (subctx, self.context_class), {})
+
+                subctx_obj = subctx(ctx_obj)
+                subctx_obj.pool = self.pool
+
+                subctx_blocker = self._spawn(
+                    self.run_context,
+                    ctx_result['contexts'],
+                    subctx_name,
+                    subctx_obj,
+                    execution_plan['contexts'][subctx_name],
+                    index=index,
+                    suite=suite or ctx_result['filename'],
+                    skipReason=skipReason,
+                    parent_counts=ctx_result['counts']
+                )
+                teardown_blockers.append(subctx_blocker)
+
+        def _stream_generated_topic(topic, window):
+            # each value is dropped from `topic_value` once its vows and
+            # subcontexts are done; the oldest one is waited for when
+            # `window` values are in flight
+            ctx_obj.topic_value = {}
+            in_flight = deque()
+            index = 0
+            try:
+                while True:
+                    try:
+                        topic_value = yield self._next_value(topic)
+                    except Exception:
+                        raise VowsTopicError('topic', sys.exc_info())
+                    if topic_value is _EXHAUSTED:
+                        break
+
+                    if len(in_flight) >= window:
+                        retired, blockers = in_flight.popleft()
+                        yield self._wait_for(blockers)
+                        del ctx_obj.topic_value[retired]
+                    ctx_obj.topic_value[index] = topic_value
+                    first_blocker = len(teardown_blockers)
+                    _run_vows_and_subcontexts(topic_value, index=index, enumerated=True)
+                    in_flight.append((index, teardown_blockers[first_blocker:]))
+                    del teardown_blockers[first_blocker:]
+                    index += 1
+            finally:
+                while in_flight:
+                    retired, blockers = in_flight.popleft()
+                    yield self._wait_for(blockers)
+                    del ctx_obj.topic_value[retired]
+
+        def _run_tests(topic):
+            # setup generated topics if needed
+            is_generator = self._is_generator(topic)
+            if is_generator and ctx_obj.topic_window:
+                ctx_obj.generated_topic = True
+                yield self._run_steps(_stream_generated_topic(topic, ctx_obj.topic_window))
+                return
+            if is_generator:
+                try:
+                    ctx_obj.generated_topic = True
+                    topic = ctx_obj.topic_value = list(topic)
+                except Exception:
+                    # Actually getting the values from the generator may raise exception
+                    raise VowsTopicError('topic', sys.exc_info())
+                for index, topic_value in enumerate(topic):
+                    _run_vows_and_subcontexts(topic_value, index=index, enumerated=True)
+            else:
+                ctx_obj.topic_value = topic
+                _run_vows_and_subcontexts(topic)
+
+        def _run_teardown():
+            start_time = time.time()
+            try:
+                yield self._resolve(ctx_obj.teardown())
+            except Exception:
+                raise VowsTopicError('teardown', sys.exc_info())
+            finally:
+                ctx_result['teardown_elapsed'] = elapsed(start_time)
+
+        def _update_execution_plan():
+            '''Since Context.ignore can modify the ignored_members during setup or topic,
+                update the execution_plan to reflect the new ignored_members'''
+
+            for name in ctx_obj.ignored_members:
+                if name in execution_plan['vows']:
+                    execution_plan['vows'].remove(name)
+                if name in execution_plan['contexts']:
+                    del execution_plan['contexts'][name]
+
+        #-----------------------------------------------------------------------
+        # Begin
+        #-----------------------------------------------------------------------
+        held_resources = []
+        try:
+            # (waiting for resources before taking a concurrency slot)
+            held_resources = self._get_resource_semaphores(ctx_obj, execution_plan, skipReason)
+            yield self._acquire(held_resources)
+            try:
+                value = []
+                semaphores = self._get_semaphores('topic', ctx_obj)
+                yield self._acquire(semaphores)
+                try:
+                    yield self._run_steps(_run_setup_and_topic(ctx_obj, index, value))
+                finally:
+                    self._release(semaphores)
+                topic = value[0]
+                _update_execution_plan()
+            except SkipTest as se:
+                ctx_result['skip'] = se
+                skipReason = se
+                topic = None
+            except VowsTopicError as e:
+                ctx_result['error'] = e
+                skipReason = SkipTest('topic dependency failed')
+                topic = None
+            self.events.emit(VowsEvents.TOPIC_FINISHED, ctx_result)
+            vows = self._get_vows(ctx_obj, execution_plan, suite)
+            subcontexts = set((subctx_name, getattr(type(ctx_obj), subctx_name)) for subctx_name in execution_plan['contexts'])
+            try:
+                yield self._run_steps(_run_tests(topic))
+            except VowsTopicError as e:
+                ctx_result['error'] = e
+            # (even when failing: the context isn't done, and its counts
+            # aren't final, before its vows and subcontexts are)
+            yield self._wait_for(teardown_blockers)
+            if not ctx_result['error']:
+                try:
+                    yield self._run_steps(_run_teardown())
+                except Exception as e:
+                    ctx_result['error'] = e
+            if ctx_obj.parent is None:
+                self._release_fixtures(ctx_obj, ctx_result)
+        finally:
+            self._release(held_resources)
+            ctx_result['stdout'] = self.output.stdout.getvalue()
+            ctx_result['stderr'] = self.output.stderr.getvalue()
+            ctx_result['counts'].add(ctx_result)
+            ctx_result['elapsed'] = elapsed(start_time)
+            self.events.emit(VowsEvents.CONTEXT_TORN_DOWN, ctx_result)
+
+    def _capture_streams(self, capture):
+        if capture:
+            sys.stdout = AnsiToWin32(_StreamCapture(self.output, 'stdout'), convert=False, strip=True)
+            sys.stderr = AnsiToWin32(_StreamCapture(self.output, 'stderr'), convert=False, strip=True)
+        else:
+            sys.stdout = self.orig_stdout
+            sys.stderr = self.orig_stderr
+
+    def _get_vows(self, ctx_obj, execution_plan, suite):
+        '''Returns `(name, vow, VowInfo)` for each vow to run in a context.
+        The metadata is looked up once here, rather than for every result.'''
+        ctx_type = type(ctx_obj)
+        vows = []
+        for vow_name in execution_plan['vows']:
+            vow = getattr(ctx_type, vow_name)
+            vows.append((vow_name, vow, self.vow_index.get_info(suite, execution_plan['id'], vow_name, vow)))
+        return vows
+
+    def _run_vow(self, tests_collection, topic, ctx_obj, vow, vow_name, enumerated=False, counts=None, ctx_result=None,
+                 info=None):
         #   FIXME: Add Docstring
+        return self._spawn(self.run_vow, tests_collection, topic, ctx_obj, vow, vow_name, enumerated, counts,
+                           ctx_result, info)
 
-        start_time = time.time()
-        vow_result = self.get_vow_result(vow, topic, ctx_obj, vow_name, enumerated)
+    def get_vow_result(self, vow, topic, ctx_obj, vow_name, enumerated, info=None):
+        if info is None:
+            return VowResult(ctx_obj, vow_name, enumerated, topic, *get_file_info_for(vow))
+        return VowResult(ctx_obj, vow_name, enumerated, topic, info.file, info.lineno, info.id)
 
+    def run_vow(self, tests_collection, topic, ctx_obj, vow, vow_name, enumerated, counts=None, ctx_result=None,
+                info=None):
+        #   FIXME: Add Docstring
+        return self._run_steps(self._run_vow_steps(tests_collection, topic, ctx_obj, vow, vow_name, enumerated, counts,
+                                                   ctx_result, info))
+
+    def _run_vow_steps(self, tests_collection, topic, ctx_obj, vow, vow_name, enumerated, counts, ctx_result, info):
+        '''Steps running a vow (see `run_vow()`).'''
+        if info is not None and info.skip is not None:
+            # (decorated with `Vows.skip`: no need to wait for a slot to skip it)
+            vow_result = self.get_vow_result(vow, topic, ctx_obj, vow_name, enumerated, info)
+            vow_result['skip'] = SkipTest(info.skip)
+            tests_collection.append(vow_result)
+            if counts is not None:
+                counts.add(vow_result)
+            self._report_vow(vow_result, ctx_result)
+            return
+
+        semaphores = self._get_semaphores('vow', ctx_obj)
+        yield self._acquire(semaphores)
         try:
-            result = vow(ctx_obj, topic)
-            vow_result['result'] = result
-            vow_result['succeeded'] = True
-            if self.on_vow_success:
-                self.on_vow_success(vow_result)
-        except SkipTest as se:
-            vow_result['skip'] = se
-        except:
-            err_type, err_value, err_traceback = sys.exc_info()
-            vow_result['error'] = {
-                'type': err_type,
-                'value': err_value,
-                'traceback': err_traceback
-            }
-            if self.on_vow_error:
-                self.on_vow_error(vow_result)
-
-        vow_result['elapsed'] = elapsed(start_time)
+            start_time = time.time()
+            vow_result = self.get_vow_result(vow, topic, ctx_obj, vow_name, enumerated, info)
+
+            try:
+                with self._profiling(ctx_result, 'vow'):
+                    result = yield self._resolve(vow(ctx_obj, topic))
+                vow_result['result'] = result
+                vow_result['succeeded'] = True
+                if self.on_vow_success:
+                    self.on_vow_success(vow_result)
+            except SkipTest as se:
+                vow_result['skip'] = se
+            except GeneratorExit:
+                raise
+            except:
+                err_type, err_value, err_traceback = sys.exc_info()
+                vow_result['error'] = {
+                    'type': err_type,
+                    'value': err_value,
+                    'traceback': err_traceback
+                }
+                if self.on_vow_error:
+                    self.on_vow_error(vow_result)
+
+            vow_result['elapsed'] = elapsed(start_time)
+        finally:
+            self._release(semaphores)
+
+        vow_result['stdout'] = self.output.stdout.getvalue()
+        vow_result['stderr'] = self.output.stderr.getvalue()
         tests_collection.append(vow_result)
+        if counts is not None:
+            counts.add(vow_result)
+        self._report_vow(vow_result, ctx_result)
 
-        return vow_result
+    def _report_vow(self, vow_result, ctx_result):
+        self.events.emit(VowsEvents.VOW_FINISHED, vow_result, ctx_result)
+        if self.release_results:
+            vow_result.release()
 
 
 class VowsTopicError(Exception):
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+'''The asyncio implementation of PyVows runner.
+
+Topics, vows, `setup` and `teardown` may be plain functions or `async def`
+coroutines (topics may also be async generators).  Sibling contexts and
+vows run as concurrent tasks on one event loop; a nested context starts
+once its parent's topic is available.  How many topics and vows run at
+the same time is limited as described in `VowsRunnerABC`.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from __future__ import absolute_import
+
+import asyncio
+import contextvars
+import inspect
+import sys
+import threading
+import traceback
+
+from pyvows.async_topic import VowsAsyncTopic, VowsAsyncTopicTimeout, VowsAsyncTopicValue
+from pyvows.runner.abc import _EXHAUSTED, VowsRunnerABC
+from pyvows.runner.output import new_sinks
+from pyvows.runner.sequential import _SequentialPool
+
+#-------------------------------------------------------------------------------------------------
+
+class _TaskOutput(object):
+    '''Output sinks (see `pyvows.runner.output`) for the running task.  Each
+    task starts with sinks of its own by calling `reset()`.'''
+
+    def __init__(self):
+        self._buffers = contextvars.ContextVar('pyvows_output', default=None)
+
+    def reset(self):
+        self._buffers.set(new_sinks())
+
+    def _get_buffers(self):
+        buffers = self._buffers.get()
+        if buffers is None:
+            self.reset()
+            buffers = self._buffers.get()
+        return buffers
+
+    @property
+    def stdout(self):
+        return self._get_buffers()[0]
+
+    @property
+    def stderr(self):
+        return self._get_buffers()[1]
+
+
+def _loop_is_running():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class VowsAsyncioRunner(VowsRunnerABC):
+    '''Runs vows on an asyncio event loop.
+
+    The contexts are walked by `VowsRunnerABC`: this runner's primitives
+    return awaitables, which `_run_steps()` awaits.
+
+    '''
+
+    output = _TaskOutput()
+
+    def __init__(self, *args, **kwargs):
+        super(VowsAsyncioRunner, self).__init__(*args, **kwargs)
+        self.pool = _SequentialPool()
+        self.loop = None
+        self.tasks = set()
+
+    def _run_until_complete(self, steps):
+        if _loop_is_running():
+            # e.g. a vow running another suite: use a loop of our own, in a
+            # thread of its own
+            thread = threading.Thread(target=self._run_loop, args=(steps,))
+            thread.start()
+            thread.join()
+        else:
+            self._run_loop(steps)
+
+    def _run_loop(self, steps):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._run_steps(steps))
+        finally:
+            self.loop.close()
+            self.loop = None
+
+    async def _run_steps(self, steps):
+        value, error = None, None
+        while True:
+            try:
+                awaitable = steps.send(value) if error is None else steps.throw(*error)
+            except StopIteration:
+                return
+            value, error = None, None
+            try:
+                value = (await awaitable) if inspect.isawaitable(awaitable) else awaitable
+            except BaseException:
+                # (including cancellations: the steps release what they hold)
+                error = sys.exc_info()
+
+    def _spawn(self, func, *args, **kwargs):
+        task = asyncio.ensure_future(self._run_task(func, args, kwargs))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _run_task(self, func, args, kwargs):
+        self.output.reset()
+        return await func(*args, **kwargs)
+
+    async def _wait_for(self, blockers):
+        if not blockers:
+            return
+        for outcome in await asyncio.gather(*blockers, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                # like an uncaught exception in a greenlet: report it, go on
+                traceback.print_exception(type(outcome), outcome, outcome.__traceback__)
+
+    async def _join_all(self):
+        while self.tasks:
+            await self._wait_for(list(self.tasks))
+
+    def _create_semaphore(self, size):
+        if not size:
+            return None
+        return asyncio.Semaphore(size)
+
+    async def _acquire(self, semaphores):
+        for semaphore in semaphores:
+            if semaphore is not None:
+                await semaphore.acquire()
+
+    async def _resolve(self, value):
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    async def _resolve_topic(self, topic, topic_func, stream):
+        if isinstance(topic, VowsAsyncTopic):
+            return await self._wait_for_callback(topic)
+        if inspect.isawaitable(topic):
+            try:
+                return await topic
+            except Exception:
+                if getattr(topic_func, '_wrapper_type', None) != 'capture_error':
+                    raise
+                return sys.exc_info()[1]
+        if inspect.isasyncgen(topic) and not stream:
+            values = []
+            async for value in topic:
+                values.append(value)
+            return (value for value in values)
+        return topic
+
+    async def _wait_for_callback(self, topic):
+        # (the callback may be called from another thread)
+        future = self.loop.create_future()
+
+        def set_result(value):
+            # (unless the wait already timed out)
+            if not future.done():
+                future.set_result(value)
+
+        def handle_callback(*args, **kw):
+            self.loop.call_soon_threadsafe(set_result, VowsAsyncTopicValue(args, kw))
+
+        topic(handle_callback)
+        try:
+            return await asyncio.wait_for(future, topic.timeout)
+        except asyncio.TimeoutError:
+            raise VowsAsyncTopicTimeout(topic)
+
+    def _is_generator(self, topic):
+        return inspect.isgenerator(topic) or inspect.isasyncgen(topic)
+
+    async def _next_value(self, values):
+        if not inspect.isasyncgen(values):
+            return super(VowsAsyncioRunner, self)._next_value(values)
+        try:
+            return await values.__anext__()
+        except StopAsyncIteration:
+            return _EXHAUSTED
@@ -2,16 +2,59 @@
 '''The logic PyVows uses to discover contexts and vows'''
 
 import inspect
+import os
 import re
 
+from pyvows.runner.utils import get_file_info_for
+
+
+class VowInfo(object):
+    '''What is known about a vow before running it: its qualified `id`
+    (given to its result), `file` and `lineno`, and the `skip` reason it was
+    decorated with (the runners skip it without calling it).'''
+
+    __slots__ = ('id', 'name', 'file', 'lineno', 'skip')
+
+    def __init__(self, vow_id, name, vow):
+        self.id = vow_id
+        self.name = name
+        self.file, self.lineno = get_file_info_for(vow)
+        self.skip = getattr(vow, '_skip_reason', None)
+
+
+class VowIndex(dict):
+    '''Maps `(suite, vow id)` to `VowInfo`.  Filled by
+    `ExecutionPlanner.plan()`; vows missing from it (e.g. in execution plans
+    built by hand) are added the first time they're looked up.'''
+
+    def get_info(self, suite, context_id, name, vow):
+        key = (suite, context_id + '.' + name)
+        info = self.get(key)
+        if info is None:
+            info = self[key] = VowInfo(key[1], name, vow)
+        return info
+
 
 class ExecutionPlanner(object):
-    def __init__(self, suites, exclusion_patterns, inclusion_patterns):
+    '''Builds the execution plan of `suites`: the contexts and vows to run.
+
+    Besides the exclusion and inclusion patterns, `inclusion_ids` may
+    restrict the plan to some context and vow ids (e.g. those which failed
+    last time): ids of any suite, or `(suite path, id)` pairs for those of
+    one suite.  A context id includes everything in that context.
+
+    '''
+
+    def __init__(self, suites, exclusion_patterns, inclusion_patterns, inclusion_ids=None):
         self.suites = suites
+        self.vow_index = VowIndex()
         if exclusion_patterns and inclusion_patterns:
             raise Exception('Using both exclusion_patterns and inclusion_patterns is not allowed')
         self.exclusion_patterns = set([re.compile(x) for x in exclusion_patterns])
         self.inclusion_patterns = set([re.compile(x) for x in inclusion_patterns])
+        self.suite_paths = {}
+        self.inclusion_ids = None if inclusion_ids is None else set(
+            (os.path.realpath(item[0]), item[1]) if isinstance(item, tuple) else item for item in inclusion_ids)
 
     def plan(self):
         plan = {}
@@ -20,7 +63,7 @@ class ExecutionPlanner(object):
                 'contexts': {}
             }
             for contextClass in contextClasses:
-                contextPlan, isRequired = self.plan_context(contextClass, '')
+                contextPlan, isRequired = self.plan_context(contextClass, '', suiteName)
                 if isRequired and not self.is_excluded(contextPlan['name']):
                     plan[suiteName]['contexts'][contextClass.__name__] = contextPlan
         return plan
@@ -44,7 +87,29 @@ class ExecutionPlanner(object):
                 return True
         return False
 
-    def plan_context(self, contextClass, idBase):
+    def _get_suite_path(self, suiteName):
+        if suiteName is None:
+            return None
+        if suiteName not in self.suite_paths:
+            self.suite_paths[suiteName] = os.path.realpath(suiteName)
+        return self.suite_paths[suiteName]
+
+    def is_id_included(self, item_id, suiteName=None):
+        '''Return whether `item_id` (of the suite `suiteName`), or the id of
+        a context containing it, is in `self.inclusion_ids`.'''
+
+        if self.inclusion_ids is None:
+            return True
+
+        suite = self._get_suite_path(suiteName)
+        parts = item_id.split('.')
+        for end in range(1, len(parts) + 1):
+            context_id = '.'.join(parts[:end])
+            if context_id in self.inclusion_ids or (suite, context_id) in self.inclusion_ids:
+                return True
+        return False
+
+    def plan_context(self, contextClass, idBase, suiteName=None):
         context = {
             'name': contextClass.__name__,
             'id': idBase + ('.' if idBase else '') + contextClass.__name__,
@@ -66,8 +131,11 @@ class ExecutionPlanner(object):
             name for name, vow in contextMembers
             if (inspect.ismethod(vow) or inspect.isfunction(vow))
                and self.is_included(context['id'] + '.' + name)
+               and self.is_id_included(context['id'] + '.' + name, suiteName)
                and not self.is_excluded(name)
         ]
+        for name in context['vows']:
+            self.vow_index.get_info(suiteName, context['id'], name, getattr(contextClass, name))
 
         subcontexts = [
             (name, subcontext) for name, subcontext in contextMembers
@@ -75,12 +143,15 @@ class ExecutionPlanner(object):
         ]
 
         for name, subcontext in subcontexts:
-            subcontextPlan, subcontextContainsIncludedSubcontexts = self.plan_context(subcontext, context['id'])
-            if self.is_included(subcontextPlan['id']) or subcontextContainsIncludedSubcontexts:
+            subcontextPlan, subcontextContainsIncludedSubcontexts = self.plan_context(subcontext, context['id'], suiteName)
+            isIncluded = self.is_included(subcontextPlan['id']) and self.is_id_included(subcontextPlan['id'], suiteName)
+            if isIncluded or subcontextContainsIncludedSubcontexts:
                 context['contexts'][name] = subcontextPlan
 
-        if self.inclusion_patterns:
+        if self.inclusion_patterns or self.inclusion_ids is not None:
             contextRequiredBecauseItContainsVowsOrSubcontexts = bool(context['contexts']) or bool(context['vows'])
+            if self.inclusion_ids is not None and self.is_id_included(context['id'], suiteName):
+                contextRequiredBecauseItContainsVowsOrSubcontexts = True
         else:
             contextRequiredBecauseItContainsVowsOrSubcontexts = True
 
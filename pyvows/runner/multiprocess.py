@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+'''A PyVows runner which shards batches across worker processes.
+
+Each worker runs whole batches with a regular runner implementation (the
+"engine", the gevent runner by default), so CPU-bound topics can use all
+available cores.  The per-batch results (and top memory allocators, when
+profiling memory) are sent back to the main process and merged into a
+single `VowsResult`.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import multiprocessing
+from multiprocessing.util import Finalize
+import os
+import pickle
+import sys
+import time
+
+from pyvows.events import VowsEvents
+from pyvows.result import VowsResult, _PortableContext
+from pyvows.runner.abc import VowsRunnerABC, VowsTopicError
+from pyvows.runner.output import reset_buffers
+from pyvows.utils import elapsed, format_exception
+
+#-------------------------------------------------------------------------------------------------
+
+# The runner whose shards are being executed.  Workers are forked, so they
+# inherit it (along with the already collected suites) from the main process.
+_current_runner = None
+
+
+def _run_shard(shard):
+    # the shared output buffers were inherited from the main process
+    reset_buffers()
+    return _current_runner.run_shard(shard)
+
+
+def _get_fork_context():
+    '''Returns a `multiprocessing` context which forks workers, or `None`
+    if forking isn't available on this platform.'''
+    if not hasattr(os, 'fork'):
+        return None
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('fork')
+    return multiprocessing
+
+
+class _PortableConverter(object):
+    '''Makes result trees picklable: tracebacks are formatted, and values
+    which can't be pickled are replaced by their `repr()`.'''
+
+    def __init__(self):
+        self.memo = {}
+
+    def value(self, value):
+        key = id(value)
+        if key not in self.memo:
+            try:
+                pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+                self.memo[key] = (value, value)
+            except Exception:
+                self.memo[key] = (value, repr(value))
+        return self.memo[key][1]
+
+    def exc_info(self, err_type, err_value, err_traceback):
+        formatted = format_exception(err_type, err_value, err_traceback)
+        portable_value = self.value(err_value)
+        if portable_value is not err_value:
+            err_type, portable_value = Exception, Exception(portable_value)
+        elif self.value(err_type) is not err_type:
+            err_type = Exception
+        return err_type, portable_value, formatted
+
+    def context(self, ctx_result):
+        error = ctx_result.get('error', None)
+        if isinstance(error, VowsTopicError):
+            ctx_result['error'] = VowsTopicError(error.source, self.exc_info(*error.exc_info))
+        elif error is not None:
+            ctx_result['error'] = self.value(error)
+
+        for test in ctx_result['tests']:
+            self.test(test)
+        for subcontext in ctx_result['contexts']:
+            self.context(subcontext)
+        return ctx_result
+
+    def test(self, test):
+        ctx_obj = test['context_instance']
+        test['context_instance'] = _PortableContext(getattr(ctx_obj, 'generated_topic', False))
+        test['topic'] = self.value(test['topic'])
+        test['result'] = self.value(test['result'])
+        if test['error']:
+            err_type, err_value, err_traceback = self.exc_info(
+                test['error']['type'],
+                test['error']['value'],
+                test['error']['traceback'])
+            test['error'] = {
+                'type': err_type,
+                'value': err_value,
+                'traceback': err_traceback
+            }
+        return test
+
+
+class VowsMultiprocessRunner(VowsRunnerABC):
+    '''Distributes top-level batches across `workers` processes.  Each
+    worker runs its batches with `engine`, and the results are merged
+    (in the order the batches were started) into one `VowsResult`.
+
+    Workers are forked from the main process; on platforms without `fork`,
+    or inside a worker, batches are run in-process by `engine`.  Batches sharing a resource
+    (see `Vows.Context.resources`) are run by the same worker, which
+    limits them.  Events of a batch run by a
+    worker are emitted in the main process once its results arrive.
+
+    '''
+
+    def __init__(self, *args, **kwargs):
+        workers = kwargs.pop('workers', None)
+        engine = kwargs.pop('engine', None)
+        super(VowsMultiprocessRunner, self).__init__(*args, **kwargs)
+
+        if engine is None:
+            from pyvows.runner import VowsRunner as engine
+        self.engine = engine
+        self.workers = workers or multiprocessing.cpu_count()
+
+    def run(self):
+        global _current_runner
+
+        start_time = time.time()
+        result = VowsResult()
+
+        shards = self._get_shards()
+        processes = min(self.workers, len(shards))
+        fork_context = _get_fork_context()
+
+        # (workers can't have workers of their own)
+        if processes <= 1 or fork_context is None or multiprocessing.current_process().daemon:
+            return self.create_engine(self.execution_plan, self.events).run()
+        else:
+            _current_runner = self
+            if self.memory_profiler is not None:
+                self.memory_profiler.top_allocators = []
+            pool = fork_context.Pool(processes)
+            try:
+                for contexts, top_allocators in pool.imap(_run_shard, shards, 1):
+                    result.contexts.extend(contexts)
+                    if self.memory_profiler is not None:
+                        self.memory_profiler.merge(top_allocators)
+                    for ctx_result in contexts:
+                        result.counts.merge(ctx_result['counts'])
+                        self.events.replay(ctx_result)
+                pool.close()
+            except:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+                _current_runner = None
+
+        result.elapsed_time = elapsed(start_time)
+        self.events.emit(VowsEvents.RUN_FINISHED, result)
+        return result
+
+    def create_engine(self, execution_plan, events=None):
+        # workers get their own (listener-less) events: whatever they emit
+        # is replayed by the main process
+        return self.engine(
+            self.suites,
+            self.context_class,
+            self.on_vow_success,
+            self.on_vow_error,
+            execution_plan,
+            self.capture_output,
+            concurrency=self.concurrency,
+            max_topics=self.max_topics,
+            max_vows=self.max_vows,
+            events=events,
+            vow_index=self.vow_index,
+            release_results=self.release_results,
+            timings=self.timings,
+            failures=self.failures,
+            code_profiler=self.code_profiler,
+            memory_profiler=self.memory_profiler,
+            fixtures=self.fixtures
+        )
+
+    def _get_shards(self):
+        '''Returns the shards to run: lists of `(suite name, batch name)`
+        pairs, where batches with contexts sharing a resource are in the
+        same shard.  Resources are limited by semaphores, which only the
+        contexts of one process share: a worker running some of those
+        batches can't know when the others hold the resource.'''
+        batch_classes = dict(
+            ((suite_name, batch.__name__), batch)
+            for suite_name, batches in self.suites.items()
+            for batch in batches
+        )
+        batches = [
+            (suite_name, batch_name)
+            for suite_name, suite_plan in self.execution_plan.items()
+            for batch_name in suite_plan['contexts']
+        ]
+        # longest first, so that no worker is left with a long batch after
+        # the others are done
+        batches = self._order_batches(batches)
+
+        shards = []
+        holders = {}  # resource name -> shard
+        for suite_name, batch_name in batches:
+            resources = self._get_resources(
+                batch_classes[(suite_name, batch_name)], self.execution_plan[suite_name]['contexts'][batch_name])
+            shard = None
+            for name in sorted(resources):
+                other = holders.get(name)
+                if other is None or other is shard:
+                    continue
+                if shard is None:
+                    shard = other
+                    continue
+                # this batch shares resources with two shards: merge them
+                shard.extend(other)
+                shards[:] = [kept for kept in shards if kept is not other]
+                for held_name, holder in list(holders.items()):
+                    if holder is other:
+                        holders[held_name] = shard
+            if shard is None:
+                shard = []
+                shards.append(shard)
+            shard.append((suite_name, batch_name))
+            for name in resources:
+                holders[name] = shard
+        return shards
+
+    def run_shard(self, shard):
+        '''Runs the batches of `shard` (a list of `(suite name, batch name)`
+        pairs) inside a worker process, and returns their picklable context
+        results, along with the top memory allocators if profiling memory.'''
+        execution_plan = {}
+        for suite_name, batch_name in shard:
+            suite_plan = execution_plan.setdefault(suite_name, {'contexts': {}})
+            suite_plan['contexts'][batch_name] = self.execution_plan[suite_name]['contexts'][batch_name]
+        if not self.fixtures.keep_alive:
+            # this worker's fixtures last as long as it does
+            self.fixtures.keep_alive = True
+            Finalize(self.fixtures, self.fixtures.close, exitpriority=10)
+        result = self.create_engine(execution_plan).run()
+
+        # progress ticks are written by the worker; don't hold them back
+        sys.stdout.flush()
+
+        converter = _PortableConverter()
+        top_allocators = self.memory_profiler.top_allocators if self.memory_profiler is not None else []
+        return [converter.context(ctx_result) for ctx_result in result.contexts], top_allocators
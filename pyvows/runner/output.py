@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+'''Output capture for PyVows runners.
+
+Everything written to captured `stdout`/`stderr` during a run is appended to
+one shared buffer per stream (spooled to a temporary file once it outgrows
+`SPOOL_SIZE`).  Each running topic or vow writes through an `OutputSink`,
+which only remembers where its own writes landed; results get a
+`CapturedOutput` referencing those segments, and the text is read back only
+when a reporter asks for it.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import tempfile
+import threading
+
+#-------------------------------------------------------------------------------------------------
+
+SPOOL_SIZE = 1024 * 1024
+ENCODING = 'utf-8'
+
+
+class OutputBuffer(object):
+    '''An append-only buffer, kept in memory up to `spool_size` bytes and
+    in a temporary file after that.'''
+
+    def __init__(self, spool_size=SPOOL_SIZE):
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_size, mode='w+b')
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def append(self, text):
+        '''Appends `text`, returning the `(start, end)` offsets it was
+        written at.'''
+        if not isinstance(text, bytes):
+            text = text.encode(ENCODING, 'replace')
+        with self.lock:
+            start = self.size
+            self.file.seek(start)
+            self.file.write(text)
+            self.size += len(text)
+            return start, self.size
+
+    def read(self, segments):
+        '''Returns the text written at `segments` (a list of `(start, end)`
+        offsets).'''
+        chunks = []
+        with self.lock:
+            for start, end in segments:
+                self.file.seek(start)
+                chunks.append(self.file.read(end - start))
+        return b''.join(chunks).decode(ENCODING, 'replace')
+
+
+class CapturedOutput(object):
+    '''The output of a topic or vow: a lazy slice of an `OutputBuffer`.
+    `str()` returns the text, and it compares equal to it.'''
+
+    __slots__ = ('buffer', 'segments')
+
+    def __init__(self, buffer, segments):
+        self.buffer = buffer
+        self.segments = segments
+
+    def _read(self):
+        return self.buffer.read(self.segments)
+
+    if str is bytes:
+        # (Python 2: `unicode()` returns the text)
+        __unicode__ = _read
+
+        def __str__(self):
+            return self._read().encode(ENCODING)
+    else:
+        __str__ = _read
+
+    def __bool__(self):
+        return bool(self.segments)
+    __nonzero__ = __bool__
+
+    def __len__(self):
+        return len(self._read())
+
+    def __eq__(self, other):
+        if isinstance(other, CapturedOutput):
+            other = other._read()
+        return self._read() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._read())
+
+    def __reduce__(self):
+        # the buffer stays behind: send the text
+        text = self._read()
+        return (type(text), (text,))
+
+
+class OutputSink(object):
+    '''A file-like object which writes to `buffer`, and keeps track of the
+    segments it wrote.'''
+
+    encoding = ENCODING
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.segments = []
+
+    def write(self, text):
+        if not text:
+            return
+        start, end = self.buffer.append(text)
+        if self.segments and self.segments[-1][1] == start:
+            self.segments[-1] = (self.segments[-1][0], end)
+        else:
+            self.segments.append((start, end))
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def getvalue(self):
+        '''Returns a `CapturedOutput` of everything written so far (or `''`
+        if nothing was).'''
+        if not self.segments:
+            return ''
+        return CapturedOutput(self.buffer, list(self.segments))
+
+
+_buffers = None
+_buffers_lock = threading.Lock()
+
+
+def get_buffers():
+    '''Returns the shared `(stdout, stderr)` buffers.'''
+    global _buffers
+    if _buffers is None:
+        with _buffers_lock:
+            if _buffers is None:
+                _buffers = (OutputBuffer(), OutputBuffer())
+    return _buffers
+
+
+def reset_buffers():
+    '''Starts new shared buffers: for each run, so that the output of
+    earlier runs isn't kept once their results are gone, and in forked
+    worker processes, which must not append to their parent's.  Existing
+    results (and running sinks) keep the buffers they were written to.'''
+    global _buffers
+    _buffers = None
+
+
+def new_sinks():
+    '''Returns a `(stdout, stderr)` pair of sinks on the shared buffers.'''
+    stdout_buffer, stderr_buffer = get_buffers()
+    return OutputSink(stdout_buffer), OutputSink(stderr_buffer)
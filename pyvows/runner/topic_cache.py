@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+'''Caches the values of topics decorated with `Vows.cached_topic`.
+
+A cached topic is only computed once for the same topic function and the
+same (resolved) parent topic values, e.g. when several contexts inherit
+it.  Parent topic values which can't be hashed are compared by identity.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from collections import OrderedDict
+import inspect
+
+#-------------------------------------------------------------------------------------------------
+
+SCOPES = ('run', 'batch')
+
+
+def get_cache_options(topic_func):
+    '''Returns the `Vows.cached_topic` options of `topic_func` (which may
+    be decorated some more), or `None`.'''
+    while topic_func is not None:
+        options = getattr(topic_func, '_cache_options', None)
+        if options is not None:
+            return options
+        topic_func = getattr(topic_func, '_original', None)
+    return None
+
+
+class _ByIdentity(object):
+    '''Stands for an unhashable topic in a key (and keeps it alive, so
+    that its id isn't reused).'''
+
+    __slots__ = ('topic',)
+
+    def __init__(self, topic):
+        self.topic = topic
+
+    def __eq__(self, other):
+        return isinstance(other, _ByIdentity) and other.topic is self.topic
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return id(self.topic)
+
+
+def _get_key(topic_list):
+    key = []
+    for topic in topic_list:
+        try:
+            hash(topic)
+        except TypeError:
+            topic = _ByIdentity(topic)
+        key.append(topic)
+    return tuple(key)
+
+
+class TopicCache(object):
+    '''The values of one cached topic function, least recently used first.
+
+    `create_lock` returns a lock (a semaphore of size 1) for a key, or
+    `None` if topics can't run concurrently; while a value is being
+    computed, others needing it wait for it instead of computing it too.
+    A key's lock is kept for as long as someone holds or waits for it,
+    whether its value is computed, fails or is evicted meanwhile.
+
+    '''
+
+    def __init__(self, maxsize=None, create_lock=lambda: None):
+        self.maxsize = maxsize
+        self.create_lock = create_lock
+        self.entries = OrderedDict()
+        self.locks = {}  # key -> [lock, how many hold or wait for it]
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, topic_list):
+        return _get_key(topic_list)
+
+    def get_lock(self, key):
+        '''Returns the lock of `key`; `release_lock()` must be called once
+        done with it.'''
+        entry = self.locks.get(key)
+        if entry is None:
+            entry = self.locks[key] = [self.create_lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def release_lock(self, key):
+        '''Forgets the lock of `key` once no one holds or waits for it.'''
+        entry = self.locks[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.locks[key]
+
+    def get(self, key):
+        '''Returns `(True, value)` if `key` is cached, else `(False, None)`.'''
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.pop(key)
+        self.entries[key] = entry
+        return True, self._value_of(entry)
+
+    def put(self, key, value):
+        '''Caches `value` and returns it.  Generators are consumed, and
+        each user gets a new one.'''
+        generated = inspect.isgenerator(value)
+        if generated:
+            value = list(value)
+        entry = self.entries[key] = (value, generated)
+        while self.maxsize is not None and len(self.entries) > self.maxsize:
+            evicted = next(iter(self.entries))
+            del self.entries[evicted]
+        return self._value_of(entry)
+
+    def _value_of(self, entry):
+        value, generated = entry
+        return (item for item in value) if generated else value
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+'''Runs PyVows from a long-lived server process (`pyvows --serve`), so that
+slow imports are paid once instead of on every run.
+
+The server imports the `--preload` modules, then waits for requests on a
+Unix socket.  For each request (`pyvows --client ...`), it forks a child
+which runs PyVows from the client's directory with the client's
+arguments, exactly as `pyvows ...` would: collecting, running and
+reporting.  The child's output is streamed back to the client, which
+exits with the child's exit status.
+
+Children start from the server's state: when a preloaded module changes,
+the server has to be restarted to see it (each run warns about it).  The
+client's environment variables aren't passed on; children have the
+server's.  Only the user running the server may connect to its socket.
+
+The protocol is a JSON request line from the client, answered by frames
+of a kind byte (`o` for output, `x` for the exit status), a 4-byte length,
+and data.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+from __future__ import print_function
+
+import errno
+import importlib
+import json
+import os
+import socket
+import struct
+import sys
+import traceback
+
+from pyvows import cache
+
+#-------------------------------------------------------------------------------------------------
+
+DEFAULT_SOCKET = os.path.join(cache.CACHE_DIR, 'server.sock')
+
+OUTPUT = b'o'
+EXIT_STATUS = b'x'
+_HEADER = struct.Struct('!cI')
+
+# (set in the children running requests)
+_handling_request = False
+
+
+def _send_frame(connection, kind, data):
+    connection.sendall(_HEADER.pack(kind, len(data)) + data)
+
+
+def _receive_exactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise EOFError('The PyVows server closed the connection.')
+        data += chunk
+    return data
+
+
+def _receive_frame(connection):
+    kind, size = _HEADER.unpack(_receive_exactly(connection, _HEADER.size))
+    return kind, _receive_exactly(connection, size)
+
+
+def _exit_status(code):
+    '''Returns the exit status `sys.exit(code)` would give.'''
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def is_handling_request():
+    '''Returns whether this process is a server's child, running a
+    request.'''
+    return _handling_request
+
+
+def _get_mtimes(modules):
+    mtimes = {}
+    for module in modules:
+        filename = getattr(module, '__file__', None)
+        if filename:
+            try:
+                mtimes[filename] = os.stat(filename).st_mtime
+            except OSError:
+                pass
+    return mtimes
+
+
+class VowsServer(object):
+    '''Forks a child running `main(argv)` per request received on the Unix
+    socket `path`.'''
+
+    def __init__(self, path=DEFAULT_SOCKET, preload=(), main=None):
+        self.path = path
+        self.preload = list(preload)
+        self.main = main
+        self.listener = None
+        self.preloaded_mtimes = {}
+
+    def start(self):
+        '''Imports the preloaded modules, and starts listening.'''
+        if os.curdir not in sys.path and '' not in sys.path:
+            sys.path.insert(0, '')
+        before = set(sys.modules)
+        for name in self.preload:
+            importlib.import_module(name)
+        self.preloaded_mtimes = _get_mtimes(
+            module for name, module in list(sys.modules.items()) if name not in before)
+
+        directory = os.path.dirname(self.path)
+        if directory == cache.CACHE_DIR:
+            cache.make_cache_dir()
+        elif directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if os.path.exists(self.path):
+            if is_serving(self.path):
+                raise RuntimeError('A PyVows server is already listening on {0}'.format(self.path))
+            os.remove(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # (created 0600 rather than chmod-ed after: anyone connecting in
+        # between could run code as this user)
+        umask = os.umask(0o177)
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        self.listener.listen(16)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def serve_forever(self):
+        '''Handles requests until interrupted.'''
+        try:
+            while True:
+                connection = self.listener.accept()[0]
+                self._reap_children()
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if os.fork() == 0:
+                    self.listener.close()
+                    os._exit(self._handle(connection))
+                connection.close()
+        finally:
+            self.stop()
+
+    def _reap_children(self):
+        try:
+            while os.waitpid(-1, os.WNOHANG)[0]:
+                pass
+        except OSError as e:
+            if e.errno != errno.ECHILD:
+                raise
+
+    def _handle(self, connection):
+        '''Runs the request of `connection` in a child, sending it the
+        child's output and exit status.  Returns this process' exit
+        status.'''
+        try:
+            line = connection.makefile('rb').readline()
+            if not line:
+                return 0  # (e.g. `is_serving()`)
+            request = json.loads(line.decode('utf-8'))
+            read_end, write_end = os.pipe()
+            child = os.fork()
+            if child == 0:
+                os.close(read_end)
+                connection.close()
+                os.dup2(write_end, 1)
+                os.dup2(write_end, 2)
+                os.close(write_end)
+                os._exit(self._run(request))
+
+            os.close(write_end)
+            while True:
+                data = os.read(read_end, 65536)
+                if not data:
+                    break
+                _send_frame(connection, OUTPUT, data)
+            os.close(read_end)
+            status = os.waitpid(child, 0)[1]
+            status = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 1
+            _send_frame(connection, EXIT_STATUS, str(status).encode('ascii'))
+            return 0
+        except Exception:
+            traceback.print_exc()
+            return 1
+        finally:
+            connection.close()
+
+    def _run(self, request):
+        '''Runs `request` in this (child) process, and returns its exit
+        status.'''
+        global _handling_request
+        _handling_request = True
+        try:
+            os.chdir(request['cwd'])
+            changed = sorted(
+                filename for filename, mtime in _get_mtimes(sys.modules.values()).items()
+                if filename in self.preloaded_mtimes and mtime != self.preloaded_mtimes[filename])
+            if changed:
+                print('WARNING: these preloaded modules changed since the PyVows server started; '
+                      'restart it to use them: {0}'.format(', '.join(changed)), file=sys.stderr)
+            sys.argv = [sys.argv[0]] + list(request['argv'])
+            try:
+                status = _exit_status(self.main())
+            except SystemExit as e:
+                status = _exit_status(e.code)
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return status
+
+
+def is_serving(path=DEFAULT_SOCKET):
+    '''Returns whether a PyVows server is listening on `path`.'''
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+        return True
+    except (IOError, OSError):
+        return False
+    finally:
+        client.close()
+
+
+def request(argv, path=DEFAULT_SOCKET, cwd=None, output=None):
+    '''Runs PyVows with the arguments `argv` on the server listening on
+    `path`, writing its output to `output` (a binary stream; stdout by
+    default).  Returns the exit status, or `None` if no server is
+    listening.'''
+    if output is None:
+        output = getattr(sys.stdout, 'buffer', sys.stdout)
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            client.connect(path)
+        except (IOError, OSError):
+            return None
+        client.sendall(json.dumps({'argv': list(argv), 'cwd': os.path.abspath(cwd or os.curdir)}).encode('utf-8') + b'\n')
+        while True:
+            kind, data = _receive_frame(client)
+            if kind == EXIT_STATUS:
+                return int(data)
+            output.write(data)
+            output.flush()
+    finally:
+        client.close()
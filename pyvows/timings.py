@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+'''Keeps how long contexts and vows took to run, so that the next runs can
+start the slowest batches first.
+
+Timings are kept in a SQLite database in the cache directory
+(`.pyvows_cache/timings.sqlite`, see `pyvows.cache`).  Each run replaces the
+timings of what it ran, leaving the others (e.g. those saved meanwhile by
+a run of other vows) alone.  Without the `sqlite3` module, nothing is
+kept.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from collections import defaultdict
+import os
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from pyvows import cache
+from pyvows.events import VowsEvents
+
+#-------------------------------------------------------------------------------------------------
+
+TIMINGS_NAME = 'timings.sqlite'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS contexts ('
+    '    suite TEXT, context TEXT, topic_elapsed REAL, elapsed REAL,'
+    '    PRIMARY KEY (suite, context))',
+    'CREATE TABLE IF NOT EXISTS vows ('
+    '    suite TEXT, context TEXT, name TEXT, elapsed REAL,'
+    '    PRIMARY KEY (suite, context, name))',
+)
+
+
+class TimingStore(object):
+    '''The elapsed times of a project's contexts and vows.
+
+    Times are keyed by suite (the vows file, relative to `root`) and
+    context id (as in the execution plan).  Enumerated contexts and vows
+    (those run once per value of a generated topic) add up their times.
+
+    A context's `elapsed` time is from its start to its teardown, which
+    includes waiting for whatever else ran concurrently.  So batches are
+    compared by their work instead: the time of all their topics and vows.
+
+    '''
+
+    def __init__(self, root=None):
+        self.root = os.path.realpath(root or os.curdir)
+        self.path = cache.get_cache_path(TIMINGS_NAME, self.root)
+        self.contexts = {}
+        self.vows = {}
+        self._batch_work = None
+        # (the keys `record()` changed since the last `save()`)
+        self._changed_contexts = set()
+        self._changed_vows = set()
+
+    @classmethod
+    def load(cls, root=None):
+        store = cls(root)
+        if sqlite3 is None or not cache.is_enabled() or not os.path.exists(store.path):
+            return store
+        try:
+            connection = sqlite3.connect(store.path)
+            try:
+                for suite, context, topic_elapsed, elapsed in connection.execute(
+                        'SELECT suite, context, topic_elapsed, elapsed FROM contexts'):
+                    store.contexts[(suite, context)] = (topic_elapsed, elapsed)
+                for suite, context, name, elapsed in connection.execute(
+                        'SELECT suite, context, name, elapsed FROM vows'):
+                    store.vows[(suite, context, name)] = elapsed
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            # a broken cache is an empty cache
+            store.contexts, store.vows = {}, {}
+        return store
+
+    def subscribe(self, events):
+        '''Saves the timings of every run `events` reports.'''
+        events.subscribe(VowsEvents.RUN_FINISHED, self.on_run_finished)
+
+    def on_run_finished(self, result):
+        self.record(result)
+        self.save()
+
+    def _suite_key(self, filename):
+        return os.path.relpath(os.path.realpath(filename), self.root)
+
+    #-------------------------------------------------------------------------
+    #   Recording
+    #-------------------------------------------------------------------------
+    def record(self, result):
+        '''Replaces the timings of the contexts (and vows) in `result`.'''
+        contexts = defaultdict(lambda: [0.0, 0.0])
+        vows = defaultdict(float)
+
+        def add_context(ctx_result, suite):
+            key = (suite, ctx_result['id'])
+            contexts[key][0] += ctx_result['topic_elapsed'] or 0.0
+            contexts[key][1] += ctx_result.get('elapsed') or 0.0
+            for test in ctx_result['tests']:
+                vows[key + (test['name'],)] += test['elapsed'] or 0.0
+            for subcontext in ctx_result['contexts']:
+                add_context(subcontext, suite)
+
+        for ctx_result in result.contexts:
+            add_context(ctx_result, self._suite_key(ctx_result['filename']))
+
+        self.contexts.update((key, tuple(times)) for key, times in contexts.items())
+        self.vows.update(vows)
+        self._changed_contexts.update(contexts)
+        self._changed_vows.update(vows)
+        self._batch_work = None
+
+    def save(self):
+        '''Writes the timings `record()` changed to the cache.  Returns
+        whether they could be saved.'''
+        if sqlite3 is None or not cache.is_enabled():
+            return False
+        try:
+            cache.make_cache_dir(self.root)
+            connection = sqlite3.connect(self.path, timeout=5)
+            try:
+                with connection:
+                    for statement in SCHEMA:
+                        connection.execute(statement)
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?)',
+                        [key + self.contexts[key] for key in self._changed_contexts])
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO vows VALUES (?, ?, ?, ?)',
+                        [key + (self.vows[key],) for key in self._changed_vows])
+            finally:
+                connection.close()
+            self._changed_contexts.clear()
+            self._changed_vows.clear()
+            return True
+        except (OSError, sqlite3.Error):
+            return False
+
+    #-------------------------------------------------------------------------
+    #   Scheduling
+    #-------------------------------------------------------------------------
+    def get_context_elapsed(self, suite, context_id):
+        '''Returns how long the context took to run last time, or `None` if
+        it's never been run.'''
+        times = self.contexts.get((self._suite_key(suite), context_id))
+        return times[1] if times else None
+
+    def get_vow_elapsed(self, suite, context_id, vow_name):
+        return self.vows.get((self._suite_key(suite), context_id, vow_name))
+
+    def get_batch_work(self, suite, batch_name):
+        '''Returns how long the topics and vows of a batch took to run last
+        time, or `None` if it's never been run.'''
+        if self._batch_work is None:
+            work = {}
+            for (suite_key, context_id), (topic_elapsed, _) in self.contexts.items():
+                key = (suite_key, context_id.split('.')[0])
+                work[key] = work.get(key, 0.0) + (topic_elapsed or 0.0)
+            for (suite_key, context_id, _), elapsed in self.vows.items():
+                key = (suite_key, context_id.split('.')[0])
+                work[key] = work.get(key, 0.0) + (elapsed or 0.0)
+            self._batch_work = work
+        return self._batch_work.get((self._suite_key(suite), batch_name))
+
+    def order_batches(self, batches, key=None):
+        '''Sorts `batches` longest first (batches which never ran come first,
+        as they may be the slowest of all).  Batches are `(suite, batch
+        name)` pairs, or `key` returns that pair for each of them.  Batches
+        with the same time keep their order.'''
+        def get_elapsed(batch):
+            elapsed = self.get_batch_work(*(key(batch) if key else batch))
+            return float('inf') if elapsed is None else elapsed
+        return sorted(batches, key=get_elapsed, reverse=True)
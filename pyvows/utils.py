@@ -13,28 +13,150 @@ import fnmatch
 import glob
 import os
 import time
+import traceback
+
+from pyvows import cache
 
 #-------------------------------------------------------------------------------------------------
 
 elapsed = lambda start_time: float(round(time.time() - start_time, 6))
 
 
-def locate(pattern, root=os.curdir, recursive=True):
+def format_exception(err_type, err_value, err_traceback):
+    '''Formats an exception like `traceback.format_exception()` does.
+
+    Results that come back from worker processes carry their traceback
+    already formatted as a list of lines (traceback objects can't be
+    pickled); those are returned as-is.
+
+    '''
+    if isinstance(err_traceback, list):
+        return err_traceback
+    return traceback.format_exception(err_type, err_value, err_traceback)
+
+
+# Directories which never contain tests, and aren't worth walking into.
+IGNORED_DIRECTORIES = frozenset([
+    '.git', '.hg', '.svn', '.bzr',
+    '.tox', '.nox', '.eggs', '.pyvows_cache', '.mypy_cache', '.pytest_cache',
+    '__pycache__', 'node_modules',
+])
+LOCATE_CACHE_NAME = 'locate.json'
+
+
+def _read_gitignore(path):
+    '''Returns the patterns of the `.gitignore` file in `path`.  Negated
+    patterns (`!pattern`) aren't supported, and are left out.'''
+    patterns = []
+    try:
+        with open(os.path.join(path, '.gitignore')) as gitignore:
+            for line in gitignore:
+                line = line.strip()
+                if line and not line.startswith(('#', '!')):
+                    patterns.append(line)
+    except (IOError, OSError):
+        pass
+    return patterns
+
+
+def _is_ignored(name, relative_path, patterns):
+    for pattern in patterns:
+        anchored = pattern.startswith('/')
+        pattern = pattern.strip('/')
+        if anchored or '/' in pattern:
+            if fnmatch.fnmatch(relative_path, pattern):
+                return True
+        elif fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _list_directory(path, pattern, listings):
+    '''Returns what `locate()` needs to know about `path`: its
+    subdirectories, the files matching `pattern`, its `.gitignore` patterns,
+    and whether it's a virtualenv.  Listings are reused (from `listings`)
+    for as long as the directory and its `.gitignore` are unchanged.'''
+    mtimes = [_mtime(path), _mtime(os.path.join(path, '.gitignore'))]
+    listing = listings.get(path)
+    if listing is not None and listing['mtimes'] == mtimes:
+        return listing
+
+    dirs, files = [], []
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        if os.path.isdir(entry):
+            # (like `os.walk()`, symlinked directories aren't followed: they
+            # may loop)
+            if not os.path.islink(entry):
+                dirs.append(name)
+        else:
+            files.append(name)
+    listing = listings[path] = {
+        'mtimes': mtimes,
+        'dirs': sorted(dirs),
+        'files': sorted(fnmatch.filter(files, pattern)),
+        'ignore': _read_gitignore(path) if '.gitignore' in files else [],
+        'virtualenv': 'pyvenv.cfg' in files,
+    }
+    return listing
+
+
+def locate(pattern, root=os.curdir, recursive=True, use_cache=False):
     '''Recursively locates test files when `pyvows` is run from the
     command line.
 
+    Directories in `IGNORED_DIRECTORIES`, virtualenvs, directories
+    ignored by a `.gitignore` file (in `root` or below) and symlinks to
+    directories aren't searched.
+    With `use_cache`, the listing of each directory is kept in the PyVows
+    cache, and only directories which changed since are listed again.
+
     '''
     root_path = os.path.abspath(root)
 
-    if recursive:
-        return_files = []
-        for path, dirs, files in os.walk(root_path):
-            for filename in fnmatch.filter(files, pattern):
-                return_files.append(os.path.join(path, filename))
-        return return_files
-    else:
+    if not recursive:
         return glob.glob(os.path.join(root_path, pattern))
 
+    listings = {}
+    if use_cache:
+        cached = cache.load_json(LOCATE_CACHE_NAME, {})
+        if cached.get('root') == root_path and cached.get('pattern') == pattern:
+            listings = cached.get('listings', {})
+
+    found = {}
+    return_files = []
+    pending = [(root_path, [])]
+    while pending:
+        path, inherited_ignores = pending.pop()
+        listing = found[path] = _list_directory(path, pattern, listings)
+        if listing['virtualenv'] and path != root_path:
+            continue
+        ignores = inherited_ignores + [(path, listing['ignore'])] if listing['ignore'] else inherited_ignores
+
+        def is_ignored(name):
+            return any(
+                _is_ignored(name, os.path.relpath(os.path.join(path, name), base).replace(os.sep, '/'), patterns)
+                for base, patterns in ignores
+            )
+
+        return_files.extend(os.path.join(path, name) for name in listing['files'] if not is_ignored(name))
+        for name in reversed(listing['dirs']):
+            if name in IGNORED_DIRECTORIES or name.endswith('.egg-info') or is_ignored(name):
+                continue
+            pending.append((os.path.join(path, name), ignores))
+
+    if use_cache:
+        cache.save_json(LOCATE_CACHE_NAME, {'root': root_path, 'pattern': pattern, 'listings': found})
+
+    return return_files
+
 
 def template():
     '''Provides a template containing boilerplate code for new PyVows test
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+'''Keeps PyVows running, and reruns the vows affected by each change
+(`pyvows --watch`).
+
+The vows files, the project files they import (see
+`pyvows.dependencies`), and the directories of the vows files (where new
+vows files may appear) are watched.  Changes are noticed with inotify when
+the `inotify_simple` package is installed (on Linux), or by polling
+modification times otherwise.
+
+Only the changed modules, and the project modules and vows files importing
+them, are imported again; then only the reloaded vows files are run.
+
+'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+from __future__ import print_function
+
+import os
+import sys
+import time
+import traceback
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+#-------------------------------------------------------------------------------------------------
+
+
+def get_watched_paths(index, suite_files):
+    '''Returns the paths to watch for the vows files `suite_files`, given
+    their `pyvows.dependencies.DependencyIndex`.'''
+    paths = set()
+    for suite in suite_files:
+        paths.add(os.path.realpath(suite))
+        paths.add(os.path.dirname(os.path.realpath(suite)))
+        paths.update(index.get_dependencies(suite))
+    return paths
+
+
+class FileWatcher(object):
+    '''Waits for some of a set of paths to change.'''
+
+    # editors often write a file in several steps: changes are only
+    # reported once nothing changed for `delay` seconds
+    delay = 0.1
+
+    def watch(self, paths):
+        '''Replaces the watched paths with `paths`.'''
+        raise NotImplementedError
+
+    def _read(self, timeout):
+        '''Returns the set of watched paths which changed, waiting at most
+        `timeout` seconds (or forever, if `None`) for one to.'''
+        raise NotImplementedError
+
+    def wait(self, timeout=None):
+        '''Returns the (sorted) watched paths which changed, once some did,
+        or an empty list after `timeout` seconds.'''
+        deadline = None if timeout is None else time.time() + timeout
+        changed = set()
+        while not changed:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return []
+            changed = self._read(remaining)
+
+        more = self._read(self.delay)
+        while more:
+            changed.update(more)
+            more = self._read(self.delay)
+        return sorted(changed)
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+class PollingWatcher(FileWatcher):
+    '''Notices changes by checking the modification time (and size) of
+    each path every `interval` seconds.'''
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.stats = {}
+
+    def watch(self, paths):
+        # (paths already watched keep their old stat, so that changes
+        # made while the vows ran are noticed)
+        self.stats = dict((path, self.stats[path] if path in self.stats else _stat(path)) for path in paths)
+
+    def _poll(self):
+        changed = set()
+        for path, stat in self.stats.items():
+            current = _stat(path)
+            if current != stat:
+                self.stats[path] = current
+                changed.add(path)
+        return changed
+
+    def _read(self, timeout):
+        changed = self._poll()
+        if not changed:
+            time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+            changed = self._poll()
+        return changed
+
+
+class InotifyWatcher(FileWatcher):
+    '''Notices changes with inotify, watching the directories of the paths.'''
+
+    if INotify is not None:
+        FILE_EVENTS = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+        DIRECTORY_EVENTS = flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+
+    def __init__(self):
+        self.inotify = INotify()
+        self.paths = set()
+        self.directories = {}
+
+    def watch(self, paths):
+        self.paths = set(paths)
+        directories = set(path if os.path.isdir(path) else os.path.dirname(path) for path in self.paths)
+        for descriptor, directory in list(self.directories.items()):
+            if directory not in directories:
+                del self.directories[descriptor]
+                try:
+                    self.inotify.rm_watch(descriptor)
+                except OSError:
+                    pass
+        for directory in directories - set(self.directories.values()):
+            try:
+                self.directories[self.inotify.add_watch(directory, self.FILE_EVENTS | self.DIRECTORY_EVENTS)] = directory
+            except OSError:
+                pass  # (it was removed since)
+
+    def _read(self, timeout):
+        changed = set()
+        for event in self.inotify.read(timeout=None if timeout is None else int(timeout * 1000)):
+            directory = self.directories.get(event.wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, event.name)
+            if path in self.paths:
+                changed.add(path)
+            elif directory in self.paths and event.mask & self.DIRECTORY_EVENTS:
+                changed.add(directory)
+        return changed
+
+
+def get_watcher(interval=0.5):
+    '''Returns an `InotifyWatcher` if inotify is available, else a
+    `PollingWatcher` checking every `interval` seconds.'''
+    if INotify is not None:
+        try:
+            return InotifyWatcher()
+        except OSError:
+            pass  # (e.g. too many inotify instances)
+    return PollingWatcher(interval)
+
+
+def watch(path, pattern, watcher, on_vow_success=None, on_vow_error=None, **options):
+    '''Waits for changes to the collected vows files (or to the project
+    files they import), and yields the result of running the vows files
+    each change affects, until interrupted.
+
+    `options` are passed to `Vows.run()`.  Changes made while vows are
+    running are noticed once they're done.
+
+    '''
+    # needs to be imported here, else the no-color option won't work
+    from pyvows.core import Vows
+
+    # the first run may have been restricted to what failed last time;
+    # reruns are restricted to what changed instead
+    Vows.inclusion_ids = None
+
+    while True:
+        paths = get_watched_paths(Vows.dependency_index, Vows.suite_files)
+        watcher.watch(paths)
+        print('Watching {0} files for changes (press Ctrl+C to stop)...'.format(len(paths)))
+        changed = watcher.wait()
+
+        try:
+            suites = Vows.reload(path, pattern, changed)
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+            continue
+        if suites:
+            yield Vows.run(on_vow_success, on_vow_error, suites=suites, **options)
@@ -11,6 +11,9 @@
 import time
 
 from pyvows import Vows, expect
+from pyvows.async_topic import VowsAsyncTopicTimeout
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
 
 #-------------------------------------------------------------------------------------------------
 
@@ -70,3 +73,39 @@ class AsyncTopic(Vows.Context):
 
                 def should_be_1(self, topic):
                     expect(topic).to_equal(1)
+
+
+@Vows.batch
+class AsyncTopicTimeout(Vows.Context):
+    def topic(self):
+        for runner_name in sorted(RUNNERS):
+            dummySuite = {'dummySuite': set([NeverCalledBack])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            result = get_runner(runner_name)(dummySuite, Vows.Context, None, None, execution_plan, False).run()
+            yield runner_name, result
+
+    def fails_the_topic(self, topic):
+        runner_name, result = topic
+        error = result.contexts[0]['error']
+        expect(error.source).to_equal('topic')
+        expect(error.exc_info[1]).to_be_an_error_like(VowsAsyncTopicTimeout)
+
+    def skips_its_vows(self, topic):
+        runner_name, result = topic
+        expect(result.skipped_tests).to_equal(1)
+
+    class WithTheDefaultTimeout(Vows.Context):
+        def topic(self):
+            return Vows.async_topic(lambda context, callback: None)(self).timeout
+
+        def is_a_minute(self, topic):
+            expect(topic).to_equal(60)
+
+
+class NeverCalledBack(Vows.Context):
+    @Vows.async_topic(timeout=0.1)
+    def topic(self, callback):
+        pass
+
+    def is_never_run(self, topic):
+        pass
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Batches for `asyncio_runner_vows`, which only imports them when the
+asyncio runner is available (`async def` doesn't compile on Python 2).'''
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import asyncio
+
+from pyvows import Vows, expect
+
+#-------------------------------------------------------------------------------------------------
+
+
+class CoroutineBatch(Vows.Context):
+    async def topic(self):
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def is_awaited(self, topic):
+        await asyncio.sleep(0)
+        expect(topic).to_equal(42)
+
+    def can_be_a_plain_function(self, topic):
+        expect(topic).to_equal(42)
+
+    class SlowSibling(Vows.Context):
+        async def topic(self, parent_topic):
+            await asyncio.sleep(0.05)
+            return parent_topic + 1
+
+        async def gets_the_parent_topic(self, topic):
+            expect(topic).to_equal(43)
+
+    class OtherSlowSibling(Vows.Context):
+        async def topic(self):
+            await asyncio.sleep(0.05)
+            for value in (1, 2, 3):
+                yield value
+
+        def is_generated(self, topic):
+            expect(topic).to_be_greater_than(0)
+
+    class CallbackTopic(Vows.Context):
+        @Vows.async_topic
+        def topic(self, callback):
+            callback(1, key='value')
+
+        def gets_the_callback_arguments(self, topic):
+            expect(topic.key).to_equal('value')
+
+
+class ConcurrencyBatch(Vows.Context):
+    running = 0
+    most_running = 0
+
+    async def _track(self):
+        ConcurrencyBatch.running += 1
+        ConcurrencyBatch.most_running = max(ConcurrencyBatch.running, ConcurrencyBatch.most_running)
+        await asyncio.sleep(0.01)
+        ConcurrencyBatch.running -= 1
+
+    async def first(self, topic):
+        await self._track()
+
+    async def second(self, topic):
+        await self._track()
+
+    async def third(self, topic):
+        await self._track()
+
+    async def fourth(self, topic):
+        await self._track()
+
+
+class BrokenBatch(Vows.Context):
+    async def topic(self):
+        raise RuntimeError('broken')
+
+    def never_runs(self, topic):
+        pass
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import importlib
+
+from pyvows import Vows, expect
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+
+
+def get_batch(name):
+    # (from the sibling module `tests.asyncio_batches`, or `asyncio_batches`
+    # when the vows are collected from the `tests` directory)
+    package = __name__.rpartition('.')[0]
+    return getattr(importlib.import_module(package + '.asyncio_batches' if package else 'asyncio_batches'), name)
+
+
+def run_with_asyncio(batch, concurrency=None):
+    dummySuite = {'dummySuite': set([batch])}
+    execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+    runner = get_runner('asyncio')(dummySuite, Vows.Context, None, None, execution_plan, False, concurrency=concurrency)
+    return runner.run()
+
+
+@Vows.batch
+@Vows.skip_if('asyncio' not in RUNNERS, 'the asyncio runner needs Python 3.7')
+class AsyncioRunner(Vows.Context):
+
+    class WithCoroutines(Vows.Context):
+        def topic(self):
+            return run_with_asyncio(get_batch('CoroutineBatch'))
+
+        def all_vows_are_honored(self, topic):
+            expect(topic.successful).to_be_true()
+
+        def counts_every_vow(self, topic):
+            # 4 vows + 3 generated values + 4 contexts
+            expect(topic.successful_tests).to_equal(11)
+
+        def runs_sibling_contexts_concurrently(self, topic):
+            expect(topic.elapsed_time).to_be_lesser_than(0.15)
+
+    class WithAConcurrencyLimit(Vows.Context):
+        def topic(self):
+            batch = get_batch('ConcurrencyBatch')
+            batch.running = batch.most_running = 0
+            run_with_asyncio(batch, concurrency=2)
+            return batch.most_running
+
+        def never_runs_more_vows_at_once(self, topic):
+            expect(topic).to_equal(2)
+
+    class WithABrokenCoroutineTopic(Vows.Context):
+        def topic(self):
+            return run_with_asyncio(get_batch('BrokenBatch'))
+
+        def reports_the_topic_error(self, topic):
+            expect(topic.contexts[0]['error'].source).to_equal('topic')
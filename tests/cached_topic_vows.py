@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from pyvows import Vows, expect
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.topic_cache import TopicCache
+
+CALLS = []
+
+
+def pause():
+    try:
+        import gevent
+    except ImportError:
+        pass
+    else:
+        gevent.sleep(0.001)
+
+
+class SharedFixture(Vows.Context):
+    @Vows.cached_topic
+    def topic(self, parent):
+        CALLS.append(('run', parent))
+        pause()
+        return [parent]
+
+    def is_computed_from_the_parent(self, topic):
+        expect(topic).to_equal(['parent'])
+
+
+class BatchFixture(Vows.Context):
+    @Vows.cached_topic(scope='batch')
+    def topic(self):
+        CALLS.append(('batch', None))
+        return (value for value in range(3))
+
+    def is_a_fresh_generator(self, topic):
+        expect(topic).to_be_numeric()
+
+
+class CachedBatch(Vows.Context):
+    def topic(self):
+        return 'parent'
+
+    class First(SharedFixture):
+        pass
+
+    class Second(SharedFixture):
+        class Child(Vows.Context):
+            def topic(self, fixture):
+                return fixture
+
+            def gets_the_cached_value(self, topic):
+                expect(topic).to_equal(['parent'])
+
+    class Third(BatchFixture):
+        pass
+
+    class Fourth(BatchFixture):
+        pass
+
+
+class OtherCachedBatch(Vows.Context):
+    def topic(self):
+        return 'parent'
+
+    class First(SharedFixture):
+        pass
+
+    class Second(BatchFixture):
+        pass
+
+
+class BrokenFixture(Vows.Context):
+    @Vows.cached_topic
+    def topic(self):
+        pause()
+        raise ValueError('broken')
+
+    def is_not_run(self, topic):
+        pass
+
+
+class FailingCachedBatch(Vows.Context):
+    class First(BrokenFixture):
+        pass
+
+    class Second(BrokenFixture):
+        pass
+
+
+def run_cached(runner_name):
+    del CALLS[:]
+    suites = {'cached_vows.py': set([CachedBatch, OtherCachedBatch])}
+    execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+    result = get_runner(runner_name)(suites, Vows.Context, None, None, execution_plan).run()
+    return result, list(CALLS)
+
+
+@Vows.batch
+class CachedTopics(Vows.Context):
+
+    class WhenRun(Vows.Context):
+        def topic(self):
+            for runner_name in (None, 'sequential', 'asyncio'):
+                if runner_name is None or runner_name in RUNNERS:
+                    yield run_cached(runner_name)
+
+        def are_honored(self, topic):
+            expect(topic[0].successful).to_be_true()
+            expect(topic[0].errored_tests).to_equal(0)
+
+        def are_computed_once_per_run(self, topic):
+            expect(topic[1].count(('run', 'parent'))).to_equal(1)
+
+        def are_computed_once_per_batch(self, topic):
+            expect(topic[1].count(('batch', None))).to_equal(2)
+
+    class LeastRecentlyUsed(Vows.Context):
+        def topic(self):
+            cache = TopicCache(maxsize=2)
+            cache.put(('a',), 1)
+            cache.put(('b',), 2)
+            cache.get(('a',))
+            cache.put(('c',), 3)
+            return cache
+
+        def drops_the_least_recently_used_value(self, topic):
+            expect(list(topic.entries)).to_equal([('a',), ('c',)])
+
+        def counts_hits_and_misses(self, topic):
+            expect((topic.hits, topic.misses)).to_equal((1, 0))
+
+    class Locks(Vows.Context):
+        def topic(self):
+            cache = TopicCache(maxsize=1, create_lock=object)
+            first, second = cache.get_lock(('a',)), cache.get_lock(('a',))
+            # (the value of ('a',) is evicted while the second user waits)
+            cache.put(('a',), 1)
+            cache.release_lock(('a',))
+            cache.put(('b',), 2)
+            kept = list(cache.locks)
+            cache.release_lock(('a',))
+            return first is second, kept, list(cache.locks)
+
+        def are_shared_by_the_users_of_a_key(self, topic):
+            expect(topic[0]).to_be_true()
+
+        def are_kept_while_awaited(self, topic):
+            expect(topic[1]).to_equal([('a',)])
+
+        def are_dropped_once_released(self, topic):
+            expect(topic[2]).to_be_empty()
+
+    class Failing(Vows.Context):
+        def topic(self):
+            suites = {'cached_vows.py': set([FailingCachedBatch])}
+            execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+            runner = get_runner()(suites, Vows.Context, None, None, execution_plan)
+            result = runner.run()
+            return result, [cache.locks for cache in runner.topic_caches.values()]
+
+        def are_reported(self, topic):
+            expect(topic[0].successful).to_be_false()
+
+        def leave_no_locks(self, topic):
+            expect(topic[1]).Not.to_be_empty()
+            for locks in topic[1]:
+                expect(locks).to_be_empty()
+
+    class UnhashableTopics(Vows.Context):
+        def topic(self):
+            cache = TopicCache()
+            parent = {'a': 1}
+            cache.put(cache.get_key([parent]), 'value')
+            return cache.get(cache.get_key([parent])), cache.get(cache.get_key([{'a': 1}]))
+
+        def are_the_same_when_identical(self, topic):
+            expect(topic[0]).to_equal((True, 'value'))
+
+        def are_different_otherwise(self, topic):
+            expect(topic[1]).to_equal((False, None))
+
+    class WithAnUnknownScope(Vows.Context):
+        @Vows.capture_error
+        def topic(self):
+            return Vows.cached_topic(scope='forever')
+
+        def is_an_error(self, topic):
+            expect(topic).to_be_an_error_like(ValueError)
@@ -69,6 +69,20 @@ class CapturedOutputVows(Vows.Context):
             runner = VowsRunner(dummySuite, Vows.Context, None, None, execution_plan, True)
             return runner.run()
 
+    class ResultsFromConsecutiveRuns(Vows.Context):
+        def topic(self):
+            dummySuite = {'dummySuite': set([OutputSomeStuff])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            return [
+                VowsRunner(dummySuite, Vows.Context, None, None, execution_plan, False).run().contexts[0]['stdout']
+                for run in range(2)]
+
+        def are_written_to_buffers_of_their_own(self, topic):
+            expect(topic[0].buffer).Not.to_equal(topic[1].buffer)
+
+        def keep_the_output_of_earlier_runs(self, topic):
+            expect(topic[0]).to_equal('setup\ntopic\nteardown\n')
+
 
 class OutputSomeStuff(Vows.Context):
     def setup(self):
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import time
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows.runner import get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+
+
+class Gauge(object):
+    '''Tracks how many topics and vows are running at the same time.'''
+
+    def __init__(self):
+        self.running = {'topic': 0, 'vow': 0}
+        self.highest = {'topic': 0, 'vow': 0}
+
+    def measure(self, kind):
+        self.running[kind] += 1
+        self.highest[kind] = max(self.highest[kind], self.running[kind])
+        self.sleep()
+        self.running[kind] -= 1
+
+    def sleep(self):
+        try:
+            import gevent
+        except ImportError:
+            time.sleep(0.001)
+        else:
+            gevent.sleep(0.001)
+
+
+def run_limited(batch, **limits):
+    batch.gauge = Gauge()
+    dummySuite = {'dummySuite': set([batch])}
+    execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+    runner = get_runner(None)(dummySuite, Vows.Context, None, None, execution_plan, False, **limits)
+    result = runner.run()
+    return result, batch.gauge.highest
+
+
+def make_batch(max_concurrency=None):
+    class LimitedBatch(Vows.Context):
+        def topic(self):
+            return 1
+
+        def vow_a(self, topic):
+            LimitedBatch.gauge.measure('vow')
+
+        def vow_b(self, topic):
+            LimitedBatch.gauge.measure('vow')
+
+        def vow_c(self, topic):
+            LimitedBatch.gauge.measure('vow')
+
+        def vow_d(self, topic):
+            LimitedBatch.gauge.measure('vow')
+
+        class First(Vows.Context):
+            def topic(self):
+                LimitedBatch.gauge.measure('topic')
+
+        class Second(Vows.Context):
+            def topic(self):
+                LimitedBatch.gauge.measure('topic')
+
+        class Third(Vows.Context):
+            def topic(self):
+                LimitedBatch.gauge.measure('topic')
+
+    LimitedBatch.max_concurrency = max_concurrency
+    return LimitedBatch
+
+
+@Vows.batch
+class ConcurrencyLimits(Vows.Context):
+
+    class ForVows(Vows.Context):
+        def topic(self):
+            return run_limited(make_batch(), max_vows=2)
+
+        def runs_everything(self, topic):
+            expect(topic[0].successful_tests).to_equal(8)
+
+        def are_honored(self, topic):
+            expect(topic[1]['vow']).to_be_lesser_than(3)
+
+    class ForTopics(Vows.Context):
+        def topic(self):
+            return run_limited(make_batch(), max_topics=1)
+
+        def are_honored(self, topic):
+            expect(topic[1]['topic']).to_equal(1)
+
+    class ForABatch(Vows.Context):
+        def topic(self):
+            return run_limited(make_batch(max_concurrency=1))
+
+        def runs_everything(self, topic):
+            expect(topic[0].successful_tests).to_equal(8)
+
+        def run_one_thing_at_a_time(self, topic):
+            expect(topic[1]).to_equal({'topic': 1, 'vow': 1})
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--max-topics', '5', '--max-vows', '50'])
+
+        def has_the_topic_limit(self, topic):
+            expect(topic.max_topics).to_equal(5)
+
+        def has_the_vow_limit(self, topic):
+            expect(topic.max_vows).to_equal(50)
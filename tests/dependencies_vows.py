@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+import shutil
+import sys
+import tempfile
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows.dependencies import DependencyIndex
+
+
+def make_project(files):
+    root = os.path.realpath(tempfile.mkdtemp())
+    for name, source in files.items():
+        with open(os.path.join(root, name), 'w') as module_file:
+            module_file.write(source)
+    return root
+
+
+def in_project(root, *names):
+    return set(os.path.join(root, name) for name in names)
+
+
+@Vows.batch
+class Dependencies(Vows.Context):
+
+    class WhenRecording(Vows.Context):
+        def topic(self):
+            root = make_project({
+                'depsmodel.py': 'VALUE = 1\n',
+                'depsservice.py': 'from depsmodel import VALUE\n',
+                'depsservice_vows.py': 'import os\nimport depsservice\n',
+            })
+            index = DependencyIndex(root)
+            sys.path.insert(0, root)
+            try:
+                with index.recording():
+                    index.record_suite(os.path.join(root, 'depsservice_vows.py'))
+                    __import__('depsservice_vows')
+            finally:
+                sys.path.remove(root)
+                for name in ('depsmodel', 'depsservice', 'depsservice_vows'):
+                    sys.modules.pop(name, None)
+            index.save()
+            return root, index
+
+        def records_direct_imports(self, topic):
+            root, index = topic
+            expect(index.graph[os.path.join(root, 'depsservice_vows.py')]).to_equal(
+                in_project(root, 'depsservice.py'))
+
+        def records_transitive_imports(self, topic):
+            root, index = topic
+            expect(index.get_dependencies(os.path.join(root, 'depsservice_vows.py'))).to_equal(
+                in_project(root, 'depsservice.py', 'depsmodel.py'))
+
+        class WhenLoadedBack(Vows.Context):
+            def topic(self, recorded):
+                root, index = recorded
+                try:
+                    return index.graph, DependencyIndex.load(root).graph
+                finally:
+                    shutil.rmtree(root)
+
+            def has_the_same_graph(self, topic):
+                expect(topic[1]).to_equal(topic[0])
+
+    class WhenSelecting(Vows.Context):
+        def topic(self):
+            index = DependencyIndex('/project', {
+                '/project/a_vows.py': set(['/project/a.py']),
+                '/project/a.py': set(['/project/model.py']),
+                '/project/b_vows.py': set(['/project/b.py']),
+            })
+            suites = ['/project/a_vows.py', '/project/b_vows.py', '/project/new_vows.py']
+            return index, suites
+
+        def picks_suites_importing_a_changed_file(self, topic):
+            index, suites = topic
+            expect(index.get_affected_suites(suites, ['/project/model.py'])).to_equal(
+                ['/project/a_vows.py', '/project/new_vows.py'])
+
+        def picks_changed_suites(self, topic):
+            index, suites = topic
+            expect(index.get_affected_suites(suites, ['/project/b_vows.py'])).to_equal(
+                ['/project/b_vows.py', '/project/new_vows.py'])
+
+        def always_picks_unknown_suites(self, topic):
+            index, suites = topic
+            expect(index.get_affected_suites(suites, [])).to_equal(['/project/new_vows.py'])
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args([
+                '--changed-since', 'HEAD~1', '--changed-files', 'a.py,b.py', '--changed-files', 'c.py'])
+
+        def has_the_revision(self, topic):
+            expect(topic.changed_since).to_equal('HEAD~1')
+
+        def has_the_files(self, topic):
+            expect(topic.changed_files).to_equal(['a.py,b.py', 'c.py'])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import sys
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from pyvows import Vows, expect
+from pyvows.events import VowsEvents
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+
+
+def run_and_record(runner_name):
+    recorded = []
+    events = VowsEvents()
+    events.subscribe(VowsEvents.CONTEXT_STARTED, lambda context: recorded.append(('started', context['name'])))
+    events.subscribe(VowsEvents.TOPIC_FINISHED, lambda context: recorded.append(('topic', context['name'])))
+    events.subscribe(VowsEvents.VOW_FINISHED, lambda vow, context: recorded.append(('vow', vow['name'])))
+    events.subscribe(VowsEvents.CONTEXT_TORN_DOWN, lambda context: recorded.append(('torn down', context['name'])))
+    events.subscribe(VowsEvents.RUN_FINISHED, lambda result: recorded.append(('finished', result.successful_tests)))
+
+    dummySuite = {'dummySuite': set([EventfulBatch])}
+    execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+    runner = get_runner(runner_name)(dummySuite, Vows.Context, None, None, execution_plan, False, events=events)
+    return runner.run(), recorded
+
+
+def record_torn_down(runner_name):
+    '''Returns the name and vow count of each context, as it's torn down.'''
+    recorded = []
+    events = VowsEvents()
+    events.subscribe(VowsEvents.CONTEXT_TORN_DOWN, lambda context: recorded.append(
+        (context['name'], context['counts'].errored + context['counts'].skipped + context['counts'].successful)))
+
+    dummySuite = {'dummySuite': set([FailingBatch])}
+    execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+    get_runner(runner_name)(dummySuite, Vows.Context, None, None, execution_plan, False, events=events).run()
+    return recorded
+
+
+EXPECTED_EVENTS = [
+    ('started', 'EventfulBatch'),
+    ('topic', 'EventfulBatch'),
+    ('vow', 'is_one'),
+    ('started', 'Nested'),
+    ('topic', 'Nested'),
+    ('vow', 'is_two'),
+    ('torn down', 'Nested'),
+    ('torn down', 'EventfulBatch'),
+    ('finished', 4),
+]
+
+
+@Vows.batch
+class Events(Vows.Context):
+
+    class WithTheSequentialRunner(Vows.Context):
+        def topic(self):
+            return run_and_record('sequential')[1]
+
+        def are_emitted_in_order(self, topic):
+            expect(topic).to_equal(EXPECTED_EVENTS)
+
+    class WithTheGeventRunner(Vows.Context):
+        def topic(self):
+            return run_and_record('gevent')[1]
+
+        def are_all_emitted(self, topic):
+            expect(sorted(topic)).to_equal(sorted(EXPECTED_EVENTS))
+
+        def end_with_the_run(self, topic):
+            expect(topic[-1]).to_equal(('finished', 4))
+
+    @Vows.skip_if('asyncio' not in RUNNERS, 'the asyncio runner needs Python 3.7')
+    class WithTheAsyncioRunner(Vows.Context):
+        def topic(self):
+            return run_and_record('asyncio')[1]
+
+        def are_all_emitted(self, topic):
+            expect(sorted(topic)).to_equal(sorted(EXPECTED_EVENTS))
+
+    class WhenAContextFails(Vows.Context):
+        def topic(self):
+            for runner_name in (None, 'sequential', 'asyncio'):
+                if runner_name is None or runner_name in RUNNERS:
+                    yield record_torn_down(runner_name)
+
+        def is_torn_down_after_its_subcontexts(self, topic):
+            expect(topic).to_equal([('Child', 3), ('Broken', 4), ('FailingBatch', 5)])
+
+    class WhenReplayed(Vows.Context):
+        def topic(self):
+            result = run_and_record('sequential')[0]
+            recorded = []
+            events = VowsEvents()
+            events.subscribe(VowsEvents.VOW_FINISHED, lambda vow, context: recorded.append(vow['name']))
+            events.replay(result.contexts[0])
+            return recorded
+
+        def emit_every_vow(self, topic):
+            expect(topic).to_equal(['is_one', 'is_two'])
+
+    class WithABrokenListener(Vows.Context):
+        def topic(self):
+            events = VowsEvents()
+            called = []
+            events.subscribe(VowsEvents.RUN_FINISHED, lambda result: 1 / 0)
+            events.subscribe(VowsEvents.RUN_FINISHED, called.append)
+            # (the traceback goes to the real stderr, even when capturing)
+            stderr, sys.__stderr__ = sys.__stderr__, StringIO()
+            try:
+                events.emit(VowsEvents.RUN_FINISHED, 'result')
+                return called, sys.__stderr__.getvalue()
+            finally:
+                sys.__stderr__ = stderr
+
+        def still_notifies_the_others(self, topic):
+            expect(topic[0]).to_equal(['result'])
+
+        def reports_the_error(self, topic):
+            expect(topic[1]).to_include('Traceback')
+            expect(topic[1]).to_include('ZeroDivisionError')
+
+    class UnknownEvent(Vows.Context):
+        @Vows.capture_error
+        def topic(self):
+            VowsEvents().subscribe('context_exploded', None)
+
+        def is_an_error(self, topic):
+            expect(topic).to_be_an_error_like(ValueError)
+
+
+class EventfulBatch(Vows.Context):
+    def topic(self):
+        return 1
+
+    def is_one(self, topic):
+        expect(topic).to_equal(1)
+
+    class Nested(Vows.Context):
+        def topic(self):
+            return 2
+
+        def is_two(self, topic):
+            expect(topic).to_equal(2)
+
+
+class FailingBatch(Vows.Context):
+    class Broken(Vows.Context):
+        def topic(self):
+            raise RuntimeError('broken topic')
+
+        class Child(Vows.Context):
+            def first(self, topic):
+                pass
+
+            def second(self, topic):
+                pass
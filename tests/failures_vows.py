@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+import shutil
+import tempfile
+
+from pyvows import Vows, cache, expect
+from pyvows.cli import Parser
+from pyvows.failures import FAILURES_NAME, FailureStore
+from pyvows.result import VowsResult
+from pyvows.runner import get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+
+
+def context_result(ctx_id, error=None, tests=(), contexts=(), filename='things_vows.py'):
+    return {
+        'filename': os.path.join(os.path.realpath(os.curdir), filename),
+        'id': ctx_id,
+        'error': error,
+        'tests': [{'name': name, 'error': test_error} for name, test_error in tests],
+        'contexts': list(contexts),
+    }
+
+
+def make_result():
+    result = VowsResult()
+    result.contexts = [
+        context_result('Things', tests=[('works', None), ('breaks', {'type': AssertionError})], contexts=[
+            context_result('Things.Broken', error=Exception('topic')),
+        ]),
+        context_result('Others', tests=[('breaks', None)], filename='other_vows.py'),
+    ]
+    return result
+
+
+class PassingBatch(Vows.Context):
+    def works(self, topic):
+        pass
+
+
+class FailingBatch(PassingBatch):
+    pass
+
+
+@Vows.batch
+class Failures(Vows.Context):
+
+    class WhenRecorded(Vows.Context):
+        def topic(self):
+            store = FailureStore(failures=[
+                ('things_vows.py', 'Things.works'), ('things_vows.py', 'Others.breaks'),
+                ('other_vows.py', 'Others.breaks')])
+            store.record(make_result())
+            return store
+
+        def has_the_broken_vows(self, topic):
+            expect(topic.failures).to_include(('things_vows.py', 'Things.breaks'))
+
+        def has_the_broken_contexts(self, topic):
+            expect(topic.failures).to_include(('things_vows.py', 'Things.Broken'))
+
+        def forgets_what_passed_this_time(self, topic):
+            expect(topic.failures).Not.to_include(('things_vows.py', 'Things.works'))
+
+        def keeps_what_did_not_run(self, topic):
+            expect(topic.failures).to_include(('things_vows.py', 'Others.breaks'))
+
+        def tells_apart_batches_of_other_suites(self, topic):
+            expect(topic.failures).Not.to_include(('other_vows.py', 'Others.breaks'))
+
+        def knows_the_failed_batches(self, topic):
+            expect(topic.get_batches()).to_equal(set([('things_vows.py', 'Things'), ('things_vows.py', 'Others')]))
+
+        def knows_the_failed_ids(self, topic):
+            root = os.path.realpath(os.curdir)
+            expect(topic.ids).to_equal(set([
+                (os.path.join(root, 'things_vows.py'), 'Things.breaks'),
+                (os.path.join(root, 'things_vows.py'), 'Things.Broken'),
+                (os.path.join(root, 'things_vows.py'), 'Others.breaks'),
+            ]))
+
+    class WhenSaved(Vows.Context):
+        def topic(self):
+            root = tempfile.mkdtemp()
+            try:
+                FailureStore(root, [('things_vows.py', 'Things.breaks')]).save()
+                return FailureStore.load(root).failures
+            finally:
+                shutil.rmtree(root)
+
+        def loads_the_same_failures(self, topic):
+            expect(topic).to_equal(set([('things_vows.py', 'Things.breaks')]))
+
+    class WhenLoadedFromAnOlderCache(Vows.Context):
+        def topic(self):
+            root = tempfile.mkdtemp()
+            try:
+                cache.save_json(FAILURES_NAME, {'failed': ['Things.breaks']}, root)
+                return FailureStore.load(root).failures
+            finally:
+                shutil.rmtree(root)
+
+        def drops_the_bare_ids(self, topic):
+            expect(topic).to_equal(set())
+
+    class WhenRunningFailedFirst(Vows.Context):
+        def topic(self):
+            suites = {os.path.abspath('failures_suite_vows.py'): set([PassingBatch, FailingBatch])}
+            execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+            failures = FailureStore(failures=[('failures_suite_vows.py', 'FailingBatch.works')])
+            runner = get_runner('sequential')(suites, Vows.Context, None, None, execution_plan, failures=failures)
+            return [context['name'] for context in runner.run().contexts]
+
+        def starts_the_failed_batch_first(self, topic):
+            expect(topic[0]).to_equal('FailingBatch')
+
+    class WhenRunningLastFailed(Vows.Context):
+        def topic(self):
+            # (the same batch name in two suites: only one of them failed)
+            suites = {
+                os.path.abspath('failures_suite_vows.py'): set([FailingBatch]),
+                os.path.abspath('other_failures_suite_vows.py'): set([FailingBatch]),
+            }
+            failures = FailureStore(failures=[('failures_suite_vows.py', 'FailingBatch.works')])
+            execution_plan = ExecutionPlanner(suites, set(), set(), failures.ids).plan()
+            return dict(
+                (os.path.basename(suite), list(suite_plan['contexts'])) for suite, suite_plan in execution_plan.items())
+
+        def runs_the_failed_batch(self, topic):
+            expect(topic['failures_suite_vows.py']).to_equal(['FailingBatch'])
+
+        def skips_the_batch_of_the_same_name_in_the_other_suite(self, topic):
+            expect(topic['other_failures_suite_vows.py']).to_be_empty()
+
+    class WhenOrderingBatches(Vows.Context):
+        def topic(self):
+            store = FailureStore(failures=[('things_vows.py', 'Things.breaks')])
+            return store.order_batches([
+                (os.path.abspath('other_vows.py'), 'Things'),
+                (os.path.abspath('things_vows.py'), 'Others'),
+                (os.path.abspath('things_vows.py'), 'Things'),
+            ], key=lambda item: item)
+
+        def starts_the_failed_batch_first_and_keeps_the_others_order(self, topic):
+            expect([(os.path.basename(suite), name) for suite, name in topic]).to_equal([
+                ('things_vows.py', 'Things'), ('other_vows.py', 'Things'), ('things_vows.py', 'Others')])
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--last-failed', '--failed-first'])
+
+        def has_last_failed(self, topic):
+            expect(topic.last_failed).to_be_true()
+
+        def has_failed_first(self, topic):
+            expect(topic.failed_first).to_be_true()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+from pyvows import Vows, expect
+from pyvows.fixtures import Fixture, FixtureManager
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+
+EVENTS = []
+
+
+def server():
+    EVENTS.append('server created')
+    yield 'server'
+    EVENTS.append('server torn down')
+
+
+def connection():
+    EVENTS.append('connection created')
+    return 'connection'
+
+
+def broken():
+    EVENTS.append('broken created')
+    raise RuntimeError('cannot start')
+
+
+def unused():
+    EVENTS.append('unused created')
+
+
+FIXTURES = dict((fixture.key, fixture) for fixture in [
+    Fixture(server),
+    Fixture(connection, scope='module'),
+    Fixture(broken),
+    Fixture(unused),
+])
+
+# (each file declares a module fixture named `setting`)
+FIXTURE_FILE = '''\
+from pyvows import Vows, expect
+
+@Vows.fixture(scope='module')
+def setting():
+    return {0!r}
+
+class UsingTheSetting(Vows.Context):
+    fixtures = ('setting',)
+
+    def topic(self):
+        return self.setting
+
+    def gets_the_setting_of_its_module(self, topic):
+        expect(topic).to_equal({0!r})
+'''
+
+
+class UsingTheServer(Vows.Context):
+    fixtures = ('server',)
+
+    def topic(self):
+        return self.server
+
+    def gets_the_fixture(self, topic):
+        expect(topic).to_equal('server')
+
+    def teardown(self):
+        EVENTS.append('batch done')
+
+
+class FirstBatch(UsingTheServer):
+    class Nested(Vows.Context):
+        fixtures = ('server', 'connection')
+
+        def topic(self):
+            return self.server, self.connection
+
+        def gets_both_fixtures(self, topic):
+            expect(topic).to_equal(('server', 'connection'))
+
+
+class SecondBatch(UsingTheServer):
+    class Nested(Vows.Context):
+        fixtures = ('connection',)
+
+        def topic(self):
+            return self.connection
+
+        def gets_the_fixture(self, topic):
+            expect(topic).to_equal('connection')
+
+
+class BrokenBatch(Vows.Context):
+    class First(Vows.Context):
+        fixtures = ('broken',)
+
+        def works(self, topic):
+            pass
+
+    class Second(First):
+        pass
+
+
+def run_with_fixtures(runner_name):
+    del EVENTS[:]
+    suites = {'first_vows.py': set([FirstBatch, BrokenBatch]), 'second_vows.py': set([SecondBatch])}
+    execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+    result = get_runner(runner_name)(suites, Vows.Context, None, None, execution_plan,
+                                     fixtures=FixtureManager(FIXTURES)).run()
+    return result, list(EVENTS)
+
+
+def run_with_module_fixtures():
+    root = tempfile.mkdtemp()
+    modules = ['first_fixture_vows', 'second_fixture_vows']
+    for name in modules:
+        with open(os.path.join(root, name + '.py'), 'w') as vows_file:
+            vows_file.write(FIXTURE_FILE.format(name))
+    sys.path.insert(0, root)
+    try:
+        suites = dict(
+            (name + '.py', set([importlib.import_module(name).UsingTheSetting])) for name in modules)
+        execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+        return get_runner(None)(suites, Vows.Context, None, None, execution_plan,
+                                fixtures=FixtureManager(dict(Vows.fixtures))).run()
+    finally:
+        sys.path.remove(root)
+        for name in modules:
+            sys.modules.pop(name, None)
+            del Vows.fixtures[(name, 'setting')]
+        shutil.rmtree(root)
+
+
+@Vows.batch
+class Fixtures(Vows.Context):
+
+    class WhenRun(Vows.Context):
+        def topic(self):
+            for runner_name in (None, 'sequential', 'asyncio'):
+                if runner_name is None or runner_name in RUNNERS:
+                    yield run_with_fixtures(runner_name)
+
+        def are_given_to_the_contexts(self, topic):
+            result = topic[0]
+            expect(result.errored_tests).to_equal(2)
+
+        def are_created_once_per_session(self, topic):
+            expect(topic[1].count('server created')).to_equal(1)
+
+        def are_created_once_per_module(self, topic):
+            expect(topic[1].count('connection created')).to_equal(2)
+
+        def are_torn_down_after_the_last_batch_using_them(self, topic):
+            events = topic[1]
+            expect(events.count('server torn down')).to_equal(1)
+            last_batch = len(events) - 1 - events[::-1].index('batch done')
+            expect(events.index('server torn down')).to_be_greater_than(last_batch)
+
+        def are_not_created_unless_used(self, topic):
+            expect(topic[1]).Not.to_include('unused created')
+
+        def fail_only_once(self, topic):
+            expect(topic[1].count('broken created')).to_equal(1)
+
+        def fail_the_contexts_using_them(self, topic):
+            broken = [context for context in topic[0].contexts if context['name'] == 'BrokenBatch'][0]
+            expect([str(context['error'].exc_info[1]) for context in broken['contexts']]).to_equal(
+                ['cannot start', 'cannot start'])
+
+    class OfTheSameNameInTwoModules(Vows.Context):
+        def topic(self):
+            return run_with_module_fixtures()
+
+        def are_each_given_to_the_contexts_of_their_module(self, topic):
+            expect(topic.successful).to_be_true()
+            expect(topic.successful_tests).to_equal(4)
+
+    class WhenDeclared(Vows.Context):
+        def topic(self):
+            @Vows.fixture(scope='module', name='declared_fixture')
+            def declare():
+                return 1
+
+            try:
+                return Vows.fixtures.get((__name__, 'declared_fixture'))
+            finally:
+                del Vows.fixtures[(__name__, 'declared_fixture')]
+
+        def are_registered_by_module_and_name(self, topic):
+            expect(topic.scope).to_equal('module')
+
+    class WithAnUnknownScope(Vows.Context):
+        @Vows.capture_error
+        def topic(self):
+            return Fixture(lambda: None, scope='forever')
+
+        def is_an_error(self, topic):
+            expect(topic).to_be_an_error_like(ValueError)
@@ -9,6 +9,8 @@
 # Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
 
 from pyvows import Vows, expect
+from pyvows.runner import VowsRunner
+from pyvows.runner.executionplan import ExecutionPlanner
 
 
 def get_test_data():
@@ -77,3 +79,99 @@ class Add(Vows.Context):
                 def should_equal_to_expected(self, topic):
                     value, expected = topic
                     expect(value).to_equal(expected)
+
+
+@Vows.batch
+class StreamedAdd(Vows.Context):
+    class ATopic(Vows.Context):
+        topic_window = 3
+
+        def topic(self):
+            for a in a_samples:
+                yield a
+
+        class BTopic(Vows.Context):
+            topic_window = 2
+
+            def topic(self, a):
+                for b in b_samples:
+                    yield b
+
+            class Sum(Vows.Context):
+                def topic(self, b, a):
+                    yield (add(a, b), a + b)
+
+                def should_equal_to_expected(self, topic):
+                    value, expected = topic
+                    expect(value).to_equal(expected)
+
+
+@Vows.batch
+class StreamedGeneratorTopics(Vows.Context):
+    def topic(self):
+        dummySuite = {'dummySuite': set([StreamedBatch])}
+        execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+        del StreamedBatch.window_sizes[:]
+        result = VowsRunner(dummySuite, Vows.Context, None, None, execution_plan, False).run()
+        return result.contexts[0], list(StreamedBatch.window_sizes)
+
+    def tests_every_value(self, topic):
+        expect(sorted(test['topic'] for test in topic[0]['tests'])).to_equal(list(range(10)))
+
+    def keeps_at_most_the_window_in_flight(self, topic):
+        expect(max(topic[1])).to_be_lesser_than(StreamedBatch.topic_window + 1)
+
+    def drops_values_once_tested(self, topic):
+        expect(topic[1][-1]).to_be_lesser_than(StreamedBatch.topic_window + 1)
+
+    class SubContexts(Vows.Context):
+        def topic(self, results):
+            return results[0]['contexts']
+
+        def get_each_value(self, topic):
+            expect(len(topic)).to_equal(10)
+            expect(sum(context['counts'].errored for context in topic)).to_equal(0)
+
+    class WithABrokenGenerator(Vows.Context):
+        def topic(self):
+            dummySuite = {'dummySuite': set([BrokenStreamedBatch])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            return VowsRunner(dummySuite, Vows.Context, None, None, execution_plan, False).run().contexts[0]
+
+        def records_the_topic_error(self, topic):
+            expect(topic['error'].source).to_equal('topic')
+
+        def keeps_the_vows_of_the_values_before_it(self, topic):
+            expect(sorted(test['topic'] for test in topic['tests'])).to_equal([0, 1])
+
+
+class StreamedBatch(Vows.Context):
+    topic_window = 3
+    window_sizes = []
+
+    def topic(self):
+        for value in range(10):
+            StreamedBatch.window_sizes.append(len(self.topic_value))
+            yield value
+
+    def is_a_number(self, topic):
+        expect(topic).to_be_numeric()
+
+    class PlusOne(Vows.Context):
+        def topic(self, value):
+            return value + 1
+
+        def is_one_more_than_the_value(self, topic):
+            expect(topic).to_equal(self.parent.topic_value[self.index] + 1)
+
+
+class BrokenStreamedBatch(Vows.Context):
+    topic_window = 1
+
+    def topic(self):
+        yield 0
+        yield 1
+        raise RuntimeError('out of values')
+
+    def is_a_number(self, topic):
+        expect(topic).to_be_numeric()
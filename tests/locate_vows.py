@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+import shutil
+import tempfile
+
+from pyvows import Vows, expect
+from pyvows.result import VowsResult
+from pyvows.utils import locate
+
+
+def make_tree(files):
+    root = os.path.realpath(tempfile.mkdtemp())
+    for name, content in files.items():
+        path = os.path.join(root, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as tree_file:
+            tree_file.write(content)
+    return root
+
+
+def found(root, pattern='*_vows.py', **kwargs):
+    return sorted(os.path.relpath(path, root).replace(os.sep, '/') for path in locate(pattern, root, **kwargs))
+
+
+@Vows.batch
+class Locating(Vows.Context):
+
+    class ATree(Vows.Context):
+        def topic(self):
+            root = make_tree({
+                'a_vows.py': '',
+                'sub/b_vows.py': '',
+                'sub/deeper/c_vows.py': '',
+                'sub/helper.py': '',
+                '.git/objects/d_vows.py': '',
+                'node_modules/pkg/e_vows.py': '',
+                'env/pyvenv.cfg': '',
+                'env/lib/f_vows.py': '',
+                '.gitignore': '# built files\nbuild/\n/sub/generated_vows.py\n!keep\n',
+                'build/g_vows.py': '',
+                'sub/generated_vows.py': '',
+                'sub/.gitignore': '*.tmp\n',
+                'sub/scratch.tmp/h_vows.py': '',
+            })
+            try:
+                return found(root)
+            finally:
+                shutil.rmtree(root)
+
+        def finds_the_vows_files(self, topic):
+            expect(topic).to_equal(['a_vows.py', 'sub/b_vows.py', 'sub/deeper/c_vows.py'])
+
+    class FromAnIgnoredDirectory(Vows.Context):
+        def topic(self):
+            root = make_tree({'node_modules/a_vows.py': ''})
+            try:
+                return found(os.path.join(root, 'node_modules'))
+            finally:
+                shutil.rmtree(root)
+
+        def still_finds_its_files(self, topic):
+            expect(topic).to_equal(['a_vows.py'])
+
+    class WithALoopingSymlink(Vows.Context):
+        def topic(self):
+            root = make_tree({'a_vows.py': '', 'sub/b_vows.py': ''})
+            try:
+                os.symlink(root, os.path.join(root, 'sub', 'loop'))
+                return found(root)
+            finally:
+                shutil.rmtree(root)
+
+        def doesnt_follow_it(self, topic):
+            expect(topic).to_equal(['a_vows.py', 'sub/b_vows.py'])
+
+    class WithTheCache(Vows.Context):
+        def topic(self):
+            root = make_tree({'a_vows.py': '', 'sub/b_vows.py': ''})
+            try:
+                first = found(root, use_cache=True)
+                os.makedirs(os.path.join(root, 'sub', 'new'))
+                with open(os.path.join(root, 'sub', 'new', 'c_vows.py'), 'w'):
+                    pass
+                return first, found(root, use_cache=True)
+            finally:
+                shutil.rmtree(root)
+
+        def finds_the_same_files(self, topic):
+            expect(topic[0]).to_equal(['a_vows.py', 'sub/b_vows.py'])
+
+        def finds_new_files(self, topic):
+            expect(topic[1]).to_equal(['a_vows.py', 'sub/b_vows.py', 'sub/new/c_vows.py'])
+
+    class ImportTimes(Vows.Context):
+        def topic(self):
+            result = VowsResult()
+            result.import_times = [
+                {'path': 'quick_vows.py', 'elapsed': 0.01},
+                {'path': 'slow_vows.py', 'elapsed': 0.5},
+                {'path': 'slower_vows.py', 'elapsed': 0.75},
+            ]
+            return result.get_slowest_imports(threshold=0.1)
+
+        def are_ranked_slowest_first(self, topic):
+            expect([module['path'] for module in topic]).to_equal(['slower_vows.py', 'slow_vows.py'])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import pickle
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.multiprocess import VowsMultiprocessRunner
+
+
+@Vows.batch
+class MultiprocessRunner(Vows.Context):
+
+    class WithASingleWorker(Vows.Context):
+        def topic(self):
+            dummySuite = {'dummySuite': set([ShardedBatch, OtherShardedBatch])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            runner = VowsMultiprocessRunner(dummySuite, Vows.Context, None, None, execution_plan, workers=1)
+            return runner.run()
+
+        def runs_every_batch_in_process(self, topic):
+            expect(sorted(context['name'] for context in topic.contexts)).to_equal(['OtherShardedBatch', 'ShardedBatch'])
+
+        def counts_the_broken_vow(self, topic):
+            expect(topic.errored_tests).to_equal(1)
+
+    class ShardResults(Vows.Context):
+        def topic(self):
+            dummySuite = {'dummySuite': set([ShardedBatch, OtherShardedBatch])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            runner = VowsMultiprocessRunner(dummySuite, Vows.Context, None, None, execution_plan, workers=2)
+            return runner.run_shard([('dummySuite', 'ShardedBatch')])[0]
+
+        def contain_only_the_requested_batch(self, topic):
+            expect([context['name'] for context in topic]).to_equal(['ShardedBatch'])
+
+        def can_be_pickled(self, topic):
+            expect(pickle.loads(pickle.dumps(topic))[0]['name']).to_equal('ShardedBatch')
+
+        class BrokenVow(Vows.Context):
+            def topic(self, contexts):
+                return contexts[0]['tests'][0]['error']
+
+            def keeps_the_exception_type(self, topic):
+                expect(topic['type']).to_equal(AssertionError)
+
+            def has_a_formatted_traceback(self, topic):
+                expect(topic['traceback']).to_be_instance_of(list)
+                expect(topic['traceback'][-1]).to_include('Expected topic(1) to equal 2')
+
+        class UnpicklableTopic(Vows.Context):
+            def topic(self, contexts):
+                return contexts[0]['contexts'][0]['tests'][0]['topic']
+
+            def is_replaced_by_its_repr(self, topic):
+                expect(topic).to_include('<lambda>')
+
+    class Shards(Vows.Context):
+        def topic(self):
+            dummySuite = {'dummySuite': set([DatabaseBatch, CacheBatch, DatabaseAndCacheBatch, ShardedBatch])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            runner = VowsMultiprocessRunner(dummySuite, Vows.Context, None, None, execution_plan, workers=2)
+            return runner._get_shards()
+
+        def keep_the_batches_sharing_a_resource_together(self, topic):
+            expect(sorted(sorted(batch_name for suite_name, batch_name in shard) for shard in topic)).to_equal([
+                ['CacheBatch', 'DatabaseAndCacheBatch', 'DatabaseBatch'],
+                ['ShardedBatch'],
+            ])
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--workers', '4'])
+
+        def has_the_number_of_workers(self, topic):
+            expect(topic.workers).to_equal(4)
+
+
+class ShardedBatch(Vows.Context):
+    def topic(self):
+        return 1
+
+    def should_be_two(self, topic):
+        expect(topic).to_equal(2)
+
+    class WithAFunctionAsTopic(Vows.Context):
+        def topic(self):
+            return lambda: None
+
+        def is_callable(self, topic):
+            expect(callable(topic)).to_be_true()
+
+
+class OtherShardedBatch(Vows.Context):
+    def topic(self):
+        return 1
+
+    def should_be_one(self, topic):
+        expect(topic).to_equal(1)
+
+
+class DatabaseBatch(Vows.Context):
+    resources = {'db': 1}
+
+
+class CacheBatch(Vows.Context):
+    class UsingTheCache(Vows.Context):
+        resources = {'cache': 1}
+
+
+class DatabaseAndCacheBatch(Vows.Context):
+    resources = {'cache': 1, 'db': 1}
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import pickle
+
+from pyvows import Vows, expect
+from pyvows.runner.output import CapturedOutput, OutputBuffer, OutputSink
+
+
+@Vows.batch
+class OutputCapture(Vows.Context):
+
+    class WithInterleavedWriters(Vows.Context):
+        def topic(self):
+            buffer = OutputBuffer()
+            first, second = OutputSink(buffer), OutputSink(buffer)
+            first.write('one ')
+            second.write('two ')
+            first.write('three ')
+            first.write('four')
+            second.write(u'fünf')
+            return first.getvalue(), second.getvalue()
+
+        def each_sink_gets_its_own_output(self, topic):
+            expect(str(topic[0])).to_equal('one three four')
+            expect(topic[1]).to_equal(u'two fünf')
+
+        def contiguous_writes_share_a_segment(self, topic):
+            expect(topic[0].segments).to_length(2)
+
+        def compares_equal_to_the_text(self, topic):
+            expect(topic[0] == 'one three four').to_be_true()
+
+        def pickles_as_text(self, topic):
+            expect(pickle.loads(pickle.dumps(topic[1]))).to_equal(u'two fünf')
+
+    class WithoutOutput(Vows.Context):
+        def topic(self):
+            return OutputSink(OutputBuffer()).getvalue()
+
+        def is_an_empty_string(self, topic):
+            expect(topic).to_equal('')
+
+    class PastTheSpoolSize(Vows.Context):
+        def topic(self):
+            buffer = OutputBuffer(spool_size=16)
+            sink = OutputSink(buffer)
+            for line in range(10):
+                sink.write('line {0}\n'.format(line))
+            return buffer, sink.getvalue()
+
+        def is_spooled_to_a_file(self, topic):
+            expect(topic[0].file._rolled).to_be_true()
+
+        def still_reads_the_output(self, topic):
+            expect(topic[1]).to_be_instance_of(CapturedOutput)
+            expect(str(topic[1]).splitlines()[-1]).to_equal('line 9')
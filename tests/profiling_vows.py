@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows.profiling import PYVOWS_DIRECTORY, CodeProfiler, ImportProfiler, MemoryProfiler, format_size, percentile
+from pyvows.reporting import VowsDefaultReporter
+from pyvows.result import VowsResult
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.multiprocess import VowsMultiprocessRunner
+
+
+def import_profiled(**options):
+    root = tempfile.mkdtemp()
+    with open(os.path.join(root, 'profiledpackage.py'), 'w') as package_file:
+        package_file.write('DATA = [str(number) for number in range(10000)]\n')
+    with open(os.path.join(root, 'profiled_vows.py'), 'w') as vows_file:
+        vows_file.write('import profiledpackage\n')
+
+    profiler = ImportProfiler(**options)
+    sys.path.insert(0, root)
+    try:
+        with profiler.profiling():
+            with profiler.measure(os.path.join(root, 'profiled_vows.py')):
+                __import__('profiled_vows')
+    finally:
+        sys.path.remove(root)
+        sys.modules.pop('profiled_vows', None)
+        sys.modules.pop('profiledpackage', None)
+        shutil.rmtree(root)
+    return profiler
+
+
+def context_result(ctx_id, path, times, vows=(), contexts=()):
+    setup, topic, teardown = times
+    return {
+        'id': ctx_id,
+        'name': ctx_id.split('.')[-1],
+        'filename': path,
+        'setup_elapsed': setup,
+        'topic_elapsed': topic,
+        'teardown_elapsed': teardown,
+        'tests': [{'name': name, 'elapsed': elapsed} for name, elapsed in vows],
+        'contexts': list(contexts),
+    }
+
+
+def make_result():
+    result = VowsResult()
+    result.contexts = [
+        context_result('Fast', 'fast_vows.py', (0.0, 0.1, 0.0), [('works', 0.1)]),
+        context_result('Slow', 'slow_vows.py', (0.5, 1.0, 0.25), [('works', 2.0)], [
+            context_result('Slow.Sub', 'slow_vows.py', (0.0, 0.5, 0.0), [('also_works', 0.4)]),
+        ]),
+        context_result('AlsoSlow', 'slow_vows.py', (0.0, 0.2, 0.0)),
+    ]
+    return result
+
+
+class TimedBatch(Vows.Context):
+    def setup(self):
+        time.sleep(0.01)
+
+    def topic(self):
+        return 1
+
+    def works(self, topic):
+        pass
+
+    def teardown(self):
+        time.sleep(0.01)
+
+
+def pause():
+    try:
+        import gevent
+    except ImportError:
+        pass
+    else:
+        gevent.sleep(0.001)
+
+
+def work_of_first():
+    pause()
+    return sum(range(1000))
+
+
+def work_of_second():
+    pause()
+    return sum(range(1000))
+
+
+class ProfiledBatch(Vows.Context):
+    class First(Vows.Context):
+        def topic(self):
+            return work_of_first()
+
+        def works(self, topic):
+            work_of_first()
+
+    class Second(Vows.Context):
+        def topic(self):
+            return work_of_second()
+
+    class NotProfiled(Vows.Context):
+        def topic(self):
+            return work_of_second()
+
+
+def profile_code(runner_name):
+    directory = tempfile.mkdtemp()
+    try:
+        code_profiler = CodeProfiler([r'\.(First|Second)$'], directory)
+        suites = {'profiled_vows.py': set([ProfiledBatch])}
+        execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+        get_runner(runner_name)(suites, Vows.Context, None, None, execution_plan, code_profiler=code_profiler).run()
+
+        functions = {}
+        for filename in sorted(os.listdir(directory)):
+            stats = pstats.Stats(os.path.join(directory, filename)).stats
+            functions[filename] = dict((function[2], stats[function][0]) for function in stats)
+        return functions
+    finally:
+        shutil.rmtree(directory)
+
+
+class MemoryHungryBatch(Vows.Context):
+    def topic(self):
+        return [str(number) for number in range(20000)]
+
+    def uses_more_for_a_while(self, topic):
+        expect(len([value * 2 for value in topic])).to_equal(20000)
+
+    class Frugal(Vows.Context):
+        def topic(self):
+            return 1
+
+
+def print_import_tables(number):
+    result = VowsResult()
+    result.import_times = [
+        {'path': 'file{0}_vows.py'.format(index), 'elapsed': 1.0 + index, 'memory': None} for index in range(15)]
+    reporter = VowsDefaultReporter(result, 0)
+    output, stdout = StringIO(), sys.stdout
+    sys.stdout = output
+    try:
+        reporter.print_import_profile(0, number)
+        slowest_imports = output.getvalue().count('_vows.py')
+        reporter.print_collection_profile(number)
+        return slowest_imports, output.getvalue().count('_vows.py') - slowest_imports
+    finally:
+        sys.stdout = stdout
+
+
+class FrugalBatch(Vows.Context):
+    def topic(self):
+        return 1
+
+
+def profile_memory(workers=1):
+    memory_profiler = MemoryProfiler()
+    if workers == 1:
+        suites = {'memory_vows.py': set([MemoryHungryBatch])}
+        execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+        runner = get_runner('sequential')(suites, Vows.Context, None, None, execution_plan,
+                                          memory_profiler=memory_profiler)
+    else:
+        suites = {'memory_vows.py': set([MemoryHungryBatch, FrugalBatch])}
+        execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+        runner = VowsMultiprocessRunner(suites, Vows.Context, None, None, execution_plan, workers=workers,
+                                        engine=get_runner('sequential'), memory_profiler=memory_profiler)
+    result = runner.run()
+    result.top_allocators = memory_profiler.top_allocators
+    return result
+
+
+@Vows.batch
+class Profiling(Vows.Context):
+
+    class Imports(Vows.Context):
+        def topic(self):
+            return import_profiled(trace_memory=True, packages=True)
+
+        def are_measured_per_vows_file(self, topic):
+            expect(topic.modules).to_length(1)
+            expect(topic.modules[0]['path']).to_include('profiled_vows.py')
+            expect(topic.modules[0]['elapsed']).to_be_numeric()
+
+        @Vows.skip_if(tracemalloc is None, 'tracemalloc needs Python 3.4')
+        def measure_the_memory_kept(self, topic):
+            expect(topic.modules[0]['memory']).to_be_greater_than(100000)
+
+        def measure_the_imported_packages(self, topic):
+            expect([package['name'] for package in topic.package_times]).to_equal(['profiledpackage'])
+
+    class ImportsWithoutMemory(Vows.Context):
+        def topic(self):
+            return import_profiled()
+
+        def have_no_memory_measure(self, topic):
+            expect(topic.modules[0]['memory']).to_be_null()
+
+        def have_no_package_measures(self, topic):
+            expect(topic.package_times).to_be_empty()
+
+    class Steps(Vows.Context):
+        def topic(self):
+            return make_result()
+
+        def are_ranked_slowest_first(self, topic):
+            steps = topic.get_worst_steps(number=3, threshold=0.3)
+            expect([(step['phase'], step['context'], step['name']) for step in steps]).to_equal([
+                ('vow', 'Slow', 'works'),
+                ('topic', 'Slow', 'Slow'),
+                ('setup', 'Slow', 'Slow'),
+            ])
+
+        def add_up_per_batch(self, topic):
+            expect(topic.get_times_per('batch', number=1)).to_equal([
+                {'name': 'Slow', 'elapsed': 4.65, 'steps': 8}
+            ])
+
+        def add_up_per_file(self, topic):
+            times = topic.get_times_per('path')
+            expect([(total['name'], round(total['elapsed'], 2)) for total in times]).to_equal([
+                ('slow_vows.py', 4.85), ('fast_vows.py', 0.2)
+            ])
+
+        def are_summarized_per_phase(self, topic):
+            summary = dict((phase['phase'], phase) for phase in topic.get_step_percentiles())
+            expect(summary['vow']['count']).to_equal(3)
+            expect(summary['vow']['percentiles']).to_equal([(50, 0.4), (95, 2.0), (99, 2.0)])
+            expect(summary['teardown']['max']).to_equal(0.25)
+
+    class Percentiles(Vows.Context):
+        def topic(self):
+            values = list(range(1, 101))
+            return [percentile(values, percent) for percent in (50, 95, 99, 100)], percentile([], 50)
+
+        def use_the_nearest_rank(self, topic):
+            expect(topic[0]).to_equal([50, 95, 99, 100])
+
+        def are_none_without_values(self, topic):
+            expect(topic[1]).to_be_null()
+
+    class SetupAndTeardown(Vows.Context):
+        def topic(self):
+            suites = {'dummySuite': set([TimedBatch])}
+            execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+            result = get_runner(None)(suites, Vows.Context, None, None, execution_plan).run()
+            return result.contexts[0]
+
+        def are_timed(self, topic):
+            expect(topic['setup_elapsed']).to_be_greater_than(0.005)
+            expect(topic['teardown_elapsed']).to_be_greater_than(0.005)
+
+    class Code(Vows.Context):
+        def topic(self):
+            for runner_name in (None, 'sequential', 'asyncio'):
+                if runner_name is None or runner_name in RUNNERS:
+                    yield profile_code(runner_name)
+
+        def is_profiled_per_selected_context(self, topic):
+            expect(sorted(topic)).to_equal([
+                'profiled_vows.ProfiledBatch.First.pstats',
+                'profiled_vows.ProfiledBatch.Second.pstats',
+            ])
+
+        def includes_the_topic_and_vows(self, topic):
+            expect(topic['profiled_vows.ProfiledBatch.First.pstats']['work_of_first']).to_equal(2)
+
+        def leaves_out_concurrent_contexts(self, topic):
+            expect(topic['profiled_vows.ProfiledBatch.First.pstats']).Not.to_include('work_of_second')
+            expect(topic['profiled_vows.ProfiledBatch.Second.pstats']).Not.to_include('work_of_first')
+
+    class Memory(Vows.Context):
+        @Vows.skip_if(tracemalloc is None, 'tracemalloc needs Python 3.4')
+        def topic(self):
+            return profile_memory()
+
+        def retains_the_topic(self, topic):
+            memory = topic.contexts[0]['memory']
+            expect(memory['retained']).to_be_greater_than(1000000)
+
+        @Vows.skip_if(not hasattr(tracemalloc, 'reset_peak'), 'peaks are measured per step from Python 3.9')
+        def peaks_above_what_is_retained(self, topic):
+            memory = topic.contexts[0]['memory']
+            expect(memory['peak']).to_be_greater_than(memory['retained'])
+
+        def ranks_the_hungriest_contexts_first(self, topic):
+            expect([context['context'] for context in topic.get_memory_hungriest()]).to_equal([
+                'MemoryHungryBatch', 'MemoryHungryBatch.Frugal'
+            ])
+
+        def finds_the_top_allocators(self, topic):
+            expect(topic.top_allocators).Not.to_be_empty()
+            expect([allocator['file'] for allocator in topic.top_allocators]).to_include(__file__)
+
+        def leave_out_pyvows_itself(self, topic):
+            for allocator in topic.top_allocators:
+                expect(allocator['file'].startswith(PYVOWS_DIRECTORY + os.sep)).to_be_false()
+
+    class MemoryWithWorkers(Vows.Context):
+        @Vows.skip_if(tracemalloc is None, 'tracemalloc needs Python 3.4')
+        def topic(self):
+            return profile_memory(workers=2)
+
+        def finds_the_top_allocators_of_every_worker(self, topic):
+            expect([allocator['file'] for allocator in topic.top_allocators]).to_include(__file__)
+
+    class MergedAllocators(Vows.Context):
+        def topic(self):
+            memory_profiler = MemoryProfiler(number=2)
+            memory_profiler.merge([
+                {'file': 'a.py', 'lineno': 1, 'size': 100, 'count': 1},
+                {'file': 'b.py', 'lineno': 2, 'size': 50, 'count': 1},
+            ])
+            memory_profiler.merge([
+                {'file': 'b.py', 'lineno': 2, 'size': 70, 'count': 2},
+                {'file': 'c.py', 'lineno': 3, 'size': 10, 'count': 1},
+            ])
+            return memory_profiler.top_allocators
+
+        def add_up_the_same_lines(self, topic):
+            expect(topic[0]).to_equal({'file': 'b.py', 'lineno': 2, 'size': 120, 'count': 3})
+
+        def keep_the_largest(self, topic):
+            expect([allocator['file'] for allocator in topic]).to_equal(['b.py', 'a.py'])
+
+    class ImportTables(Vows.Context):
+        def topic(self):
+            return print_import_tables(12)
+
+        def have_as_many_rows_as_requested(self, topic):
+            expect(topic).to_equal((12, 12))
+
+    class ShortenedPaths(Vows.Context):
+        def topic(self):
+            reporter = VowsDefaultReporter(VowsResult(), 0)
+            path = os.path.join('some', 'rather', 'deeply', 'nested', 'module.py')
+            return reporter.shorten_path(path, 20), reporter.shorten_path(path, 50)
+
+        def keep_whole_directories(self, topic):
+            expect(topic[0]).to_equal('...' + os.sep + os.path.join('nested', 'module.py'))
+
+        def are_left_alone_when_short_enough(self, topic):
+            expect(topic[1]).to_equal(os.path.join('some', 'rather', 'deeply', 'nested', 'module.py'))
+
+    class Sizes(Vows.Context):
+        def topic(self):
+            return [format_size(size) for size in (512, 2048, 3 * 1024 * 1024, -1536)]
+
+        def are_readable(self, topic):
+            expect(topic).to_equal(['512B', '2.0KiB', '3.0MiB', '-1.5KiB'])
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args([
+                '--profile-collection', '--profile-packages', '--profile-top', '25', '--profile-memory'])
+
+        def has_profile_collection(self, topic):
+            expect(topic.profile_collection).to_be_true()
+
+        def has_profile_packages(self, topic):
+            expect(topic.profile_packages).to_be_true()
+
+        def has_profile_top(self, topic):
+            expect(topic.profile_top).to_equal(25)
+
+        def has_profile_memory(self, topic):
+            expect(topic.profile_memory).to_be_true()
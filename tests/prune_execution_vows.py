@@ -1,5 +1,5 @@
 from pyvows import Vows, expect
-from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.executionplan import ExecutionPlanner, VowIndex
 
 
 @Vows.batch
@@ -267,6 +267,108 @@ class DiscoveringExecutionTree(Vows.Context):
             }
             expect(topic).to_equal(baseline)
 
+    class WithInclusionIds(Vows.Context):
+        def topic(self):
+            planner = ExecutionPlanner(
+                {'dummySuite': set([UnrunnableBatch, SomeLoneBatch])},
+                set([]),
+                set([]),
+                set(['UnrunnableBatch.SubB.testB_0', 'UnrunnableBatch.SubB.SubC'])
+            )
+            return planner.plan()
+
+        def only_the_listed_vows_and_contexts_are_run(self, topic):
+            baseline = {
+                'dummySuite': {
+                    'contexts': {
+                        'UnrunnableBatch': {
+                            'name': 'UnrunnableBatch',
+                            'id': 'UnrunnableBatch',
+                            'vows': [],
+                            'contexts': {
+                                'SubB': {
+                                    'name': 'SubB',
+                                    'id': 'UnrunnableBatch.SubB',
+                                    'vows': ['testB_0'],
+                                    'contexts': {
+                                        'SubC': {
+                                            'name': 'SubC',
+                                            'id': 'UnrunnableBatch.SubB.SubC',
+                                            'vows': ['testB1_0', 'testB1_1'],
+                                            'contexts': {}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+            expect(topic).to_equal(baseline)
+
+    class WithInclusionIdsOfAContextWithoutVows(Vows.Context):
+        def topic(self):
+            planner = ExecutionPlanner(
+                {'dummySuite': set([UnrunnableBatch, SomeLoneBatch])},
+                set([]),
+                set([]),
+                set(['UnrunnableBatch.SubA'])
+            )
+            return planner.plan()
+
+        def the_context_is_run(self, topic):
+            expect(topic['dummySuite']['contexts']).to_equal({
+                'UnrunnableBatch': {
+                    'name': 'UnrunnableBatch',
+                    'id': 'UnrunnableBatch',
+                    'vows': [],
+                    'contexts': {
+                        'SubA': {
+                            'name': 'SubA',
+                            'id': 'UnrunnableBatch.SubA',
+                            'vows': [],
+                            'contexts': {}
+                        }
+                    }
+                }
+            })
+
+    class IndexingVows(Vows.Context):
+        def topic(self):
+            planner = ExecutionPlanner(
+                {'dummySuite': set([UnrunnableBatch, SkippingBatch])},
+                set([]),
+                set(['testB1_0', 'skipped'])
+            )
+            planner.plan()
+            return planner.vow_index
+
+        def has_only_the_planned_vows(self, topic):
+            expect(sorted(topic)).to_equal([
+                ('dummySuite', 'SkippingBatch.skipped'),
+                ('dummySuite', 'UnrunnableBatch.SubB.SubC.testB1_0'),
+            ])
+
+        def knows_where_each_vow_is(self, topic):
+            info = topic[('dummySuite', 'UnrunnableBatch.SubB.SubC.testB1_0')]
+            expect(info.file).to_include('prune_execution_vows.py')
+            expect(info.lineno).to_equal(UnrunnableBatch.SubB.SubC.testB1_0.__code__.co_firstlineno)
+
+        def knows_why_a_vow_is_skipped(self, topic):
+            expect(topic[('dummySuite', 'SkippingBatch.skipped')].skip).to_equal('not today')
+
+        def adds_unknown_vows_when_looked_up(self, topic):
+            topic = VowIndex(topic)
+            info = topic.get_info('otherSuite', 'SomeLoneBatch', 'testB_0', UnrunnableBatch.SubB.testB_0)
+            expect(info.id).to_equal('SomeLoneBatch.testB_0')
+            expect(topic).to_include(('otherSuite', 'SomeLoneBatch.testB_0'))
+
+
+class SkippingBatch(Vows.Context):
+    @Vows.skip('not today')
+    def skipped(self, topic):
+        pass
+
 
 class UnrunnableBatch(Vows.Context):
     def topic(self):
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import json
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows.events import VowsEvents
+from pyvows.reporting.jsonl import JSONLinesReporter
+from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.sequential import VowsSequentialRunner
+
+
+def find_record(records, record_id):
+    return [record for record in records if record.get('id') == record_id][0]
+
+
+@Vows.batch
+class JSONLinesReporterVows(Vows.Context):
+
+    def topic(self):
+        stream = StringIO()
+        events = VowsEvents()
+        JSONLinesReporter(stream).subscribe(events)
+
+        dummySuite = {'dummySuite': set([ReportedBatch])}
+        execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+        VowsSequentialRunner(dummySuite, Vows.Context, None, None, execution_plan, False, events=events).run()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def writes_records_as_they_finish(self, topic):
+        expect([record['type'] for record in topic]).to_equal(['vow', 'vow', 'vow', 'context', 'context', 'run'])
+        expect([record.get('id') for record in topic[3:]]).to_equal(['ReportedBatch.Broken', 'ReportedBatch', None])
+
+    class HonoredVow(Vows.Context):
+        def topic(self, records):
+            return find_record(records, 'ReportedBatch.is_one')
+
+        def has_its_status(self, topic):
+            expect(topic['status']).to_equal('honored')
+
+        def has_its_location(self, topic):
+            expect(topic['file']).to_include('jsonl_reporter_vows.py')
+            expect(topic['lineno']).to_be_greater_than(0)
+
+        def has_no_error(self, topic):
+            expect(topic['error']).to_be_null()
+
+    class BrokenVow(Vows.Context):
+        def topic(self, records):
+            return find_record(records, 'ReportedBatch.Broken.is_two')
+
+        def has_its_status(self, topic):
+            expect(topic['status']).to_equal('broken')
+
+        def has_the_error_type_and_message(self, topic):
+            expect(topic['error']['type']).to_equal('AssertionError')
+            expect(topic['error']['message']).to_equal('Expected topic(1) to equal 2')
+
+    class SkippedVow(Vows.Context):
+        def topic(self, records):
+            return find_record(records, 'ReportedBatch.Broken.is_skipped')
+
+        def has_its_status_and_reason(self, topic):
+            expect(topic['status']).to_equal('skipped')
+            expect(topic['skip']).to_equal('not today')
+
+    class Context(Vows.Context):
+        def topic(self, records):
+            return records[3]
+
+        def has_the_topic_elapsed_time(self, topic):
+            expect(topic['topic_elapsed']).to_be_numeric()
+
+        def counts_its_vows(self, topic):
+            expect(topic['broken']).to_equal(1)
+            expect(topic['skipped']).to_equal(1)
+
+    class Run(Vows.Context):
+        def topic(self, records):
+            return records[-1]
+
+        def is_broken(self, topic):
+            expect(topic['status']).to_equal('broken')
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--jsonl-output', 'results.jsonl'])
+
+        def has_the_output_file(self, topic):
+            expect(topic.jsonl_output).to_equal('results.jsonl')
+
+
+class ReportedBatch(Vows.Context):
+    def topic(self):
+        return 1
+
+    def is_one(self, topic):
+        expect(topic).to_equal(1)
+
+    class Broken(Vows.Context):
+        def is_two(self, topic):
+            expect(topic).to_equal(2)
+
+        @Vows.skip('not today')
+        def is_skipped(self, topic):
+            pass
@@ -212,3 +212,54 @@ class XunitReporterVows(Vows.Context):
 
                 def should_have_original_exception_message(self, topic):
                     expect(topic.getAttribute('message')).to_equal('fdsa')
+
+    class WhenStreamingTheReport(Vows.Context):
+        def topic(self):
+            try:
+                raise ValueError('<bad> & "worse"')
+            except:
+                test_exc_info = sys.exc_info()
+
+            result = ResultMock()
+            result.successful_tests = 1
+            result.errored_tests = 1
+            result.skipped_tests = 0
+            result.total_test_count = 2
+            result.elapsed_time = 0
+            result.contexts = [
+                {
+                    'name': 'Context1',
+                    'error': VowsTopicError('topic', test_exc_info),
+                    'contexts': [{
+                        'name': 'Subcontext',
+                        'error': None,
+                        'contexts': [],
+                        'stdout': 'sub',
+                        'stderr': '',
+                        'tests': [{
+                            'name': 'Test1',
+                            'error': dict(zip(['type', 'value', 'traceback'], test_exc_info)),
+                            'skip': None,
+                            'stdout': 'out',
+                            'stderr': 'err'
+                        }]
+                    }],
+                    'stdout': 'outline',
+                    'stderr': 'errline',
+                    'tests': []
+                }
+            ]
+            return XUnitReporter(result)
+
+        def produces_the_same_xml_as_the_document(self, topic):
+            expect(topic.to_xml()).to_equal(topic.create_report_document().toxml(encoding='utf-8'))
+
+        def escapes_attributes_and_text(self, topic):
+            expect(topic.to_xml(None)).to_include('message="&lt;bad&gt; &amp; &quot;worse&quot;"')
+
+        class WithCDATAEndMarkerInOutput(Vows.Context):
+            def topic(self, reporter):
+                return reporter._output_elements('a]]>b', '')
+
+            def splits_the_cdata_section(self, topic):
+                expect(topic).to_equal('<system-out><![CDATA[a]]]]><![CDATA[>b]]></system-out><system-err><![CDATA[]]></system-err>')
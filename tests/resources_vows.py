@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+import gevent
+
+from pyvows import Vows, expect
+from pyvows.runner import RUNNERS, get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+
+# (`setup` returns what `PAUSE[0]()` does: the asyncio runner awaits it)
+PAUSE = [None]
+LOG = []
+
+
+class Holding(Vows.Context):
+    '''Logs when it starts and ends holding its resources.'''
+
+    def setup(self):
+        LOG.append(('start', type(self).__name__, tuple(sorted(self.resources))))
+        return PAUSE[0]()
+
+    def topic(self):
+        return type(self).__name__
+
+    def teardown(self):
+        LOG.append(('end', type(self).__name__, tuple(sorted(self.resources))))
+
+
+class FirstDatabaseUser(Holding):
+    resources = {'db': 1}
+
+    class Nested(Holding):
+        # (already held by the batch)
+        resources = {'db': 1}
+
+
+class SecondDatabaseUser(Holding):
+    resources = {'db': 1}
+
+
+class BothResourcesUser(Holding):
+    resources = {'port': 1, 'db': 1}
+
+
+class FirstPoolUser(Holding):
+    resources = {'pool': 2}
+
+
+class SecondPoolUser(FirstPoolUser):
+    pass
+
+
+class ThirdPoolUser(FirstPoolUser):
+    pass
+
+
+class Unrestricted(Holding):
+    pass
+
+
+class FirstCrossedUser(Holding):
+    resources = {'first': 1}
+
+    class Nested(Holding):
+        resources = {'second': 1}
+
+
+class SecondCrossedUser(Holding):
+    resources = {'second': 1}
+
+    class Nested(Holding):
+        resources = {'first': 1}
+
+
+CROSSED_BATCHES = set([FirstCrossedUser, SecondCrossedUser])
+
+
+class PortUsers(Holding):
+
+    class FirstPortUser(Holding):
+        resources = {'port': 1}
+
+    class SecondPortUser(Holding):
+        resources = {'port': 1}
+
+
+SIBLING_BATCHES = set([PortUsers])
+
+BATCHES = set([
+    FirstDatabaseUser, SecondDatabaseUser, BothResourcesUser,
+    FirstPoolUser, SecondPoolUser, ThirdPoolUser, Unrestricted,
+])
+
+
+def get_most_concurrent(log, resource=None):
+    '''Returns the largest number of contexts which were holding `resource`
+    (or anything) at the same time; `Nested` shares its batch's.'''
+    current = most = 0
+    for event, name, resources in log:
+        if name == 'Nested' or (resource is not None and resource not in resources):
+            continue
+        current += 1 if event == 'start' else -1
+        most = max(most, current)
+    return most
+
+
+def run_with_resources(runner_name, batches=BATCHES):
+    del LOG[:]
+    if runner_name == 'asyncio':
+        PAUSE[0] = lambda: asyncio.sleep(0.02)
+    else:
+        PAUSE[0] = lambda: gevent.sleep(0.02)
+    suites = {'resources_vows.py': batches}
+    execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+    result = get_runner(runner_name)(suites, Vows.Context, None, None, execution_plan).run()
+    return result, list(LOG)
+
+
+CONCURRENT_RUNNERS = [runner_name for runner_name in ('gevent', 'asyncio') if runner_name in RUNNERS]
+
+
+@Vows.batch
+class Resources(Vows.Context):
+
+    class WhenRun(Vows.Context):
+        def topic(self):
+            # (one after the other, as they share `LOG`)
+            return dict((runner_name, run_with_resources(runner_name)) for runner_name in CONCURRENT_RUNNERS + ['sequential'])
+
+        def run_every_context(self, topic):
+            for result, log in topic.values():
+                expect(result.successful).to_be_true()
+                expect(len(log)).to_equal(16)
+
+        def are_held_by_one_context_at_a_time(self, topic):
+            for runner_name in CONCURRENT_RUNNERS:
+                expect(get_most_concurrent(topic[runner_name][1], 'db')).to_equal(1)
+                expect(get_most_concurrent(topic[runner_name][1], 'port')).to_equal(1)
+
+        def are_held_by_as_many_contexts_as_their_capacity(self, topic):
+            for runner_name in CONCURRENT_RUNNERS:
+                expect(get_most_concurrent(topic[runner_name][1], 'pool')).to_equal(2)
+
+        def let_the_other_contexts_run_meanwhile(self, topic):
+            for runner_name in CONCURRENT_RUNNERS:
+                expect(get_most_concurrent(topic[runner_name][1])).to_be_greater_than(3)
+
+        def are_held_from_setup_to_teardown(self, topic):
+            for runner_name in CONCURRENT_RUNNERS:
+                database_log = [entry[:2] for entry in topic[runner_name][1] if 'db' in entry[2]]
+                first = database_log.index(('start', 'FirstDatabaseUser'))
+                expect(database_log[first:first + 4]).to_equal([
+                    ('start', 'FirstDatabaseUser'),
+                    ('start', 'Nested'),
+                    ('end', 'Nested'),
+                    ('end', 'FirstDatabaseUser'),
+                ])
+
+        class DeclaredByNestedContexts(Vows.Context):
+            def topic(self, when_run):
+                # (after `WhenRun`, as they share `LOG`; each batch's nested
+                # context needs what the other batch holds)
+                return dict(
+                    (runner_name, run_with_resources(runner_name, CROSSED_BATCHES)) for runner_name in CONCURRENT_RUNNERS)
+
+            def run_every_context(self, topic):
+                for result, log in topic.values():
+                    expect(result.successful).to_be_true()
+                    expect(len(log)).to_equal(8)
+
+            def are_held_by_one_batch_at_a_time(self, topic):
+                for result, log in topic.values():
+                    batch_log = [entry[:2] for entry in log if entry[1] != 'Nested']
+                    expect([event for event, name in batch_log]).to_equal(['start', 'end', 'start', 'end'])
+
+            class DeclaredBySiblingContexts(Vows.Context):
+                def topic(self, declared_by_nested_contexts, when_run):
+                    # (after `DeclaredByNestedContexts`, as they share `LOG`)
+                    return dict(
+                        (runner_name, run_with_resources(runner_name, SIBLING_BATCHES)) for runner_name in CONCURRENT_RUNNERS)
+
+                def run_every_context(self, topic):
+                    for result, log in topic.values():
+                        expect(result.successful).to_be_true()
+                        expect(len(log)).to_equal(6)
+
+                def are_held_by_one_sibling_at_a_time(self, topic):
+                    for result, log in topic.values():
+                        expect(get_most_concurrent(log, 'port')).to_equal(1)
+                        port_log = [entry[:2] for entry in log if 'port' in entry[2]]
+                        expect([event for event, name in port_log]).to_equal(['start', 'end', 'start', 'end'])
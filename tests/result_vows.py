@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import pickle
+
+from pyvows import Vows, expect
+from pyvows.result import VowResult, VowsCounts, VowsResult
+
+
+@Vows.batch
+class ResultCounters(Vows.Context):
+
+    class WhenAddingToNestedCounts(Vows.Context):
+        def topic(self):
+            result = VowsResult()
+            context_counts = VowsCounts(result.counts)
+            subcontext_counts = VowsCounts(context_counts)
+            subcontext_counts.add({'error': {'type': AssertionError}, 'skip': None})
+            subcontext_counts.add({'error': None, 'skip': None})
+            context_counts.add({'error': None, 'skip': 'skipped'})
+            return result, context_counts, subcontext_counts
+
+        def the_subcontext_counts_its_own_vows(self, topic):
+            counts = topic[2]
+            expect((counts.successful, counts.errored, counts.skipped)).to_equal((1, 1, 0))
+
+        def the_context_includes_its_subcontexts(self, topic):
+            counts = topic[1]
+            expect((counts.successful, counts.errored, counts.skipped)).to_equal((1, 1, 1))
+
+        def the_result_has_the_totals(self, topic):
+            result = topic[0]
+            expect((result.successful_tests, result.errored_tests, result.skipped_tests)).to_equal((1, 1, 1))
+            expect(result.total_test_count).to_equal(3)
+            expect(result.successful).to_be_false()
+
+    class WhenMergingCountsFromElsewhere(Vows.Context):
+        def topic(self):
+            result = VowsResult()
+            worker_counts = VowsCounts()
+            worker_counts.add({'error': None, 'skip': None})
+            worker_counts.add({'error': None, 'skip': None})
+            result.counts.merge(worker_counts)
+            worker_counts.add({'error': None, 'skip': None})
+            return result
+
+        def the_totals_are_added(self, topic):
+            expect(topic.successful_tests).to_equal(3)
+
+        def the_result_is_successful(self, topic):
+            expect(topic.successful).to_be_true()
+
+    class WhenBuiltByHand(Vows.Context):
+        def topic(self):
+            result = VowsResult()
+            result.contexts = [{
+                'error': None,
+                'skip': None,
+                'tests': [{'error': None, 'skip': None}, {'error': {'type': AssertionError}, 'skip': None}],
+                'contexts': [{'error': None, 'skip': 'skipped', 'tests': [], 'contexts': []}],
+            }]
+            return result
+
+        def the_contexts_are_counted(self, topic):
+            expect((topic.successful_tests, topic.errored_tests, topic.skipped_tests)).to_equal((2, 1, 1))
+
+        def the_result_is_not_successful(self, topic):
+            expect(topic.successful).to_be_false()
+
+    class EvalContext(Vows.Context):
+        def topic(self):
+            counts = VowsCounts()
+            counts.add({'error': {'type': AssertionError}, 'skip': None})
+            return VowsResult().eval_context({'counts': counts, 'contexts': [], 'tests': []})
+
+        def uses_the_context_counts(self, topic):
+            expect(topic).to_be_false()
+
+
+class GeneratedContext(object):
+    generated_topic = True
+
+
+@Vows.batch
+class VowResults(Vows.Context):
+
+    def topic(self):
+        return VowResult(GeneratedContext(), 'is_positive', True, [1, 2], 'some_vows.py', 10)
+
+    def can_be_read_like_a_dict(self, topic):
+        expect(topic['name']).to_equal('is_positive')
+        expect(topic.get('error')).to_be_null()
+        expect(topic.get('unknown', 'default')).to_equal('default')
+        expect('file' in topic).to_be_true()
+
+    def can_be_converted_to_a_dict(self, topic):
+        expect(dict(topic)['lineno']).to_equal(10)
+
+    def rejects_unknown_keys(self, topic):
+        try:
+            topic['unknown'] = 1
+        except KeyError:
+            return
+        raise AssertionError('Expected a KeyError')
+
+    def have_no_instance_dict(self, topic):
+        expect(hasattr(topic, '__dict__')).to_be_false()
+
+    def can_be_pickled(self, topic):
+        expect(pickle.loads(pickle.dumps(topic))['topic']).to_equal([1, 2])
+
+    class WhenReleased(Vows.Context):
+        def topic(self, parent_topic):
+            vow_result = VowResult(GeneratedContext(), 'is_positive', True, [1, 2], 'some_vows.py', 10)
+            vow_result['result'] = object()
+            vow_result.release()
+            return vow_result
+
+        def keeps_the_repr_of_a_generated_topic(self, topic):
+            expect(topic['topic']).to_equal('[1, 2]')
+
+        def drops_the_return_value(self, topic):
+            expect(topic['result']).to_be_null()
+
+        def remembers_the_topic_was_generated(self, topic):
+            expect(topic['context_instance']).not_to_be_instance_of(GeneratedContext)
+            expect(topic['context_instance'].generated_topic).to_be_true()
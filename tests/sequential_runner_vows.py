@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+from pyvows import Vows, expect
+from pyvows.runner import get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.runner.sequential import VowsSequentialRunner
+
+
+@Vows.batch
+class SequentialRunner(Vows.Context):
+
+    def topic(self):
+        dummySuite = {'dummySuite': set([SequentialBatch])}
+        execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+        runner = VowsSequentialRunner(dummySuite, Vows.Context, None, None, execution_plan, False)
+        return runner.run()
+
+    def counts_honored_vows(self, topic):
+        # 3 generated values + 2 vows + 1 async vow + 4 contexts
+        expect(topic.successful_tests).to_equal(10)
+
+    def counts_broken_vows(self, topic):
+        expect(topic.errored_tests).to_equal(1)
+
+    def counts_skipped_vows(self, topic):
+        expect(topic.skipped_tests).to_equal(1)
+
+    def runs_teardown_after_everything_else(self, topic):
+        expect(SequentialBatch.calls).to_equal(['setup', 'topic', 'vow', 'subcontext', 'teardown'])
+
+    class BatchResult(Vows.Context):
+        def topic(self, results):
+            return results.contexts[0]
+
+        def captures_output_of_setup_topic_and_teardown(self, topic):
+            expect(topic['stdout']).to_equal('setup\ntopic\nteardown\n')
+
+        def captures_output_of_each_vow_separately(self, topic):
+            vow = [test for test in topic['tests'] if test['name'] == 'prints'][0]
+            expect(vow['stdout']).to_equal('vow\n')
+
+    class GeneratedTopic(Vows.Context):
+        def topic(self, results):
+            return [ctx for ctx in results.contexts[0]['contexts'] if ctx['name'] == 'Generated'][0]
+
+        def runs_vows_for_every_value(self, topic):
+            expect(sorted(test['topic'] for test in topic['tests'])).to_equal([1, 2, 3])
+
+    class ByName(Vows.Context):
+        def topic(self):
+            return get_runner('sequential')
+
+        def is_the_sequential_runner(self, topic):
+            expect(topic).to_equal(VowsSequentialRunner)
+
+
+class SequentialBatch(Vows.Context):
+    calls = []
+
+    def setup(self):
+        self._output('setup')
+        SequentialBatch.calls.append('setup')
+
+    def topic(self):
+        self._output('topic')
+        SequentialBatch.calls.append('topic')
+        return 42
+
+    def teardown(self):
+        self._output('teardown')
+        SequentialBatch.calls.append('teardown')
+
+    def _output(self, text):
+        VowsSequentialRunner.output.stdout.write(text + '\n')
+
+    def prints(self, topic):
+        self._output('vow')
+        SequentialBatch.calls.append('vow')
+
+    def is_the_answer(self, topic):
+        expect(topic).to_equal(42)
+
+    class Generated(Vows.Context):
+        def topic(self, parent_topic):
+            for value in (1, 2, 3):
+                yield value
+
+        def is_positive(self, topic):
+            expect(topic).to_be_greater_than(0)
+
+    class Failing(Vows.Context):
+        def topic(self):
+            SequentialBatch.calls.append('subcontext')
+            return 1
+
+        def is_two(self, topic):
+            expect(topic).to_equal(2)
+
+        @Vows.skip('not today')
+        def is_skipped(self, topic):
+            pass
+
+    class Async(Vows.Context):
+        @Vows.async_topic
+        def topic(self, callback):
+            self.pool.apply_async(lambda: 10, callback=callback)
+
+        def gets_the_callback_value(self, topic):
+            expect(topic[0]).to_equal(10)
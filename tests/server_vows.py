@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import io
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows import server
+
+SERVED_VOWS = '''\
+from pyvows import Vows, expect
+import servedmodule
+
+@Vows.batch
+class Served(Vows.Context):
+    def topic(self):
+        return servedmodule.VALUE
+
+    def is_preloaded(self, topic):
+        expect(topic).to_equal(42)
+'''
+
+
+def serve_and_request(*argvs):
+    '''Returns the permissions of the server's socket, and the `(status,
+    output)` of each request.'''
+    root = os.path.realpath(tempfile.mkdtemp())
+    with open(os.path.join(root, 'servedmodule.py'), 'w') as module_file:
+        module_file.write('VALUE = 42\n')
+    with open(os.path.join(root, 'served_vows.py'), 'w') as vows_file:
+        vows_file.write(SERVED_VOWS)
+
+    socket_path = os.path.join(root, 'server.sock')
+    # (absolute: before Python 3.7, `-m` put '' in `sys.path`)
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(os.path.abspath(path) for path in sys.path))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'pyvows', '--serve', '--preload', 'servedmodule', '--socket', socket_path],
+        cwd=root, env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.time() + 10
+        while not server.is_serving(socket_path) and time.time() < deadline:
+            time.sleep(0.05)
+        mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+
+        results = []
+        for argv in argvs:
+            output = io.BytesIO()
+            status = server.request(argv, socket_path, cwd=root, output=output)
+            results.append((status, output.getvalue().decode('utf-8')))
+        return mode, results
+    finally:
+        process.terminate()
+        process.wait()
+        process.stdout.close()
+        shutil.rmtree(root)
+
+
+@Vows.batch
+class Serving(Vows.Context):
+
+    class WhenRequested(Vows.Context):
+        def topic(self):
+            return serve_and_request(
+                ['--no-color', '.'], ['--no-color', '--include', 'nothing_at_all', '.'], ['--serve'],
+                ['--client', '--no-color', '.'])
+
+        def runs_the_vows_in_the_requested_directory(self, topic):
+            status, output = topic[1][0]
+            expect(status).to_equal(0)
+            expect(output).to_include('2 honored')
+
+        def runs_each_request_in_a_fresh_child(self, topic):
+            status, output = topic[1][1]
+            expect(output).to_include('0 honored')
+
+        def refuses_to_serve_from_a_request(self, topic):
+            status, output = topic[1][2]
+            expect(status).to_equal(2)
+            expect(output).to_include("--serve can't be sent to a PyVows server")
+
+        def runs_a_client_request_in_the_child(self, topic):
+            status, output = topic[1][3]
+            expect(status).to_equal(0)
+            expect(output).to_include('2 honored')
+
+        def only_lets_its_user_connect(self, topic):
+            expect(topic[0]).to_equal(0o600)
+
+    class WithoutAServer(Vows.Context):
+        def topic(self):
+            return server.request(['.'], os.path.join(tempfile.gettempdir(), 'no-pyvows-server.sock'))
+
+        def is_none(self, topic):
+            expect(topic).to_be_null()
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--serve', '--preload', 'app', '--preload', 'app.models', '--socket', 's.sock'])
+
+        def has_serve(self, topic):
+            expect(topic.serve).to_be_true()
+
+        def has_the_preloaded_modules(self, topic):
+            expect(topic.preload).to_equal(['app', 'app.models'])
+
+        def has_the_socket(self, topic):
+            expect(topic.socket).to_equal('s.sock')
+
+        def has_client(self, topic):
+            expect(Parser().parse_args(['--client']).client).to_be_true()
@@ -342,6 +342,32 @@ class SkippingThings(Vows.Context):
                 def subcontext_tests_should_also_not_run_vow_shows_skipped(self, topic):
                     expect(topic).to_include('? subcontext tests should also not run\n')
 
+    class ResultsWhenVowHasSkipDecorator(Vows.Context):
+        def topic(self):
+            dummySuite = {'dummySuite': set([VowHasSkipDecorator])}
+            execution_plan = ExecutionPlanner(dummySuite, set(), set()).plan()
+            runner = VowsRunner(dummySuite, Vows.Context, None, None, execution_plan, False)
+            return runner.run()
+
+        def results_are_successful(self, topic):
+            expect(topic.successful).to_equal(True)
+
+        def there_is_one_skipped_test(self, topic):
+            expect(topic.skipped_tests).to_equal(1)
+
+        def there_are_two_successful_tests(self, topic):
+            # (the other vow and the topic)
+            expect(topic.successful_tests).to_equal(2)
+
+        def the_skipped_vow_keeps_its_reason(self, topic):
+            skipped = [test for test in topic.contexts[0]['tests'] if test['skip']][0]
+            expect(str(skipped['skip'])).to_equal('just because')
+            expect(skipped['elapsed']).to_equal(0)
+
+        def the_vows_have_their_ids(self, topic):
+            expect(sorted(test['id'] for test in topic.contexts[0]['tests'])).to_equal([
+                'VowHasSkipDecorator.tests_should_not_run', 'VowHasSkipDecorator.tests_should_run'])
+
 
 class SkipIsRaisedFromTopic(Vows.Context):
     teardownCalled = False
@@ -481,3 +507,15 @@ class SubcontextHasSkipDecorator(Vows.Context):
 
         def subcontext_tests_should_also_not_run(self, topic):
             SubcontextHasSkipDecorator.subcontextTestRun = True
+
+
+class VowHasSkipDecorator(Vows.Context):
+    def topic(self):
+        return 0
+
+    @Vows.skip('just because')
+    def tests_should_not_run(self, topic):
+        pass
+
+    def tests_should_run(self, topic):
+        pass
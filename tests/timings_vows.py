@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+import shutil
+import tempfile
+
+from pyvows import Vows, cache, expect
+from pyvows.cli import Parser
+from pyvows.result import VowsResult
+from pyvows.runner import get_runner
+from pyvows.runner.executionplan import ExecutionPlanner
+from pyvows.timings import TimingStore
+
+
+def context_result(ctx_id, topic_elapsed, vows=(), contexts=(), root='/project'):
+    return {
+        'filename': os.path.join(root, 'things_vows.py'),
+        'id': ctx_id,
+        'topic_elapsed': topic_elapsed,
+        'elapsed': 1.0,
+        'tests': [{'name': name, 'elapsed': elapsed} for name, elapsed in vows],
+        'contexts': list(contexts),
+    }
+
+
+def make_result():
+    result = VowsResult()
+    result.contexts = [
+        context_result('Quick', 0.1, [('works', 0.1)]),
+        context_result('Slow', 0.5, [('works', 0.5)], [
+            context_result('Slow.Enumerated', 1.0, [('works', 0.25)]),
+            context_result('Slow.Enumerated', 1.0, [('works', 0.25)]),
+        ]),
+    ]
+    return result
+
+
+class FirstBatch(Vows.Context):
+    def topic(self):
+        return 1
+
+    def is_one(self, topic):
+        expect(topic).to_equal(1)
+
+
+class SecondBatch(FirstBatch):
+    pass
+
+
+@Vows.batch
+class Timings(Vows.Context):
+
+    class WhenRecorded(Vows.Context):
+        def topic(self):
+            store = TimingStore('/project')
+            store.record(make_result())
+            return store
+
+        def add_up_enumerated_contexts(self, topic):
+            expect(topic.contexts[('things_vows.py', 'Slow.Enumerated')]).to_equal((2.0, 2.0))
+
+        def add_up_enumerated_vows(self, topic):
+            expect(topic.get_vow_elapsed('/project/things_vows.py', 'Slow.Enumerated', 'works')).to_equal(0.5)
+
+        def count_the_work_of_whole_batches(self, topic):
+            expect(topic.get_batch_work('/project/things_vows.py', 'Slow')).to_equal(3.5)
+
+        def order_batches_longest_first(self, topic):
+            batches = [
+                ('/project/things_vows.py', 'Quick'),
+                ('/project/things_vows.py', 'Slow'),
+                ('/project/things_vows.py', 'New'),
+            ]
+            expect(topic.order_batches(batches)).to_equal([
+                ('/project/things_vows.py', 'New'),
+                ('/project/things_vows.py', 'Slow'),
+                ('/project/things_vows.py', 'Quick'),
+            ])
+
+    class WhenSaved(Vows.Context):
+        def topic(self):
+            root = tempfile.mkdtemp()
+            try:
+                store = TimingStore(root)
+                result = VowsResult()
+                result.contexts = [context_result('Slow', 0.5, [('works', 0.5)], root=root)]
+                store.record(result)
+                saved = store.save()
+                loaded = TimingStore.load(root)
+                with open(os.path.join(root, cache.CACHE_DIR, '.gitignore')) as gitignore:
+                    return saved, loaded.contexts, loaded.vows, gitignore.read()
+            finally:
+                shutil.rmtree(root)
+
+        def is_saved(self, topic):
+            expect(topic[0]).to_be_true()
+
+        def loads_the_contexts(self, topic):
+            expect(topic[1]).to_equal({('things_vows.py', 'Slow'): (0.5, 1.0)})
+
+        def loads_the_vows(self, topic):
+            expect(topic[2]).to_equal({('things_vows.py', 'Slow', 'works'): 0.5})
+
+        def keeps_the_cache_out_of_version_control(self, topic):
+            expect(topic[3].splitlines()[-1]).to_equal('*')
+
+    class WhenSavedByConcurrentRuns(Vows.Context):
+        def topic(self):
+            root = tempfile.mkdtemp()
+            try:
+                def record(store, ctx_id, topic_elapsed):
+                    result = VowsResult()
+                    result.contexts = [context_result(ctx_id, topic_elapsed, root=root)]
+                    store.record(result)
+                    store.save()
+
+                record(TimingStore(root), 'Quick', 0.1)
+                first, second = TimingStore.load(root), TimingStore.load(root)
+                record(first, 'Quick', 0.2)
+                record(second, 'Slow', 0.5)
+                return TimingStore.load(root).contexts
+            finally:
+                shutil.rmtree(root)
+
+        def only_replace_what_each_run_ran(self, topic):
+            expect(topic).to_equal({
+                ('things_vows.py', 'Quick'): (0.2, 1.0),
+                ('things_vows.py', 'Slow'): (0.5, 1.0),
+            })
+
+    class WithoutTheCache(Vows.Context):
+        def topic(self):
+            root = tempfile.mkdtemp()
+            cache.set_enabled(False)
+            try:
+                store = TimingStore(root)
+                store.record(make_result())
+                return store.save(), cache.save_json('things.json', [1], root), os.listdir(root)
+            finally:
+                cache.set_enabled(True)
+                shutil.rmtree(root)
+
+        def are_not_saved(self, topic):
+            expect(topic[:2]).to_equal((False, False))
+            expect(topic[2]).to_be_empty()
+
+    class WhenRunning(Vows.Context):
+        def topic(self):
+            suite = os.path.abspath('timings_suite_vows.py')
+            suites = {suite: set([FirstBatch, SecondBatch])}
+            store = TimingStore()
+            store.contexts[(store._suite_key(suite), 'FirstBatch')] = (0.1, 0.1)
+            store.contexts[(store._suite_key(suite), 'SecondBatch')] = (0.2, 0.2)
+            execution_plan = ExecutionPlanner(suites, set(), set()).plan()
+            runner = get_runner('sequential')(suites, Vows.Context, None, None, execution_plan, timings=store)
+            return runner.run()
+
+        def starts_the_longest_batch_first(self, topic):
+            expect([context['name'] for context in topic.contexts]).to_equal(['SecondBatch', 'FirstBatch'])
+
+        def records_how_long_contexts_took(self, topic):
+            expect(topic.contexts[0]['elapsed']).to_be_greater_than(0)
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--no-cache'])
+
+        def has_no_cache(self, topic):
+            expect(topic.no_cache).to_be_true()
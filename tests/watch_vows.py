@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# pyvows testing engine
+# https://github.com/heynemann/pyvows
+
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license
+# Copyright (c) 2011 Bernardo Heynemann heynemann@gmail.com
+
+import os
+import shutil
+import sys
+import tempfile
+
+from pyvows import Vows, expect
+from pyvows.cli import Parser
+from pyvows.dependencies import DependencyIndex
+from pyvows.watch import PollingWatcher, get_watched_paths
+
+PROJECT = {
+    'watchedmodel.py': 'VALUE = 1\n',
+    'watchedservice.py': 'from watchedmodel import VALUE\n',
+    'watchedservice_vows.py': (
+        'from pyvows import Vows\n'
+        'import watchedservice\n'
+        '@Vows.batch\n'
+        'class WatchedService(Vows.Context):\n'
+        '    def topic(self):\n'
+        '        return watchedservice.VALUE\n'
+    ),
+    'watchedother_vows.py': (
+        'from pyvows import Vows\n'
+        '@Vows.batch\n'
+        'class WatchedOther(Vows.Context):\n'
+        '    pass\n'
+    ),
+}
+
+
+def write(root, name, source):
+    with open(os.path.join(root, name), 'w') as module_file:
+        module_file.write(source)
+
+
+class WatchedVows(Vows):
+    suite_files = []
+    import_times = []
+    package_import_times = []
+
+
+def reload_project():
+    root = os.path.realpath(tempfile.mkdtemp())
+    for name, source in PROJECT.items():
+        write(root, name, source)
+    WatchedVows.dependency_index = DependencyIndex(root)
+    sys.path.insert(0, root)
+    try:
+        loaded = WatchedVows.reload(root, 'watched*_vows.py', [])
+        write(root, 'watchedmodel.py', 'VALUE = 22\n')
+        reloaded = WatchedVows.reload(root, 'watched*_vows.py', [os.path.join(root, 'watchedmodel.py')])
+        # (before the modules are dropped: Python 2 then sets their globals to None)
+        batch = next(iter(list(reloaded.values())[0]))
+        return loaded, reloaded, batch().topic()
+    finally:
+        sys.path.remove(root)
+        for name in ('watchedmodel', 'watchedservice', 'watchedservice_vows', 'watchedother_vows'):
+            sys.modules.pop(name, None)
+        for suite in list(Vows.suites):
+            if os.path.basename(suite).startswith('watched'):
+                del Vows.suites[suite]
+        shutil.rmtree(root)
+
+
+def batch_names(suites):
+    return sorted(batch.__name__ for batches in suites.values() for batch in batches)
+
+
+@Vows.batch
+class Watching(Vows.Context):
+
+    class WhenReloading(Vows.Context):
+        def topic(self):
+            return reload_project()
+
+        def imports_new_vows_files(self, topic):
+            expect(batch_names(topic[0])).to_equal(['WatchedOther', 'WatchedService'])
+
+        def only_reloads_the_affected_vows_files(self, topic):
+            expect(batch_names(topic[1])).to_equal(['WatchedService'])
+
+        def imports_the_changed_modules_again(self, topic):
+            expect(topic[2]).to_equal(22)
+
+    class Dependents(Vows.Context):
+        def topic(self):
+            index = DependencyIndex('/project', {
+                '/project/a_vows.py': set(['/project/a.py']),
+                '/project/a.py': set(['/project/model.py']),
+                '/project/b_vows.py': set(['/project/b.py']),
+            })
+            return index.get_dependents(['/project/model.py'])
+
+        def include_indirect_importers(self, topic):
+            expect(topic).to_equal(set(['/project/a.py', '/project/a_vows.py']))
+
+    class WatchedPaths(Vows.Context):
+        def topic(self):
+            index = DependencyIndex('/project', {'/project/tests/a_vows.py': set(['/project/a.py'])})
+            return get_watched_paths(index, ['/project/tests/a_vows.py'])
+
+        def include_the_vows_files_their_imports_and_directories(self, topic):
+            expect(topic).to_equal(set(['/project/tests/a_vows.py', '/project/a.py', '/project/tests']))
+
+    class WhenPolling(Vows.Context):
+        def topic(self):
+            root = os.path.realpath(tempfile.mkdtemp())
+            try:
+                write(root, 'a.py', '')
+                write(root, 'b.py', '')
+                watcher = PollingWatcher(interval=0.01)
+                watcher.watch([os.path.join(root, 'a.py'), os.path.join(root, 'b.py'), root])
+                unchanged = watcher.wait(timeout=0.05)
+                write(root, 'a.py', 'VALUE = 1\n')
+                write(root, 'c.py', '')
+                return unchanged, watcher.wait(timeout=1)
+            finally:
+                shutil.rmtree(root)
+
+        def report_nothing_until_something_changes(self, topic):
+            expect(topic[0]).to_equal([])
+
+        def report_changed_files(self, topic):
+            expect([os.path.basename(path) for path in topic[1]]).to_include('a.py')
+
+        def report_directories_with_new_files(self, topic):
+            expect(topic[1]).to_length(2)
+
+    class CommandLine(Vows.Context):
+        def topic(self):
+            return Parser().parse_args(['--watch', '--watch-interval', '2'])
+
+        def has_watch(self, topic):
+            expect(topic.watch).to_be_true()
+
+        def has_the_interval(self, topic):
+            expect(topic.watch_interval).to_equal(2.0)